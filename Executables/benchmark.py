@@ -0,0 +1,328 @@
+# benchmark.py
+# [BARU] Benchmark performa klien (jalankan dari folder Executables).
+#
+#   python benchmark.py decrypt-rss --sizes 1 8 32 128
+#       Peak RSS dekripsi file: cara lama (baca semua -> decrypt -> tulis)
+#       dibanding dekripsi streaming langsung ke disk. Setiap pengukuran
+#       berjalan di proses terpisah agar peak RSS tidak saling memengaruhi.
+#
+#   python benchmark.py whitemist-cache --messages 200 --length 120
+#       Overhead per pesan encrypt/decrypt White-Mist (teks) dengan dan tanpa
+#       cache state (key, salt, sugar). Butuh modul WhiteMist asli
+#       (pip install whitemist==2020.0.0); versinya ikut dicetak.
+#
+#   python benchmark.py startup --runs 5 --record startup_history.jsonl --max-ms 400
+#       Waktu impor 'main' (python -X importtime) di proses baru: median total,
+#       modul termahal, dan modul berat yang seharusnya dimuat malas. Gagal
+#       (exit code 1) jika modul berat ikut dimuat atau melebihi --max-ms.
+#
+#   python benchmark.py face-detect --video rekaman.mp4 --frames 300
+#       FPS dan waktu CPU per frame deteksi wajah: detectMultiScale penuh di
+#       setiap frame (cara lama) dibanding FaceTracker (frame kecil + ROI).
+#       Tanpa --video, frame diambil dari kamera --camera.
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import time
+import random
+import string
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+MB = 1024 * 1024
+
+
+def peak_rss_bytes():
+    """Peak RSS proses ini (VmHWM di Linux, resource di macOS, psutil di Windows jika ada)."""
+    # ru_maxrss di Linux ikut mewarisi RSS proses induk saat fork, jadi pakai VmHWM
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+
+
+def run_isolated(*args):
+    """Jalankan benchmark.py <args> di proses baru, kembalikan JSON yang dicetak di baris terakhir."""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *args],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# --- decrypt-rss ---
+DECRYPT_MODES = ["aes-buffered", "aes-streaming", "aes-stream-format", "whitemist-buffered", "whitemist-streaming", "whitemist-binary"]
+
+def _decrypt_once(mode, in_path, out_path, key):
+    from utils import CryptoEngine, decrypt_whitemist, decrypt_whitemist_file
+    if mode == "baseline":
+        pass  # Hanya impor: acuan peak RSS tanpa dekripsi
+    elif mode == "aes-buffered":
+        with open(in_path, "rb") as f: encrypted_bytes = f.read()
+        decrypted_bytes = CryptoEngine(key).decrypt(encrypted_bytes)
+        with open(out_path, "wb") as f: f.write(decrypted_bytes)
+    elif mode in ("aes-streaming", "aes-stream-format"):
+        CryptoEngine(key).decrypt_file(in_path, out_path)
+    elif mode == "whitemist-buffered":
+        with open(in_path, "rb") as f: encrypted_bytes = f.read()
+        decrypted_bytes = decrypt_whitemist(encrypted_bytes.decode("utf-8"), key)
+        with open(out_path, "wb") as f: f.write(decrypted_bytes)
+    elif mode in ("whitemist-streaming", "whitemist-binary"):
+        decrypt_whitemist_file(in_path, out_path, key)
+    print(json.dumps({"peak": peak_rss_bytes()}))
+
+
+def _prepare_encrypted(work_dir, size_mb, key, whitemist):
+    """Buat file acak size_mb MB lalu enkripsi ke format lama, streaming, dan White-Mist."""
+    from utils import CryptoEngine, encrypt_whitemist, iter_whitemist_encrypt
+    plain_path = os.path.join(work_dir, f"plain_{size_mb}")
+    with open(plain_path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(MB))
+    paths = {}
+    with open(plain_path, "rb") as f: data = f.read()
+    paths["aes"] = os.path.join(work_dir, f"legacy_{size_mb}.enc")
+    with open(paths["aes"], "wb") as f: f.write(CryptoEngine(key).encrypt(data))
+    if whitemist:
+        paths["whitemist"] = os.path.join(work_dir, f"whitemist_{size_mb}.enc")
+        with open(paths["whitemist"], "w", encoding="utf-8") as f: f.write(encrypt_whitemist(data, key))
+    del data
+    paths["aes-stream"] = os.path.join(work_dir, f"stream_{size_mb}.enc")
+    with open(plain_path, "rb") as f_in, open(paths["aes-stream"], "wb") as f_out:
+        for chunk in CryptoEngine(key).encrypt_stream(f_in):
+            f_out.write(chunk)
+    if whitemist:
+        paths["whitemist-binary"] = os.path.join(work_dir, f"whitemist_bin_{size_mb}.enc")
+        with open(plain_path, "rb") as f_in, open(paths["whitemist-binary"], "wb") as f_out:
+            for chunk in iter_whitemist_encrypt(f_in, key):
+                f_out.write(chunk)
+    os.remove(plain_path)
+    return paths
+
+
+def cmd_decrypt_rss(args):
+    from utils import crossCross
+    modes = ["baseline"] + [m for m in args.modes if crossCross is not None or not m.startswith("whitemist")]
+    skipped = sorted(set(args.modes) - set(modes))
+    if skipped:
+        print(f"Mode dilewati (modul WhiteMist tidak ditemukan): {', '.join(skipped)}")
+    source_for = {"baseline": "aes", "aes-buffered": "aes", "aes-streaming": "aes", "aes-stream-format": "aes-stream",
+                  "whitemist-buffered": "whitemist", "whitemist-streaming": "whitemist",
+                  "whitemist-binary": "whitemist-binary"}
+
+    work_dir = tempfile.mkdtemp(prefix="ldu_bench_")
+    try:
+        print(f"{'ukuran':>8} | " + " | ".join(f"{m:>20}" for m in modes))
+        print("-" * (11 + 23 * len(modes)))
+        for size_mb in args.sizes:
+            paths = _prepare_encrypted(work_dir, size_mb, args.key, crossCross is not None)
+            row = []
+            for mode in modes:
+                out_path = os.path.join(work_dir, "out.bin")
+                result = run_isolated("_decrypt-once", mode, paths[source_for[mode]], out_path, args.key)
+                if mode != "baseline":
+                    if os.path.getsize(out_path) != size_mb * MB:
+                        raise RuntimeError(f"Hasil dekripsi {mode} ({size_mb} MB) tidak sesuai ukuran.")
+                    os.remove(out_path)
+                row.append(f"{result['peak'] / MB:>14.1f} MB")
+            print(f"{size_mb:>5} MB | " + " | ".join(f"{cell:>20}" for cell in row))
+            for path in paths.values(): os.remove(path)
+        print("\nNilai = peak RSS proses; 'baseline' = hanya impor modul, tanpa dekripsi.")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# --- whitemist-cache ---
+def cmd_whitemist_cache(args):
+    import utils
+    if utils.crossCross is None:
+        print("Modul WhiteMist tidak ditemukan, benchmark dilewati.")
+        return
+    from importlib import metadata
+    try:
+        version = metadata.version("whitemist")
+    except metadata.PackageNotFoundError:
+        version = "tidak diketahui (bukan paket pip)"
+    print(f"WhiteMist {version}, Python {sys.version.split()[0]}")
+    rng = random.Random(0)
+    alphabet = string.ascii_letters + string.digits + " .,!?"
+    messages = ["".join(rng.choice(alphabet) for _ in range(args.length)).encode("utf-8")
+                for _ in range(args.messages)]
+    keys = [f"kunci-{i}" for i in range(args.keys)]
+
+    def run(use_cache):
+        utils.clear_whitemist_cache()
+        start = time.perf_counter()
+        for i, message in enumerate(messages):
+            if not use_cache:
+                utils.clear_whitemist_cache()  # paksa state dibangun ulang seperti sebelumnya
+            key = keys[i % len(keys)]
+            encrypted = utils.encrypt_whitemist(message, key, is_text=True)
+            if not use_cache:
+                utils.clear_whitemist_cache()
+            if utils.decrypt_whitemist(encrypted, key, is_text=True) != message:
+                raise RuntimeError("Hasil dekripsi White-Mist tidak cocok.")
+        return (time.perf_counter() - start) / len(messages) * 1000
+
+    without_cache = min(run(False) for _ in range(args.repeat))
+    with_cache = min(run(True) for _ in range(args.repeat))
+    print(f"{args.messages} pesan x {args.length} karakter, {len(keys)} kunci, encrypt+decrypt per pesan:")
+    print(f"  tanpa cache : {without_cache:8.3f} ms")
+    print(f"  dengan cache: {with_cache:8.3f} ms  ({without_cache / with_cache:.1f}x lebih cepat)")
+
+
+# --- startup ---
+# Modul yang TIDAK boleh dimuat saat startup (hanya saat fiturnya dipakai)
+LAZY_MODULES = ["cv2", "numpy", "stegano", "PIL", "Crypto", "cryptography", "chat", "tkinter"]
+
+def _importtime_once(target):
+    """Jalankan 'import <target>' dengan -X importtime, kembalikan {modul: (self_us, cumulative_us)}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Gagal mengimpor {target}:\n{result.stderr[-2000:]}")
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def cmd_startup(args):
+    runs = [_importtime_once(args.target) for _ in range(args.runs)]
+    totals_ms = [run[args.target][1] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+    eager = [name for name in LAZY_MODULES if any(name in run for run in runs)]
+
+    print(f"import {args.target}: median {median_ms:.1f} ms "
+          f"(min {min(totals_ms):.1f}, max {max(totals_ms):.1f}, {args.runs} run)")
+    print(f"\nModul termahal (kumulatif, run terakhir):")
+    top = sorted(runs[-1].items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in top:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+    print(f"\nModul berat yang ikut dimuat: {', '.join(eager) if eager else '-'}")
+
+    if args.record:
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "target": args.target,
+            "median_ms": round(median_ms, 1),
+            "runs_ms": [round(t, 1) for t in totals_ms],
+            "eager_heavy_modules": eager,
+        }
+        with open(args.record, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Hasil ditambahkan ke {args.record}")
+
+    failed = False
+    if eager:
+        print("GAGAL: modul berat di atas harus diimpor malas.")
+        failed = True
+    if args.max_ms and median_ms > args.max_ms:
+        print(f"GAGAL: median {median_ms:.1f} ms melebihi batas {args.max_ms} ms.")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+def _load_frames(args):
+    import cv2
+    source = args.video if args.video else args.camera
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise SystemExit(f"Tidak bisa membuka {source}")
+    frames = []
+    while len(frames) < args.frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2GRAY))
+    cap.release()
+    if not frames:
+        raise SystemExit("Tidak ada frame yang terbaca.")
+    return frames
+
+def cmd_face_detect(args):
+    from face_engine import FaceTracker, load_face_detector, CASCADE_PATH
+    frames = _load_frames(args)
+    detector = load_face_detector(args.cascade or CASCADE_PATH)
+    tracker = FaceTracker(detector)
+    runs = {
+        "full-frame": lambda gray: (lambda faces: tuple(faces[0]) if len(faces) else None)(
+            detector.detectMultiScale(gray, 1.3, 5)),
+        "tracker": tracker.process,
+    }
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frame {w}x{h}")
+    print(f"{'mode':<12} {'fps':>8} {'CPU ms/frame':>13} {'frame berwajah':>15}")
+    for name, detect in runs.items():
+        tracker.reset()
+        wall, cpu = time.perf_counter(), time.process_time()
+        found = sum(detect(gray) is not None for gray in frames)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        print(f"{name:<12} {len(frames) / wall:8.1f} {cpu * 1000 / len(frames):13.2f} "
+              f"{found:>9}/{len(frames)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark performa klien Land Down Under.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("decrypt-rss", help="Peak RSS dekripsi file: buffered vs streaming")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32, 128], help="Ukuran file (MB)")
+    p.add_argument("--modes", nargs="+", choices=DECRYPT_MODES, default=DECRYPT_MODES)
+    p.add_argument("--key", default="benchmark-key")
+    p.set_defaults(func=cmd_decrypt_rss)
+
+    p = sub.add_parser("whitemist-cache", help="Overhead per pesan White-Mist dengan/tanpa cache state")
+    p.add_argument("--messages", type=int, default=200)
+    p.add_argument("--length", type=int, default=120, help="Panjang pesan (karakter)")
+    p.add_argument("--keys", type=int, default=1, help="Jumlah kunci berbeda yang dipakai bergantian")
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=cmd_whitemist_cache)
+
+    p = sub.add_parser("startup", help="Waktu impor startup (python -X importtime)")
+    p.add_argument("--target", default="main", help="Modul yang diimpor (default: main)")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--top", type=int, default=15)
+    p.add_argument("--record", help="Tambahkan hasil (JSON per baris) ke file ini")
+    p.add_argument("--max-ms", type=float, help="Gagal jika median melebihi nilai ini")
+    p.set_defaults(func=cmd_startup)
+
+    p = sub.add_parser("face-detect", help="FPS/CPU deteksi wajah: frame penuh vs FaceTracker")
+    p.add_argument("--video", help="File video sumber frame (default: kamera)")
+    p.add_argument("--camera", type=int, default=0)
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--cascade", default=None, help="Default: face_engine.CASCADE_PATH")
+    p.set_defaults(func=cmd_face_detect)
+
+    # Dipakai internal oleh run_isolated()
+    p = sub.add_parser("_decrypt-once")
+    p.add_argument("mode", choices=["baseline"] + DECRYPT_MODES)
+    p.add_argument("in_path"); p.add_argument("out_path"); p.add_argument("key")
+    p.set_defaults(func=lambda a: _decrypt_once(a.mode, a.in_path, a.out_path, a.key))
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -1,24 +1,29 @@
 import os
-import base64
-import requests
 import uuid
 import hashlib 
-import json    
-from stegano import lsb
+import sqlite3
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QLineEdit, QPushButton, QMessageBox,
-    QListWidget, QListWidgetItem, QFileDialog,
-    QInputDialog, QFrame, QApplication, QDialog,
-    QSizePolicy
+    QListView, QFileDialog,
+    QInputDialog, QApplication
 )
-from PySide6.QtGui import QFont, QColor, QPixmap
-from PySide6.QtCore import Qt, QSize, QTimer # [INSTRUKSI 1] Impor QTimer
+from PySide6.QtGui import QFont, QPixmap
+from PySide6.QtCore import Qt, QTimer, QEvent # [INSTRUKSI 1] Impor QTimer
 from datetime import datetime, timezone # Diperlukan untuk timestamp
 
-from utils import CryptoEngine, vigenere_encrypt, vigenere_decrypt, encrypt_whitemist, decrypt_whitemist
+from task_executor import get_shared_executor, RequestExecutor
+from message_store import open_message_store
+from chat_view import ChatMessageModel, ChatBubbleDelegate
+from poll_scheduler import PollScheduler
+from download_manager import DownloadManager
+from utils import CryptoEngine, vigenere_encrypt, vigenere_decrypt, encrypt_whitemist, decrypt_whitemist, decrypt_whitemist_file, is_printable_text, iter_whitemist_encrypt, whitemist_binary_supported, parse_timestamp, get_api_session, iter_multipart
 
 class ChatPage(QWidget):
+
+    # [BARU] Dekripsi massal: jumlah thread pool khusus dan pesan per task
+    DECRYPT_ALL_THREADS = 2
+    DECRYPT_ALL_BATCH = 16
     
     # --- Palet Warna (Tidak Berubah) ---
     COLOR_BACKGROUND = "#1A1B2E"
@@ -39,24 +44,35 @@ class ChatPage(QWidget):
     COLOR_BUBBLE_RECV = "#3E3C6E"
     # -----------------------------------------------
 
-    def __init__(self, current_user, recipient_username, shared_password, message_manager, back_callback):
+
+    def __init__(self, current_user, recipient_username, shared_password, message_manager, back_callback, executor=None, http_session=None, push_channel=None, poll_policy=None, download_manager=None):
         super().__init__()
         # ... (Logika init TIDAK BERUBAH) ...
         self.current_user = current_user
         self.recipient_username = recipient_username
         self.message_manager = message_manager
         self.back_callback = back_callback
+        # [BARU] Semua I/O jaringan lewat executor latar belakang bersama
+        self.executor = executor or get_shared_executor()
+        # [BARU] Sesi HTTP bersama (keep-alive) untuk upload/download
+        self.http = http_session or get_api_session()
+        # [BARU] Unduhan streaming + resume (Range) + verifikasi hash, bisa beberapa sekaligus
+        self.downloads = download_manager or DownloadManager(self.http)
+        # [BARU] Pool kecil khusus dekripsi massal agar tidak menahan polling/kirim/upload di executor bersama
+        self.decrypt_executor = RequestExecutor(max_threads=self.DECRYPT_ALL_THREADS)
+        self.decrypt_all_job = None  # {"cancelled": bool} selama dekripsi massal berjalan
         
         self.chat_id = self.message_manager.get_chat_id(self.current_user, self.recipient_username)
-        self.session_crypto = CryptoEngine(shared_password)
+        # [REVISI] Mode sesi: Scrypt sekali per sesi, kunci riwayat di-cache per salt
+        self.session_crypto = CryptoEngine(shared_password, session_mode=True)
         
-        self.api_url = "https://sorasaki.azeroth.site/"
+        self.api_url = self.http.base_url
         self.MAX_FILE_SIZE = 2 * 1024 * 1024 # 2MB
         
         self.base_data_dir = "local_data" 
         self.cache_dir = os.path.join(self.base_data_dir, "user_caches")
-        self.cache_file = os.path.join(self.cache_dir, f"cache_{self.current_user}.json")
-        self.message_cache = self.load_cache()
+        self.cache_file = os.path.join(self.cache_dir, f"cache_{self.current_user}.json") # Format lama (dimigrasi)
+        self.cache_db_file = os.path.join(self.cache_dir, f"cache_{self.current_user}.sqlite3")
         
         self.temp_stegano_dir = os.path.join(self.base_data_dir, "temp_stegano")
         self.temp_download_dir = os.path.join(self.base_data_dir, "temp_downloads")
@@ -66,15 +82,38 @@ class ChatPage(QWidget):
             if not os.path.exists(folder):
                 os.makedirs(folder)
 
+        # [REVISI] Cache SQLite: hanya entri chat ini yang dimuat ke memori
+        self.message_cache = self.load_cache()
+
+        # [BARU] State delta sync: pesan yang sudah tampil & timestamp server terakhir
+        self.displayed_message_ids = set()
+        self.last_seen_timestamp = None
+        self.full_resync_requested = False  # Resync penuh menunggu giliran di PollScheduler
+
         self.init_ui() 
         
-        # Refresh saat pertama kali masuk
+        # Refresh penuh saat pertama kali masuk
         QTimer.singleShot(0, self.refresh_chat_display)
         
-        # [INSTRUKSI 1] Mulai polling data setiap 5 detik
-        self.poll_timer = QTimer(self)
-        self.poll_timer.timeout.connect(self.refresh_chat_display)
-        self.poll_timer.start(1000) # 5000 ms = 5 detik
+        # [REVISI] Polling delta sync lewat PollScheduler: cepat setelah aktivitas,
+        # backoff saat sepi, berhenti saat window tidak aktif, tidak menumpuk.
+        self.poll_scheduler = PollScheduler(self.start_sync, poll_policy, name=self.chat_id, parent=self)
+        QApplication.instance().applicationStateChanged.connect(self.on_application_state_changed)
+        self.poll_scheduler.start()
+
+        # [BARU] Push channel: saat tersambung, polling hanya jadi jaring pengaman
+        self.push_channel = push_channel
+        if self.push_channel:
+            self.push_channel.message_event.connect(self.on_push_message)
+            self.push_channel.connected.connect(self.on_push_connected)
+            self.push_channel.disconnected.connect(self.on_push_disconnected)
+            if self.push_channel.is_connected:
+                self.poll_scheduler.set_push_connected(True)
+
+        self.download_progress = {}  # key -> (diterima, total) untuk label status unduhan
+        self.downloads.progress.connect(self.on_download_progress)
+        self.downloads.finished.connect(self.on_download_ended)
+        self.downloads.failed.connect(self.on_download_ended)
 
 
 
@@ -88,21 +127,23 @@ class ChatPage(QWidget):
         return None
 
     def load_cache(self):
-        if not os.path.exists(self.cache_file): return {}
-        try:
-            with open(self.cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError): return {} 
+        # [REVISI] Buka store SQLite user (JSON lama dimigrasi otomatis) dan muat chat ini saja
+        store = open_message_store(self.cache_db_file, legacy_json_path=self.cache_file)
+        return store.for_chat(self.chat_id)
 
     def save_to_cache(self, message_id, data_to_cache):
         if not message_id: return
-        self.message_cache[message_id] = data_to_cache
         try:
-            if not os.path.exists(self.cache_dir):
-                os.makedirs(self.cache_dir)
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.message_cache, f, indent=2, ensure_ascii=False)
-        except IOError as e: print(f"Peringatan: Gagal menyimpan cache ke file: {e}")
+            self.message_cache.put(message_id, data_to_cache)
+        except sqlite3.Error as e: print(f"Peringatan: Gagal menyimpan cache: {e}")
+
+    def save_many_to_cache(self, entries):
+        """[BARU] Simpan banyak hasil dekripsi sekaligus dalam SATU transaksi."""
+        entries = {k: v for k, v in entries.items() if k}
+        if not entries: return
+        try:
+            self.message_cache.put_many(entries)
+        except sqlite3.Error as e: print(f"Peringatan: Gagal menyimpan cache: {e}")
     # -------------------------------------------
 
     def init_ui(self):
@@ -126,23 +167,51 @@ class ChatPage(QWidget):
         title.setStyleSheet(f"color: {self.COLOR_GOLD};"); 
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
-        top_bar_layout.addWidget(back_btn); top_bar_layout.addWidget(title)
+        # [BARU] Tombol resync: satu-satunya jalur untuk membangun ulang seluruh riwayat
+        resync_btn = QPushButton("⟳ Sync")
+        resync_btn.setToolTip("Muat ulang seluruh riwayat chat dari server")
+        resync_btn.setStyleSheet(self.button_style(
+            base=self.COLOR_CARD, hover=self.COLOR_CARD_HOVER, pressed=self.COLOR_CARD_BG, radius=10
+        ))
+        resync_btn.clicked.connect(self.refresh_chat_display)
+        resync_btn.setFixedWidth(100)
+        
+        # [BARU] Dekripsi massal semua pesan teks yang belum didekripsi
+        self.decrypt_all_btn = QPushButton("🔓 Semua")
+        self.decrypt_all_btn.setToolTip("Dekripsi semua pesan teks (terlihat / seluruh chat) dengan satu kunci")
+        self.decrypt_all_btn.setStyleSheet(self.button_style(
+            base=self.COLOR_CARD, hover=self.COLOR_CARD_HOVER, pressed=self.COLOR_CARD_BG, radius=10
+        ))
+        self.decrypt_all_btn.clicked.connect(self.handle_decrypt_all)
+        self.decrypt_all_btn.setFixedWidth(100)
         
-        self.chat_display = QListWidget()
+        top_bar_layout.addWidget(back_btn); top_bar_layout.addWidget(title)
+        top_bar_layout.addWidget(self.decrypt_all_btn); top_bar_layout.addWidget(resync_btn)
+        
+        # [REVISI] QListView virtual: bubble digambar delegate, bukan satu QWidget per pesan
+        self.chat_model = ChatMessageModel(self.get_message_id, self)
+        self.chat_display = QListView()
+        self.chat_display.setModel(self.chat_model)
+        self.chat_delegate = ChatBubbleDelegate(self, self.chat_display)
+        self.chat_display.setItemDelegate(self.chat_delegate)
+        # Resync/clear memberi seq baru ke semua baris: buang cache sizeHint lama
+        self.chat_model.modelReset.connect(self.chat_delegate.invalidate)
+        self.chat_display.setResizeMode(QListView.ResizeMode.Adjust)
+        self.chat_display.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
         self.chat_display.setStyleSheet(f"""
-            QListWidget {{ 
+            QListView {{ 
                 background-color: {self.COLOR_PANE_LEFT}; 
                 border: 2px solid {self.COLOR_GOLD};
                 border-radius: 12px; 
                 color: {self.COLOR_TEXT}; 
             }}
         """)
-        self.chat_display.setSelectionMode(QListWidget.SelectionMode.NoSelection)
+        self.chat_display.setSelectionMode(QListView.SelectionMode.NoSelection)
         self.chat_display.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         self.chat_display.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
         self.chat_display.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         
-        self.chat_display.itemClicked.connect(self.on_chat_item_clicked)
+        self.chat_display.clicked.connect(self.on_chat_item_clicked)
 
         input_bar_layout = QHBoxLayout()
         self.attach_btn = QPushButton("🖼️ Gbr"); self.attach_btn.setToolTip("Sembunyikan teks dari input ke dalam Gambar (.png)")
@@ -177,43 +246,216 @@ class ChatPage(QWidget):
 
         input_bar_layout.addWidget(self.attach_btn); input_bar_layout.addWidget(self.attach_file_btn)
         input_bar_layout.addWidget(self.message_input); input_bar_layout.addWidget(self.send_btn)
-        layout.addLayout(top_bar_layout); layout.addWidget(self.chat_display); layout.addLayout(input_bar_layout)
+        # [BARU] Status unduhan yang sedang berjalan (disembunyikan jika tidak ada)
+        self.download_status_label = QLabel("")
+        self.download_status_label.setStyleSheet(f"color: {self.COLOR_TEXT_SUBTLE}; font-size: 9pt;")
+        self.download_status_label.hide()
+
+        layout.addLayout(top_bar_layout); layout.addWidget(self.chat_display)
+        layout.addWidget(self.download_status_label); layout.addLayout(input_bar_layout)
         
     # [INSTRUKSI 1] Fungsi baru untuk menghentikan timer saat keluar
     def handle_back_pressed(self):
-        """Hentikan QTimer polling sebelum memanggil callback kembali."""
-        if hasattr(self, 'poll_timer') and self.poll_timer.isActive():
-            self.poll_timer.stop()
-            print("ChatPage: Polling timer stopped.")
+        """Hentikan penjadwal polling sebelum memanggil callback kembali."""
+        self.poll_scheduler.stop()
+        print("ChatPage: Polling stopped.")
+        self.cancel_decrypt_all()
+        self.http.log_pool_stats()
         self.back_callback()
 
-    def load_and_display_chat_history(self):
-        # [REVISI]
-        self.chat_display.clear()
-        messages = self.message_manager.load_messages(self.chat_id)
+    def load_and_display_chat_history(self, messages):
+        # [REVISI] Rebuild penuh: reset state delta sync lalu tampilkan semua pesan
+        self.chat_model.clear()
+        self.displayed_message_ids = set()
+        self.last_seen_timestamp = None
+        self.append_messages(messages)
+
+    def append_messages(self, messages):
+        """
+        [BARU] Tambahkan bubble hanya untuk pesan yang belum tampil.
+        Mengembalikan jumlah bubble yang ditambahkan.
+        """
+        entries = []
         for msg_data in messages:
-            align = "sent" if msg_data['sender'] == self.current_user else "received"
+            self.update_last_seen(msg_data.get('db_timestamp'))
             message_id = self.get_message_id(msg_data)
+            if message_id and message_id in self.displayed_message_ids:
+                continue
+            
+            align = "sent" if msg_data['sender'] == self.current_user else "received"
             cached_data = self.message_cache.get(message_id)
             
-            self.add_message_to_display(align, msg_data, cached_data, is_loading_history=True)
+            entries.append(self.chat_model.message_entry(align, msg_data, cached_data))
+            if message_id:
+                self.displayed_message_ids.add(message_id)
+        # Satu sinyal insert untuk seluruh batch
+        self.chat_model.append_entries(entries)
+        return len(entries)
+
+    def update_last_seen(self, timestamp_iso):
+        """[BARU] Majukan watermark timestamp server terakhir yang sudah dilihat."""
+        new_dt = parse_timestamp(timestamp_iso)
+        if new_dt is None:
+            return
+        last_dt = parse_timestamp(self.last_seen_timestamp)
+        if last_dt is None or new_dt > last_dt:
+            self.last_seen_timestamp = timestamp_iso
+
+    def sync_new_messages(self):
+        """
+        [BARU] Delta sync: ambil hanya pesan setelah watermark terakhir
+        dan tambahkan bubble-nya tanpa membersihkan list.
+        Dijalankan lewat PollScheduler agar permintaan yang tumpang-tindih digabung.
+        """
+        self.poll_scheduler.request_now()
+
+    def start_sync(self):
+        """Dipanggil PollScheduler: mulai satu request (resync penuh atau delta sync) di executor."""
+        if self.full_resync_requested:
+            self.full_resync_requested = False
+            self.executor.submit(
+                self.message_manager.load_messages, self.chat_id,
+                on_result=self.on_history_loaded, on_error=self.on_resync_failed
+            )
+            return
+        self.executor.submit(
+            self.message_manager.load_messages, self.chat_id, since=self.last_seen_timestamp,
+            on_result=self.on_new_messages_loaded, on_error=self.on_sync_failed
+        )
+
+    def on_new_messages_loaded(self, messages):
+        scroll_bar = self.chat_display.verticalScrollBar()
+        is_at_bottom = scroll_bar.value() == scroll_bar.maximum()
+
+        added = self.append_messages(messages)
+
+        if added and is_at_bottom:
+            self.chat_display.scrollToBottom()
+        self.poll_scheduler.poll_finished(had_activity=bool(added))
+
+    def on_sync_failed(self, error):
+        print(f"ChatPage: Sinkronisasi gagal: {error}")
+        self.poll_scheduler.poll_finished(had_activity=False)
+
+    def on_push_message(self, chat_id):
+        """[BARU] Event push: ada pesan baru di sebuah chat."""
+        if chat_id == self.chat_id:
+            self.poll_scheduler.notify_activity()
+            self.sync_new_messages()
+
+    def on_push_connected(self):
+        self.poll_scheduler.set_push_connected(True)
+        # Tutup celah event yang mungkin terlewat saat push terputus
+        self.sync_new_messages()
+
+    def on_push_disconnected(self, reason):
+        self.poll_scheduler.set_push_connected(False)
+
+    # --- [BARU] Kesadaran fokus: jeda polling saat tidak terlihat ---
+    def on_application_state_changed(self, state):
+        self.poll_scheduler.set_paused("inactive", state != Qt.ApplicationState.ApplicationActive)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # WindowStateChange dikirim ke window top-level, bukan ke halaman ini
+        self.window().installEventFilter(self)
+        self.poll_scheduler.set_paused("hidden", False)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.poll_scheduler.set_paused("hidden", True)
+
+    def eventFilter(self, watched, event):
+        if watched is self.window() and event.type() == QEvent.Type.WindowStateChange:
+            self.poll_scheduler.set_paused("minimized", bool(watched.windowState() & Qt.WindowState.WindowMinimized))
+        return super().eventFilter(watched, event)
+
+    def find_index_by_message_id(self, message_id):
+        """[BARU] Cari index model milik sebuah pesan (baris lama bisa sudah dihapus oleh resync)."""
+        if not message_id: return None
+        return self.chat_model.index_for_message_id(message_id)
+
+    def upload_file(self, upload_name, file_content, mime_type, timeout):
+        """
+        [BARU] Unggah file ke server (blocking, panggil dari executor).
+        Mengembalikan file_id dari server.
+        """
+        files = {'file': (upload_name, file_content, mime_type)}
+        response = self.http.post(f"upload_file/{self.chat_id}", endpoint="upload", files=files, timeout=timeout)
+        if response.status_code != 200 or not response.json().get("success"):
+            if response.status_code == 413: raise Exception(f"Gagal unggah: {response.json().get('message')}")
+            raise Exception(f"Gagal mengunggah file: {response.json().get('message', 'Error tidak diketahui')}")
+        return response.json().get("file_id")
+
+    def upload_stream(self, upload_name, content_chunks, mime_type):
+        """
+        [BARU] Unggah iterator bytes sebagai multipart dengan Transfer-Encoding: chunked.
+        Memori tetap konstan berapa pun ukuran file. Mengembalikan file_id.
+        """
+        content_type, body = iter_multipart('file', upload_name, content_chunks, mime_type)
+        response = self.http.post(f"upload_file/{self.chat_id}", endpoint="upload",
+                                  data=body, headers={'Content-Type': content_type})
+        if response.status_code != 200 or not response.json().get("success"):
+            if response.status_code == 413: raise Exception(f"Gagal unggah: {response.json().get('message')}")
+            raise Exception(f"Gagal mengunggah file: {response.json().get('message', 'Error tidak diketahui')}")
+        return response.json().get("file_id")
+
+    def download_file(self, metadata, local_path, on_done, on_error):
+        """
+        [REVISI] Unduh lewat DownloadManager: streaming ke .part, resume via Range,
+        verifikasi SHA-256 jika metadata menyimpannya. Tidak memblokir chat.
+        """
+        file_id = metadata.get('file_id')
+        self.downloads.download(
+            self.download_key(file_id), f"download_file/{self.chat_id}/{file_id}", local_path,
+            expected_sha256=metadata.get('sha256'), on_done=on_done, on_error=on_error
+        )
+
+    def download_key(self, file_id):
+        return f"{self.chat_id}/{file_id}"
+
+    def on_download_progress(self, key, received, total):
+        if not key.startswith(f"{self.chat_id}/"): return
+        self.download_progress[key] = (received, total)
+        self.update_download_status()
+
+    def on_download_ended(self, key, _):
+        if self.download_progress.pop(key, None) is not None:
+            self.update_download_status()
+
+    def update_download_status(self):
+        if not self.download_progress:
+            self.download_status_label.hide(); return
+        received = sum(r for r, _ in self.download_progress.values())
+        totals = [t for _, t in self.download_progress.values()]
+        count = len(self.download_progress)
+        if all(totals):
+            percent = int(received * 100 / max(sum(totals), 1))
+            text = f"⬇ Mengunduh {count} file: {percent}% ({received // 1024} / {sum(totals) // 1024} KB)"
+        else:
+            text = f"⬇ Mengunduh {count} file: {received // 1024} KB"
+        self.download_status_label.setText(text)
+        self.download_status_label.show()
 
     def handle_send_message_super(self):
-        # [REVISI Timestamp]
+        # [REVISI] Pipeline enkripsi (termasuk Vigenere remote) berjalan di executor
         message_text = self.message_input.text() 
         if not message_text: return
         user_key, ok = QInputDialog.getText(self, "Kunci Super Enkripsi", "Masukkan Kunci (untuk Vigenere + White Mist):")
         if not (ok and user_key): return 
         self.message_input.clear()
-        try:
-            vigenere_encrypted_text = vigenere_encrypt(message_text, user_key)
+
+        def build_payload():
+            vigenere_encrypted_text = vigenere_encrypt(message_text, user_key, session=self.http)
             vigenere_encrypted_bytes = vigenere_encrypted_text.encode('utf-8')
             
             # [INSTRUKSI 1] Kirim 'is_text=True' karena ini adalah pesan teks
             whitemist_encrypted_string = encrypt_whitemist(vigenere_encrypted_bytes, user_key, is_text=True)
             
             data_bytes_for_aes = whitemist_encrypted_string.encode('utf-8')
-            encrypted_payload_bytes = self.session_crypto.encrypt(data_bytes_for_aes)
+            return self.session_crypto.encrypt(data_bytes_for_aes)
+
+        def on_encrypted(encrypted_payload_bytes):
             metadata = { 
                 'type': 'text', 
                 'sender': self.current_user, 
@@ -227,12 +469,15 @@ class ChatPage(QWidget):
             self.save_to_cache(message_id, message_text)
             
             self.add_message_to_display("sent", metadata, cached_data=message_text)
-            
-        except Exception as e: 
+            self.poll_scheduler.notify_activity()
+
+        def on_error(e):
             self.add_message_to_display("error", metadata=None, error_text=f"--- Error Super Enkripsi: {e} ---")
 
+        self.executor.submit(build_payload, on_result=on_encrypted, on_error=on_error)
+
     def handle_attach_image_stegano(self):
-        # [REVISI Timestamp & Request #2]
+        # [REVISI] Vigenere, penyisipan LSB, dan upload berjalan di executor
         message_to_hide = self.message_input.text()
         if not message_to_hide:
             QMessageBox.warning(self, "Error", "Tulis dulu pesan di kotak teks untuk disembunyikan ke gambar.")
@@ -250,21 +495,38 @@ class ChatPage(QWidget):
         if not os.path.exists(self.temp_stegano_dir): os.makedirs(self.temp_stegano_dir)
         base_filename = os.path.basename(file_path)
         temp_filename = os.path.join(self.temp_stegano_dir, f"stego_{uuid.uuid4()}.png") 
-        try:
-            encrypted_text_to_hide = vigenere_encrypt(message_to_hide, text_key)
-            secret_image = lsb.hide(file_path, encrypted_text_to_hide)
-            secret_image.save(temp_filename)
-            
-            self.add_message_to_display("error", metadata=None, error_text=f"--- Mengunggah {base_filename}... ---")
-            
-            with open(temp_filename, "rb") as f:
-                files = {'file': (base_filename, f, 'image/png')}
-                upload_url = f"{self.api_url}/upload_file/{self.chat_id}"
-                response = requests.post(upload_url, files=files, timeout=30)
-            if response.status_code != 200 or not response.json().get("success"):
-                if response.status_code == 413: raise Exception(f"Gagal unggah: {response.json().get('message')}")
-                raise Exception(f"Gagal mengunggah file: {response.json().get('message', 'Error tidak diketahui')}")
-            file_id = response.json().get("file_id")
+        
+        self.add_message_to_display("error", metadata=None, error_text=f"--- Mengunggah {base_filename}... ---")
+        self.message_input.clear()
+
+        def hide_and_upload():
+            try:
+                from stegano import lsb  # [REVISI] Impor malas: hanya saat pesan stegano dibuat/dibuka
+                encrypted_text_to_hide = vigenere_encrypt(message_to_hide, text_key, session=self.http)
+                secret_image = lsb.hide(file_path, encrypted_text_to_hide)
+                secret_image.save(temp_filename)
+                
+                with open(temp_filename, "rb") as f:
+                    file_id = self.upload_file(base_filename, f, 'image/png', timeout=30)
+                with open(temp_filename, "rb") as f:
+                    file_sha256 = hashlib.sha256(f.read()).hexdigest()
+                
+                # [PERBAIKAN] Tentukan path cache menggunakan file_id yang unik dari server
+                cached_stego_path = os.path.join(self.temp_stegano_dir, file_id) 
+                try:
+                    # Salin file stego (temp_filename) ke cache, BUKAN file asli (file_path)
+                    if not os.path.exists(cached_stego_path):
+                        import shutil
+                        # [PERBAIKAN] Salin file yang SUDAH ADA PESANNYA (temp_filename)
+                        shutil.copy(temp_filename, cached_stego_path) 
+                except Exception as e:
+                    print(f"Gagal cache stego path: {e}")
+                return file_id, cached_stego_path, file_sha256
+            finally:
+                if os.path.exists(temp_filename): os.remove(temp_filename)
+
+        def on_uploaded(result):
+            file_id, cached_stego_path, file_sha256 = result
             metadata = { 
                 'type': 'stegano', 
                 'sender': self.current_user, 
@@ -272,6 +534,7 @@ class ChatPage(QWidget):
                 'data': None, 
                 'file_id': file_id, 
                 'filename': base_filename, 
+                'sha256': file_sha256, # [BARU] Verifikasi integritas saat diunduh penerima
                 'text_key_debug': text_key,
                 'db_timestamp': datetime.now(timezone.utc).astimezone().isoformat()
             }
@@ -279,92 +542,101 @@ class ChatPage(QWidget):
             
             # [REQUEST #2] Simpan ke cache agar thumbnail pengirim muncul
             message_id = self.get_message_id(metadata)
-            
-            # [PERBAIKAN] Tentukan path cache menggunakan file_id yang unik dari server
-            cached_stego_path = os.path.join(self.temp_stegano_dir, file_id) 
-            
-            try:
-                # Salin file stego (temp_filename) ke cache, BUKAN file asli (file_path)
-                if not os.path.exists(cached_stego_path):
-                    import shutil
-                    # [PERBAIKAN] Salin file yang SUDAH ADA PESANNYA (temp_filename)
-                    shutil.copy(temp_filename, cached_stego_path) 
-            except Exception as e:
-                print(f"Gagal cache stego path: {e}")
-            
             cache_data = {"text": message_to_hide, "image_path": cached_stego_path} 
             self.save_to_cache(message_id, cache_data)
 
             self.add_message_to_display("sent", metadata, cached_data=cache_data)
-            
-            self.message_input.clear()
-            os.remove(temp_filename)
-        except Exception as e:
+
+        def on_error(e):
             self.add_message_to_display("error", metadata=None, error_text=f"--- Error Steganografi/Upload: {e} ---")
-            if os.path.exists(temp_filename): os.remove(temp_filename)
+
+        self.executor.submit(hide_and_upload, on_result=on_uploaded, on_error=on_error)
 
     def handle_attach_file(self):
-        # [REVISI Timestamp]
+        # [REVISI] AES (chunked AES-GCM) dan White-Mist (mode biner) kini streaming
+        # + upload chunked: memori konstan, tanpa batas 2MB.
         file_path, _ = QFileDialog.getOpenFileName(self, "Pilih File Untuk Dienkripsi", "", "All Files (*.*)")
         if not file_path: return
-        try:
-            file_size = os.path.getsize(file_path)
-            if file_size > self.MAX_FILE_SIZE:
-                QMessageBox.warning(self, "File Terlalu Besar", f"Ukuran file ({file_size // 1024} KB) melebihi batas 2MB ({self.MAX_FILE_SIZE // 1024} KB).")
-                return
-        except OSError as e: QMessageBox.critical(self, "Error", f"Tidak dapat membaca file: {e}")
+        if not os.access(file_path, os.R_OK):
+            QMessageBox.critical(self, "Error", f"Tidak dapat membaca file: {file_path}"); return
         methods = ["AES (Modern)", "White-Mist (Eksperimental)"]
         method, ok = QInputDialog.getItem(self, "Pilih Metode Enkripsi", "Metode:", methods, 0, False)
         if not ok: return
         key, ok = QInputDialog.getText(self, f"Kunci Enkripsi ({method})", f"Masukkan Kunci untuk {method}:", QLineEdit.Password)
         if not (ok and key): return
-        try:
-            with open(file_path, "rb") as f: data_bytes = f.read()
-            filename = os.path.basename(file_path)
-            encrypted_payload_bytes = None; metadata = {}
-            if method == "AES (Modern)":
-                temp_crypto = CryptoEngine(key); encrypted_payload_bytes = temp_crypto.encrypt(data_bytes)
-                metadata = { 'type': 'file', 'sender': self.current_user, 'recipient': self.recipient_username, 'data': None, 'encryption_method': 'aes', 'aes_key_debug': key, 'filename': filename }
-            elif method == "White-Mist (Eksperimental)":
-                # [INSTRUKSI 1] Ini adalah file, JANGAN kirim 'is_text=True'. Default (False) akan digunakan (Base64).
-                encrypted_string = encrypt_whitemist(data_bytes, key); encrypted_payload_bytes = encrypted_string.encode('utf-8')
-                metadata = { 'type': 'file', 'sender': self.current_user, 'recipient': self.recipient_username, 'data': None, 'encryption_method': 'whitemist', 'aes_key_debug': key, 'filename': filename }
-            else: return 
-            
-            self.add_message_to_display("error", metadata=None, error_text=f"--- Mengunggah {filename} ({method})... ---")
-            
-            files = {'file': (f"{filename}.enc", encrypted_payload_bytes, 'application/octet-stream')}
-            upload_url = f"{self.api_url}/upload_file/{self.chat_id}"
-            response = requests.post(upload_url, files=files, timeout=60)
-            if response.status_code != 200 or not response.json().get("success"):
-                if response.status_code == 413: raise Exception(f"Gagal unggah: {response.json().get('message')}")
-                raise Exception(f"Gagal mengunggah file: {response.json().get('message', 'Error tidak diketahui')}")
-            file_id = response.json().get("file_id")
+        
+        filename = os.path.basename(file_path)
+        if method == "AES (Modern)":
+            encryption_method = 'aes-stream'
+        elif method == "White-Mist (Eksperimental)":
+            # [REVISI] Mode biner memakai tag sendiri agar klien lama tidak salah membaca;
+            # jika modul WhiteMist tidak mendukungnya, kembali ke format teks lama
+            encryption_method = 'whitemist-bin' if whitemist_binary_supported(key) else 'whitemist'
+        else: return 
+        metadata = { 'type': 'file', 'sender': self.current_user, 'recipient': self.recipient_username, 'data': None, 'encryption_method': encryption_method, 'aes_key_debug': key, 'filename': filename }
+        
+        self.add_message_to_display("error", metadata=None, error_text=f"--- Mengunggah {filename} ({method})... ---")
+
+        def encrypt_and_upload():
+            # [BARU] SHA-256 dari ciphertext yang diunggah ikut disimpan di metadata (verifikasi unduhan)
+            hasher = hashlib.sha256()
+            def hashed(chunks):
+                for chunk in chunks:
+                    hasher.update(chunk); yield chunk
+            with open(file_path, "rb") as f:
+                if encryption_method == 'aes-stream':
+                    encrypted_chunks = CryptoEngine(key).encrypt_stream(f)
+                elif encryption_method == 'whitemist-bin':
+                    # [REVISI] White-Mist mode biner: bytes langsung, tanpa base64/str perantara
+                    encrypted_chunks = iter_whitemist_encrypt(f, key)
+                else:
+                    # Format teks lama: base64 -> letsEncrypt, seluruh file di memori
+                    encrypted_chunks = [encrypt_whitemist(f.read(), key).encode('utf-8')]
+                file_id = self.upload_stream(f"{filename}.enc", hashed(encrypted_chunks), 'application/octet-stream')
+            return file_id, hasher.hexdigest()
+
+        def on_uploaded(result):
+            file_id, file_sha256 = result
             metadata['file_id'] = file_id 
+            metadata['sha256'] = file_sha256
             metadata['db_timestamp'] = datetime.now(timezone.utc).astimezone().isoformat()
             
             self.message_manager.save_message(self.chat_id, metadata)
             
             self.add_message_to_display("sent", metadata)
-            
-        except Exception as e: 
+
+        def on_error(e):
             self.add_message_to_display("error", metadata=None, error_text=f"--- Error File Encryption/Upload: {e} ---")
 
+        self.executor.submit(encrypt_and_upload, on_result=on_uploaded, on_error=on_error)
+
     def refresh_chat_display(self):
-        """Membersihkan dan memuat ulang seluruh riwayat chat."""
+        """
+        [REVISI] Resync eksplisit: membersihkan dan memuat ulang seluruh riwayat chat.
+        Dijalankan lewat PollScheduler seperti delta sync: tidak berjalan bersamaan
+        dengan poll yang masih in-flight, dan klik berulang digabung menjadi satu.
+        """
+        self.full_resync_requested = True
+        self.poll_scheduler.request_now()
+
+    def on_resync_failed(self, error):
+        print(f"ChatPage: Resync gagal: {error}")
+        self.poll_scheduler.poll_finished(had_activity=False)
+
+    def on_history_loaded(self, messages):
         scroll_bar = self.chat_display.verticalScrollBar()
         old_value = scroll_bar.value()
         is_at_bottom = old_value == scroll_bar.maximum()
 
         # [INSTRUKSI 1] Simpan jumlah item saat ini sebelum me-refresh
-        old_item_count = self.chat_display.count()
+        old_item_count = self.chat_model.rowCount()
 
-        self.load_and_display_chat_history()
+        self.load_and_display_chat_history(messages)
         
         # [PERBAIKAN] Paksa update layout setelah memuat ulang
         QApplication.processEvents()
 
-        new_item_count = self.chat_display.count()
+        new_item_count = self.chat_model.rowCount()
 
         # [INSTRUKSI 1] Logika scroll yang disempurnakan
         if is_at_bottom or (new_item_count > old_item_count):
@@ -374,347 +646,290 @@ class ChatPage(QWidget):
         else:
             # Jika tidak, kembalikan posisi scroll (misalnya saat dekripsi)
             scroll_bar.setValue(old_value)
+        self.poll_scheduler.poll_finished(had_activity=new_item_count > old_item_count)
 
-    def show_loading_dialog(self, filename):
-        # [UI Loading TIDAK BERUBAH]
-        dialog = QDialog(self)
-        dialog.setModal(True)
-        dialog.setWindowTitle("Mengunduh...")
-        dialog.setStyleSheet(f"background-color: {self.COLOR_BACKGROUND}; color: {self.COLOR_TEXT}; font-size: 14px;")
-        layout = QVBoxLayout()
-        label = QLabel(f"Sedang mengunduh file:\n{filename}\n\nHarap tunggu...")
-        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(label)
-        dialog.setLayout(layout)
-        dialog.setFixedSize(300, 150)
-        
-        dialog.show()
-        QApplication.processEvents() 
-        return dialog
-
-    def on_chat_item_clicked(self, item):
-        # [REVISI REQUEST #3]
-        metadata = item.data(Qt.UserRole)
+    def on_chat_item_clicked(self, index):
+        # [REVISI] Semua unduhan & dekripsi berjalan di executor; dialog tetap di thread GUI
+        metadata = index.data(Qt.UserRole)
         if not metadata: return
         
-        msg_box = QMessageBox(self)
         msg_type = metadata.get('type')
         file_id = metadata.get('file_id')
         
+        if msg_type == 'text':
+            self.decrypt_text_message(metadata)
+        elif msg_type == 'file' and file_id:
+            self.open_file_message(metadata)
+        elif msg_type == 'stegano' and file_id:
+            self.open_stegano_message(metadata)
+
+    def show_decrypt_error(self, metadata, e):
+        print(f"Error di on_chat_item_clicked: {e}")
+        debug_key = metadata.get('aes_key_debug') or metadata.get('text_key_debug', 'TIDAK DIKETAHUI')
+        QMessageBox.critical(self, "Error Dekripsi", f"Terjadi error: {e}\n\n(Debug: Kunci yg benar mungkin '{debug_key}')")
+
+    def decrypt_text_message(self, metadata):
+        message_id = self.get_message_id(metadata)
+        
+        # [REQUEST #4] Izinkan dekripsi ulang, termasuk pesan sendiri
+        encrypted_data_b64 = metadata.get('data')
+        if not encrypted_data_b64:
+            # Ini adalah pesan yang sudah didekripsi (mungkin dari cache)
+            # tapi tombol refresh tetap ditekan
+            QMessageBox.information(self, "Info", "Pesan ini sudah dalam bentuk teks biasa.")
+            return
+        
+        encrypted_data_b64 = encrypted_data_b64.encode('utf-8')
+        key, ok = QInputDialog.getText(self, "Dekripsi Teks", "Masukkan Kunci (White-Mist + Vigenere):")
+        if not (ok and key): return
+
+        def on_decrypted(result):
+            decrypted_text, verified = result
+            if message_id and verified:
+                self.save_to_cache(message_id, decrypted_text)
+                index = self.find_index_by_message_id(message_id)
+                if index is not None: self.update_message_bubble(index)
+            else:
+                # Hasil gagal/"gajo" hanya ditampilkan, tidak pernah disimpan ke cache
+                self.chat_model.set_cached(message_id, decrypted_text)
+
+        self.executor.submit(self.decrypt_text_payload, encrypted_data_b64, key,
+                             on_result=on_decrypted, on_error=lambda e: self.show_decrypt_error(metadata, e))
+
+    def decrypt_text_payload(self, encrypted_data_b64, key):
+        """
+        Pipeline dekripsi teks: AES sesi -> White-Mist -> Vigenere.
+        Blocking; dipanggil dari executor. Mengembalikan (teks, terverifikasi).
+        [REVISI] 'terverifikasi' hanya True jika semua tahap berhasil tanpa fallback
+        dan hasil White-Mist berupa teks tercetak (kunci salah menghasilkan karakter
+        kontrol); hanya hasil seperti ini yang boleh masuk cache.
+        """
         try:
-            if msg_type == 'text':
-                message_id = self.get_message_id(metadata)
-                
-                # [REQUEST #4] Izinkan dekripsi ulang, termasuk pesan sendiri
-                # if metadata['sender'] == self.current_user: 
-                #     return
-
-                encrypted_data_b64 = metadata.get('data')
-                if not encrypted_data_b64:
-                    # Ini adalah pesan yang sudah didekripsi (mungkin dari cache)
-                    # tapi tombol refresh tetap ditekan
-                    QMessageBox.information(self, "Info", "Pesan ini sudah dalam bentuk teks biasa.")
-                    return
-                
-                encrypted_data_b64 = encrypted_data_b64.encode('utf-8')
-                key, ok = QInputDialog.getText(self, "Dekripsi Teks", "Masukkan Kunci (White-Mist + Vigenere):")
-                
-                if ok and key:
-                    decrypted_text = ""
-                    try:
-                        decrypted_bytes_from_aes = self.session_crypto.decrypt(encrypted_data_b64)
-                        whitemist_encrypted_string = decrypted_bytes_from_aes.decode('utf-8')
-                        
-                        try:
-                            # [INSTRUKSI 1] Kirim 'is_text=True' karena ini adalah pesan teks
-                            vigenere_encrypted_bytes = decrypt_whitemist(whitemist_encrypted_string, key, is_text=True)
-                            vigenere_encrypted_text = vigenere_encrypted_bytes.decode('utf-8')
-                        except Exception as e_whitemist:
-                            # [REQUEST #3] Gagal WhiteMist, siapkan output "gajo"
-                            print(f"Error WhiteMist/b64: {e_whitemist}")
-                            vigenere_encrypted_text = whitemist_encrypted_string 
-
-                        decrypted_text = vigenere_decrypt(vigenere_encrypted_text, key)
-                    
-                    except Exception as e_aes:
-                        print(f"Error AES: {e_aes}")
-                        decrypted_text = f"[DEKRIPSI GAGAL: Data korup atau kunci sesi salah.]"
-                    
-                    if message_id: 
-                        self.save_to_cache(message_id, decrypted_text)
-                    
-                    self.refresh_chat_display()
-
-            elif msg_type == 'file' and file_id:
-                # [Logika File TIDAK BERUBAH]
-                local_encrypted_path = os.path.join(self.temp_download_dir, file_id)
-                filename = metadata.get('filename', 'file.enc')
-                
-                if not os.path.exists(local_encrypted_path):
-                    loading_dialog = self.show_loading_dialog(filename)
-                    download_url = f"{self.api_url}/download_file/{self.chat_id}/{file_id}"
-                    response = requests.get(download_url, timeout=60)
-                    loading_dialog.close() 
-                    if response.status_code != 200: raise Exception("Gagal mengunduh file dari server.")
-                    with open(local_encrypted_path, "wb") as f: f.write(response.content)
-                    self.add_message_to_display("error", metadata=None, error_text=f"--- Unduhan Selesai. Disimpan di cache. ---")
-                else:
-                    self.add_message_to_display("error", metadata=None, error_text=f"--- Membuka {filename} dari cache... ---")
+            decrypted_bytes_from_aes = self.session_crypto.decrypt(encrypted_data_b64)
+            whitemist_encrypted_string = decrypted_bytes_from_aes.decode('utf-8')
+            
+            try:
+                # [INSTRUKSI 1] Kirim 'is_text=True' karena ini adalah pesan teks
+                vigenere_encrypted_bytes = decrypt_whitemist(whitemist_encrypted_string, key, is_text=True)
+                vigenere_encrypted_text = vigenere_encrypted_bytes.decode('utf-8')
+                verified = is_printable_text(vigenere_encrypted_text)
+            except Exception as e_whitemist:
+                # [REQUEST #3] Gagal WhiteMist, siapkan output "gajo"
+                print(f"Error WhiteMist/b64: {e_whitemist}")
+                vigenere_encrypted_text = whitemist_encrypted_string 
+                verified = False
 
-                key, ok = QInputDialog.getText(self, "Dekripsi File", "Masukkan Kunci untuk file ini:", QLineEdit.Password)
-                if not (ok and key): return
-                
-                with open(local_encrypted_path, "rb") as f: encrypted_bytes = f.read()
-                decrypted_bytes = None; method = metadata.get('encryption_method', 'aes')
-                
-                if method == 'aes':
-                    self.add_message_to_display("error", metadata=None, error_text=f"--- Mendekripsi (AES)... ---")
-                    temp_crypto = CryptoEngine(key); decrypted_bytes = temp_crypto.decrypt(encrypted_bytes)
-                elif method == 'whitemist':
-                    self.add_message_to_display("error", metadata=None, error_text=f"--- Mendekripsi (White-Mist)... ---")
-                    encrypted_string = encrypted_bytes.decode('utf-8'); 
-                    # [INSTRUKSI 1] Ini adalah file, JANGAN kirim 'is_text=True'. Default (False) akan digunakan (Base64).
-                    decrypted_bytes = decrypt_whitemist(encrypted_string, key)
-                else: raise ValueError(f"Metode enkripsi '{method}' tidak dikenal.")
-                
+            try:
+                return vigenere_decrypt(vigenere_encrypted_text, key, session=self.http, strict=True), verified
+            except ValueError:
+                # Server Vigenere gagal: tampilkan input apa adanya, jangan di-cache
+                return vigenere_encrypted_text, False
+        
+        except Exception as e_aes:
+            print(f"Error AES: {e_aes}")
+            return f"[DEKRIPSI GAGAL: Data korup atau kunci sesi salah.]", False
+
+    def collect_undecrypted_text_messages(self, visible_only):
+        """[BARU] Metadata pesan teks yang belum ada di cache (opsional: hanya yang terlihat)."""
+        viewport_rect = self.chat_display.viewport().rect()
+        pending = []
+        for row in range(self.chat_model.rowCount()):
+            index = self.chat_model.index(row)
+            metadata = index.data(Qt.UserRole)
+            if not metadata or metadata.get('type') != 'text' or not metadata.get('data'):
+                continue
+            message_id = self.get_message_id(metadata)
+            if message_id in self.message_cache:
+                continue
+            if visible_only and not self.chat_display.visualRect(index).intersects(viewport_rect):
+                continue
+            pending.append(metadata)
+        return pending
+
+    def handle_decrypt_all(self):
+        """
+        [BARU] Dekripsi massal: pesan dibagi menjadi beberapa grup yang dijalankan di
+        pool khusus (decrypt_executor), bubble diperbarui per grup, dan cache ditulis
+        sekali di akhir. Bisa dibatalkan (cancel_decrypt_all) di antara pesan.
+        Setiap pesan tetap satu panggilan Vigenere ke server (tidak ada API batch);
+        grup hanya mengurangi jumlah task dan pembaruan GUI.
+        Hanya hasil terverifikasi yang disimpan; hasil gagal (mis. kunci salah)
+        hanya ditampilkan sehingga pesan itu tetap ikut dekripsi massal berikutnya.
+        """
+        scopes = ["Pesan yang terlihat", "Seluruh chat"]
+        scope, ok = QInputDialog.getItem(self, "Dekripsi Semua", "Cakupan:", scopes, 0, False)
+        if not ok: return
+        pending = self.collect_undecrypted_text_messages(visible_only=(scope == scopes[0]))
+        if not pending:
+            QMessageBox.information(self, "Info", "Tidak ada pesan teks yang perlu didekripsi.")
+            return
+        key, ok = QInputDialog.getText(self, "Dekripsi Semua", "Masukkan Kunci (White-Mist + Vigenere):")
+        if not (ok and key): return
+
+        self.decrypt_all_btn.setEnabled(False)
+        job = {"cancelled": False}
+        self.decrypt_all_job = job
+        results = {}
+        batches = [pending[i:i + self.DECRYPT_ALL_BATCH] for i in range(0, len(pending), self.DECRYPT_ALL_BATCH)]
+        remaining = [len(batches)]
+
+        def decrypt_batch(batch):
+            decrypted = []
+            for metadata in batch:
+                if job["cancelled"]:
+                    break
+                try:
+                    text, verified = self.decrypt_text_payload(metadata['data'].encode('utf-8'), key)
+                except Exception as e:
+                    print(f"ChatPage: Dekripsi massal gagal untuk satu pesan: {e}")
+                    continue
+                decrypted.append((self.get_message_id(metadata), text, verified))
+            return decrypted
+
+        def on_batch_done(decrypted):
+            for message_id, decrypted_text, verified in decrypted or []:
+                if not verified:
+                    self.chat_model.set_cached(message_id, decrypted_text)
+                    continue
+                results[message_id] = decrypted_text
+                # Tampilkan segera; cache ditulis sekali setelah semua selesai
+                self.message_cache[message_id] = decrypted_text
+                index = self.find_index_by_message_id(message_id)
+                if index is not None: self.update_message_bubble(index)
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                self.save_many_to_cache(results)
+                if self.decrypt_all_job is job:
+                    self.decrypt_all_job = None
+                self.decrypt_all_btn.setEnabled(True)
+                status = "dibatalkan" if job["cancelled"] else "selesai"
+                print(f"ChatPage: Dekripsi massal {status} ({len(results)}/{len(pending)} pesan).")
+
+        for batch in batches:
+            self.decrypt_executor.submit(decrypt_batch, batch,
+                                         on_result=on_batch_done, on_error=lambda e: on_batch_done(None))
+
+    def cancel_decrypt_all(self):
+        """[BARU] Hentikan dekripsi massal yang sedang berjalan (hasil yang sudah ada tetap disimpan)."""
+        if self.decrypt_all_job is not None:
+            self.decrypt_all_job["cancelled"] = True
+
+    def open_file_message(self, metadata):
+        # [Logika File TIDAK BERUBAH, kini non-blocking]
+        file_id = metadata.get('file_id')
+        local_encrypted_path = os.path.join(self.temp_download_dir, file_id)
+        filename = metadata.get('filename', 'file.enc')
+
+        def on_ready(_):
+            key, ok = QInputDialog.getText(self, "Dekripsi File", "Masukkan Kunci untuk file ini:", QLineEdit.Password)
+            if not (ok and key): return
+            method = metadata.get('encryption_method', 'aes')
+            if method in ('aes', 'aes-stream'):
+                self.add_message_to_display("error", metadata=None, error_text=f"--- Mendekripsi (AES)... ---")
+            elif method in ('whitemist', 'whitemist-bin'):
+                self.add_message_to_display("error", metadata=None, error_text=f"--- Mendekripsi (White-Mist)... ---")
+
+            def decrypt_to_disk():
+                # [REVISI] Dekripsi streaming: ciphertext -> file output per chunk (memori terbatas),
+                # ditulis ke file sementara dan di-rename setelah terverifikasi.
                 decrypted_path = os.path.join(self.temp_decrypted_dir, f"DECRYPTED_{filename}")
-                with open(decrypted_path, "wb") as f: f.write(decrypted_bytes)
-                
+                if method in ('aes', 'aes-stream'):
+                    return CryptoEngine(key).decrypt_file(local_encrypted_path, decrypted_path)
+                elif method in ('whitemist', 'whitemist-bin'):
+                    # Format (biner/teks) dikenali dari MAGIC di awal file
+                    return decrypt_whitemist_file(local_encrypted_path, decrypted_path, key)
+                else: raise ValueError(f"Metode enkripsi '{method}' tidak dikenal.")
+
+            def on_decrypted(decrypted_path):
+                msg_box = QMessageBox(self)
                 msg_box.setWindowTitle("File Didekripsi"); msg_box.setText(f"File '{filename}' ({method}) berhasil didekripsi!")
                 msg_box.setInformativeText(f"Disimpan di: {decrypted_path}"); msg_box.exec()
 
-            elif msg_type == 'stegano' and file_id:
-                # [Logika Stegano TIDAK BERUBAH]
-                filename = metadata.get('filename', f"{file_id}.png")
-                local_stegano_path = os.path.join(self.temp_stegano_dir, file_id) 
-                
-                if not os.path.exists(local_stegano_path):
-                    loading_dialog = self.show_loading_dialog(filename)
-                    download_url = f"{self.api_url}/download_file/{self.chat_id}/{file_id}"
-                    response = requests.get(download_url, timeout=60)
-                    loading_dialog.close() 
-                    if response.status_code != 200: raise Exception("Gagal mengunduh gambar dari server.")
-                    with open(local_stegano_path, "wb") as f: f.write(response.content)
-                    self.add_message_to_display("error", metadata=None, error_text=f"--- Gambar diterima. Disimpan di cache. ---")
-                else:
-                    self.add_message_to_display("error", metadata=None, error_text=f"--- Membuka gambar {filename} dari cache... ---")
-
-                msg_box.setWindowTitle("Pesan Gambar Diterima")
-                pixmap = QPixmap(local_stegano_path).scaled(400, 400, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                msg_box.setIconPixmap(pixmap)
-                msg_box.setText("Gambar diterima. Ingin mendekripsi teks tersembunyi di dalamnya?")
-                decrypt_button = msg_box.addButton("Dekripsi Teks Tersembunyi", QMessageBox.AcceptRole)
-                msg_box.addButton(QMessageBox.Close); msg_box.exec()
-                
-                if msg_box.clickedButton() == decrypt_button:
-                    key, ok = QInputDialog.getText(self, "Dekripsi Steganografi", "Masukkan Kunci VIGENERE untuk teks tersembunyi:")
-                    if ok and key:
-                        revealed_encrypted_text = lsb.reveal(local_stegano_path) 
-                        if not revealed_encrypted_text:
-                            QMessageBox.warning(self, "Gagal", "Tidak ada pesan tersembunyi yang ditemukan di gambar ini.")
-                            return
-                        
-                        decrypted_message = vigenere_decrypt(revealed_encrypted_text, key)
-                        
-                        message_id = self.get_message_id(metadata)
-                        if message_id:
-                            cache_data = {"text": decrypted_message, "image_path": local_stegano_path}
-                            self.save_to_cache(message_id, cache_data)
-                        
-                        QMessageBox.information(self, "Teks Terungkap", f"Pesan tersembunyi adalah:\n\n{decrypted_message}")
-                        
-                        self.refresh_chat_display()
-
-        except Exception as e:
-            print(f"Error di on_chat_item_clicked: {e}")
-            debug_key = metadata.get('aes_key_debug') or metadata.get('text_key_debug', 'TIDAK DIKETAHUI')
-            QMessageBox.critical(self, "Error Dekripsi", f"Terjadi error: {e}\n\n(Debug: Kunci yg benar mungkin '{debug_key}')")
-
-    def create_chat_bubble(self, align, metadata, cached_data=None, item=None):
-        """Membuat widget bubble chat kustom dengan ukuran minimal dan maksimal yang disesuaikan."""
-        
-        bubble_container = QWidget()
-        container_layout = QHBoxLayout(bubble_container)
-        container_layout.setContentsMargins(5, 5, 5, 5)
-        container_layout.setSpacing(0)
-
-        bubble_frame = QFrame()
-        bubble_frame.setFrameShape(QFrame.Shape.StyledPanel)
-        bubble_frame.setFrameShadow(QFrame.Shadow.Plain)
-        bubble_frame.setLineWidth(0)
-        
-        # Set kebijakan ukuran minimum dan maksimal yang konsisten
-        bubble_frame.setSizePolicy(QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Minimum)
-        
-        # Set lebar minimal dan maksimal relatif terhadap lebar window
-        bubble_frame.setMinimumWidth(self.width() * 0.3)  # Minimal 30% lebar window
-        bubble_frame.setMaximumWidth(self.width() * 0.7)  # Maksimal 70% lebar window
+            self.executor.submit(decrypt_to_disk, on_result=on_decrypted, on_error=lambda e: self.show_decrypt_error(metadata, e))
 
-        bubble_content_layout = QVBoxLayout(bubble_frame)
-        bubble_content_layout.setContentsMargins(12, 10, 12, 8)  # Padding internal yang lebih besar
-        bubble_content_layout.setSpacing(8)  # Jarak antar elemen yang lebih besar
-        
-        msg_type = metadata.get('type', 'unknown')
-        
-        # [INSTRUKSI 2] Hitung lebar maks konten (70% lebar window - padding L/R)
-        # Padding adalah 12px kiri + 12px kanan = 24px
-        content_max_width = (self.width() * 0.7) - 24
-        
-        # [INSTRUKSI 3] Tambahkan label "YOU" untuk pengirim
-        if align == "sent":
-            name_label = QLabel("YOU")
-            name_label.setFont(QFont("Segoe UI", 10, QFont.Bold))
-            name_label.setStyleSheet(f"color: {self.COLOR_GOLD};")
-            bubble_content_layout.addWidget(name_label)
-        elif align == "received":
-            prefix = metadata.get('sender', 'Unknown')
-            name_label = QLabel(prefix)
-            name_label.setFont(QFont("Segoe UI", 10, QFont.Bold))
-            name_label.setStyleSheet(f"color: {self.COLOR_GOLD};")
-            bubble_content_layout.addWidget(name_label)
-        
-        if msg_type == 'text':
-            display_text = cached_data if cached_data else "[Pesan Teks Super-Terenkripsi]"
-            content_label = QLabel(display_text)
-            content_label.setWordWrap(True)
-            content_label.setMaximumWidth(content_max_width) # [INSTRUKSI 2] Terapkan lebar maks
-            content_label.setStyleSheet(f"color: {self.COLOR_TEXT}; font-size: 14px;")
-            content_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-            content_label.setMinimumHeight(30)  # Tinggi minimal untuk text
-            bubble_content_layout.addWidget(content_label)
-
-        elif msg_type == 'stegano':
-            filename = metadata.get('filename', 'unknown.png')
-            if cached_data and isinstance(cached_data, dict):
-                secret_text = cached_data.get('text', '[ERROR CACHE]')
-                image_path = cached_data.get('image_path')
+        if not os.path.exists(local_encrypted_path):
+            self.add_message_to_display("error", metadata=None, error_text=f"--- Mengunduh {filename}... ---")
+            def on_downloaded(path):
+                self.add_message_to_display("error", metadata=None, error_text=f"--- Unduhan Selesai. Disimpan di cache. ---")
+                on_ready(path)
+            self.download_file(metadata, local_encrypted_path, on_done=on_downloaded,
+                               on_error=lambda e: self.show_decrypt_error(metadata, e))
+        else:
+            self.add_message_to_display("error", metadata=None, error_text=f"--- Membuka {filename} dari cache... ---")
+            on_ready(local_encrypted_path)
+
+    def open_stegano_message(self, metadata):
+        # [Logika Stegano TIDAK BERUBAH, kini non-blocking]
+        file_id = metadata.get('file_id')
+        filename = metadata.get('filename', f"{file_id}.png")
+        local_stegano_path = os.path.join(self.temp_stegano_dir, file_id) 
+
+        def on_ready(_):
+            msg_box = QMessageBox(self)
+            msg_box.setWindowTitle("Pesan Gambar Diterima")
+            pixmap = QPixmap(local_stegano_path).scaled(400, 400, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            msg_box.setIconPixmap(pixmap)
+            msg_box.setText("Gambar diterima. Ingin mendekripsi teks tersembunyi di dalamnya?")
+            decrypt_button = msg_box.addButton("Dekripsi Teks Tersembunyi", QMessageBox.AcceptRole)
+            msg_box.addButton(QMessageBox.Close); msg_box.exec()
+            
+            if msg_box.clickedButton() != decrypt_button: return
+            key, ok = QInputDialog.getText(self, "Dekripsi Steganografi", "Masukkan Kunci VIGENERE untuk teks tersembunyi:")
+            if not (ok and key): return
+
+            def reveal():
+                from stegano import lsb
+                revealed_encrypted_text = lsb.reveal(local_stegano_path) 
+                if not revealed_encrypted_text:
+                    return None
+                return vigenere_decrypt(revealed_encrypted_text, key, session=self.http)
+
+            def on_revealed(decrypted_message):
+                if decrypted_message is None:
+                    QMessageBox.warning(self, "Gagal", "Tidak ada pesan tersembunyi yang ditemukan di gambar ini.")
+                    return
+                message_id = self.get_message_id(metadata)
+                if message_id:
+                    cache_data = {"text": decrypted_message, "image_path": local_stegano_path}
+                    self.save_to_cache(message_id, cache_data)
                 
-                if image_path and os.path.exists(image_path):
-                    pixmap = QPixmap(image_path).scaled(250, 250, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    img_label = QLabel()
-                    img_label.setPixmap(pixmap)
-                    img_label.setMinimumSize(200, 150)  # Ukuran minimal untuk gambar
-                    bubble_content_layout.addWidget(img_label)
-                else:
-                    stegano_label = QLabel(f"梼 Stegano: {filename} (Path Hilang)")
-                    stegano_label.setMaximumWidth(content_max_width) # [INSTRUKSI 2]
-                    stegano_label.setWordWrap(True)
-                    bubble_content_layout.addWidget(stegano_label)
+                QMessageBox.information(self, "Teks Terungkap", f"Pesan tersembunyi adalah:\n\n{decrypted_message}")
                 
-                text_label = QLabel(f"Pesan: {secret_text}")
-                text_label.setWordWrap(True)
-                text_label.setMaximumWidth(content_max_width) # [INSTRUKSI 2] Terapkan lebar maks
-                text_label.setStyleSheet(f"color: {self.COLOR_TEXT}; font-size: 14px; font-style: italic;")
-                text_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-                text_label.setMinimumHeight(30)  # Tinggi minimal untuk text
-                bubble_content_layout.addWidget(text_label)
-            else:
-                content_label = QLabel(f"梼 Stegano Image: {filename}")
-                content_label.setWordWrap(True)
-                content_label.setMaximumWidth(content_max_width) # [INSTRUKSI 2] Terapkan lebar maks
-                content_label.setStyleSheet(f"color: {self.COLOR_TEXT_SUBTLE}; font-size: 14px; font-style: italic;")
-                content_label.setMinimumHeight(30)  # Tinggi minimal
-                bubble_content_layout.addWidget(content_label)
-
-        elif msg_type == 'file':
-            filename = metadata.get('filename', 'unknown_file')
-            method = metadata.get('encryption_method', 'aes').upper()
-            content_label = QLabel(f"📂 File ({method}): {filename}")
-            content_label.setWordWrap(True)
-            content_label.setMaximumWidth(content_max_width) # [INSTRUKSI 2] Terapkan lebar maks
-            content_label.setStyleSheet(f"color: {self.COLOR_TEXT_SUBTLE}; font-size: 14px; font-style: italic;")
-            content_label.setMinimumHeight(30)  # Tinggi minimal
-            bubble_content_layout.addWidget(content_label)
+                index = self.find_index_by_message_id(message_id)
+                if index is not None: self.update_message_bubble(index)
+
+            self.executor.submit(reveal, on_result=on_revealed, on_error=lambda e: self.show_decrypt_error(metadata, e))
+
+        if not os.path.exists(local_stegano_path):
+            self.add_message_to_display("error", metadata=None, error_text=f"--- Mengunduh gambar {filename}... ---")
+            def on_downloaded(path):
+                self.add_message_to_display("error", metadata=None, error_text=f"--- Gambar diterima. Disimpan di cache. ---")
+                on_ready(path)
+            self.download_file(metadata, local_stegano_path, on_done=on_downloaded,
+                               on_error=lambda e: self.show_decrypt_error(metadata, e))
         else:
-            content_label = QLabel("[Pesan tidak dikenal]")
-            content_label.setMaximumWidth(content_max_width) # [INSTRUKSI 2] Terapkan lebar maks
-            content_label.setStyleSheet(f"color: {self.COLOR_RED}; font-size: 14px;")
-            content_label.setMinimumHeight(30)  # Tinggi minimal
-            bubble_content_layout.addWidget(content_label)
-        
-        bottom_layout = QHBoxLayout()
-        bottom_layout.setContentsMargins(0, 5, 0, 0)  # Margin atas untuk pemisah
-        
-        timestamp_str = "..."
-        timestamp_iso = metadata.get('db_timestamp')
-        if timestamp_iso:
-            try:
-                dt_obj = datetime.fromisoformat(timestamp_iso)
-                if dt_obj.tzinfo is None:
-                    dt_obj = dt_obj.replace(tzinfo=timezone.utc)
-                dt_local = dt_obj.astimezone()
-                timestamp_str = dt_local.strftime("%H:%M") 
-            except ValueError:
-                timestamp_str = "err"
-        
-        time_label = QLabel(timestamp_str)
-        time_label.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignBottom)
-        time_label.setStyleSheet(f"color: {self.COLOR_TEXT_SUBTLE}; font-size: 10px; padding-top: 5px;")
-        
-        refresh_btn = QPushButton("🔄") 
-        refresh_btn.setFixedSize(25, 25)
-        refresh_btn.setToolTip("Dekripsi ulang pesan ini")
-        refresh_btn.setStyleSheet(f"""
-            QPushButton {{ background-color: transparent; border: none; color: {self.COLOR_TEXT_SUBTLE}; font-size: 14px; }}
-            QPushButton:hover {{ color: {self.COLOR_GOLD_HOVER}; }}
-        """)
-        
-        if item:
-            refresh_btn.clicked.connect(lambda: self.on_chat_item_clicked(item))
-            
-        bottom_layout.addWidget(time_label)
-        bottom_layout.addStretch()
-        bottom_layout.addWidget(refresh_btn)
-        
-        bubble_content_layout.addLayout(bottom_layout)
-        
-        if align == "sent":
-            bubble_frame.setStyleSheet(f"QFrame {{ background-color: {self.COLOR_BUBBLE_SENT}; border-radius: 12px; border-bottom-right-radius: 0px; }}")
-            container_layout.addStretch()
-            container_layout.addWidget(bubble_frame)
-        else: # received
-            bubble_frame.setStyleSheet(f"QFrame {{ background-color: {self.COLOR_BUBBLE_RECV}; border-radius: 12px; border-bottom-left-radius: 0px; }}")
-            container_layout.addWidget(bubble_frame)
-            container_layout.addStretch()
-
-        return bubble_container
-
-    # --- [PERBAIKAN BUG #1] ---
+            self.add_message_to_display("error", metadata=None, error_text=f"--- Membuka gambar {filename} dari cache... ---")
+            on_ready(local_stegano_path)
+
+    # --- [REVISI] Rendering lewat ChatMessageModel + ChatBubbleDelegate ---
     def add_message_to_display(self, align, metadata, cached_data=None, error_text=None, is_loading_history=False):
-        """Memperbaiki bug bubble hilang saat load."""
-        
-        item = QListWidgetItem() 
-        item.setData(Qt.UserRole, metadata)
-        
+        """Tambahkan satu baris (bubble atau status/error) ke model chat."""
         if error_text:
-            item.setText(error_text)
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item.setForeground(QColor(self.COLOR_RED))
-            item.setSizeHint(QSize(0, 30))
-            self.chat_display.addItem(item) # Add error item
+            entry = self.chat_model.status_entry(error_text)
         else:
-            # 1. Buat widget DULU, dan berikan item
-            bubble_widget = self.create_chat_bubble(align, metadata, cached_data, item)
-            
-            # 2. Paksa widget menghitung ukuran minimumnya.
-            # Ini adalah perbaikan utamanya:
-            bubble_widget.layout().activate() 
-            bubble_widget.adjustSize()
-            
-            # 3. Dapatkan sizeHint()
-            size = bubble_widget.sizeHint() 
-            item.setSizeHint(size) 
-
-            # 4. BARU tambahkan item ke list
-            self.chat_display.addItem(item)
-            
-            # 5. Set widget
-            self.chat_display.setItemWidget(item, bubble_widget)
-        
-        # [PERBAIKAN] Hanya scroll ke bawah jika ini BUKAN bagian dari
-        # pemuatan riwayat, atau jika ini item terakhir dari riwayat.
+            entry = self.chat_model.message_entry(align, metadata, cached_data)
+            # Tandai sebagai sudah tampil agar delta sync tidak menduplikasi
+            message_id = self.get_message_id(metadata)
+            if message_id:
+                self.displayed_message_ids.add(message_id)
+        self.chat_model.append_entries([entry])
 
-    # --- [AKHIR PERBAIKAN BUG #1] ---
+    def update_message_bubble(self, index):
+        """Perbarui isi satu bubble (mis. setelah dekripsi) tanpa reload seluruh chat."""
+        metadata = index.data(Qt.UserRole)
+        if not metadata: return
+        message_id = self.get_message_id(metadata)
+        self.chat_model.set_cached(message_id, self.message_cache.get(message_id))
 
     # --- (Helper Styling TIDAK BERUBAH) ---
     def input_style(self):
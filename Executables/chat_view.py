@@ -0,0 +1,285 @@
+# chat_view.py
+# [BARU] Rendering chat model/view: QListView + ChatMessageModel + ChatBubbleDelegate.
+# Menggantikan satu QWidget+QFrame+QLabel per pesan. Bubble digambar langsung
+# oleh delegate (hanya baris yang terlihat yang di-paint) dan sizeHint
+# di-cache per pesan sehingga ribuan pesan tetap ringan.
+
+import os
+from collections import OrderedDict
+from PySide6.QtWidgets import QStyledItemDelegate
+from PySide6.QtGui import QFont, QFontMetrics, QColor, QPainter, QPainterPath, QPixmap, QPixmapCache
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QRectF, QSize
+from utils import parse_timestamp
+
+
+class ChatMessageModel(QAbstractListModel):
+    """
+    Setiap baris adalah dict:
+      kind     : 'message' atau 'status' (baris info/error di tengah)
+      align    : 'sent' / 'received'
+      metadata : metadata pesan dari server (dikembalikan untuk Qt.UserRole)
+      cached   : hasil dekripsi dari cache (teks atau dict stegano)
+      text     : teks untuk baris status
+      seq, version : identitas + versi baris, dipakai sebagai kunci cache sizeHint
+    """
+    EntryRole = Qt.UserRole + 1
+
+    def __init__(self, message_id_fn, parent=None):
+        super().__init__(parent)
+        self.message_id_fn = message_id_fn
+        self._rows = []
+        self._row_by_message_id = {}
+        self._next_seq = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        entry = self._rows[index.row()]
+        if role == Qt.UserRole:
+            return entry.get('metadata')
+        if role == self.EntryRole:
+            return entry
+        if role == Qt.DisplayRole and entry['kind'] == 'status':
+            return entry['text']
+        return None
+
+    def _new_entry(self, **fields):
+        entry = {'kind': 'message', 'align': None, 'metadata': None, 'cached': None,
+                 'text': None, 'seq': self._next_seq, 'version': 0}
+        entry.update(fields)
+        self._next_seq += 1
+        return entry
+
+    def message_entry(self, align, metadata, cached_data=None):
+        return self._new_entry(kind='message', align=align, metadata=metadata, cached=cached_data)
+
+    def status_entry(self, text):
+        return self._new_entry(kind='status', text=text)
+
+    def append_entries(self, entries):
+        """Tambahkan banyak baris dengan satu sinyal insert."""
+        if not entries: return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        for entry in entries:
+            if entry['kind'] == 'message':
+                message_id = self.message_id_fn(entry['metadata'])
+                if message_id:
+                    self._row_by_message_id[message_id] = len(self._rows)
+            self._rows.append(entry)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._row_by_message_id = {}
+        self.endResetModel()
+
+    def entry(self, row):
+        return self._rows[row]
+
+    def index_for_message_id(self, message_id):
+        row = self._row_by_message_id.get(message_id)
+        return None if row is None else self.index(row)
+
+    def set_cached(self, message_id, cached_data):
+        """Perbarui isi terdekripsi satu pesan; hanya baris itu yang digambar ulang."""
+        index = self.index_for_message_id(message_id)
+        if index is None: return
+        entry = self._rows[index.row()]
+        entry['cached'] = cached_data
+        entry['version'] += 1
+        self.dataChanged.emit(index, index)
+
+
+class ChatBubbleDelegate(QStyledItemDelegate):
+    """Menggambar bubble chat. Tampilan mengikuti create_chat_bubble versi widget."""
+
+    MARGIN = 5            # Jarak bubble ke tepi baris
+    PAD_H = 12            # Padding kiri/kanan dalam bubble
+    PAD_TOP = 10
+    PAD_BOTTOM = 8
+    SPACING = 8           # Jarak antar elemen dalam bubble
+    FOOTER_HEIGHT = 25    # Baris timestamp + ikon refresh
+    MIN_CONTENT_HEIGHT = 30
+    THUMB_SIZE = 250
+    STATUS_HEIGHT = 30
+    RADIUS = 12
+    SIZE_CACHE_LIMIT = 2000  # Entri sizeHint maksimum (LRU); versi lama/seq lama tersingkir sendiri
+
+    def __init__(self, theme, parent=None):
+        super().__init__(parent)
+        self.theme = theme  # Objek dengan atribut COLOR_* (ChatPage)
+        self.name_font = QFont("Segoe UI", 10, QFont.Bold)
+        self.content_font = QFont("Segoe UI"); self.content_font.setPixelSize(14)
+        self.italic_font = QFont(self.content_font); self.italic_font.setItalic(True)
+        self.time_font = QFont("Segoe UI"); self.time_font.setPixelSize(10)
+        # (seq, version) -> (lebar view, QSize), LRU terbatas; dikosongkan saat model di-reset
+        self._size_cache = OrderedDict()
+
+    # --- Konten per tipe pesan ---
+    def _content_parts(self, entry):
+        """Daftar bagian konten: ('text', str, font, color) atau ('image', path)."""
+        metadata = entry['metadata'] or {}
+        cached = entry['cached']
+        msg_type = metadata.get('type', 'unknown')
+        t = self.theme
+        if msg_type == 'text':
+            return [('text', cached if cached else "[Pesan Teks Super-Terenkripsi]", self.content_font, t.COLOR_TEXT)]
+        if msg_type == 'stegano':
+            filename = metadata.get('filename', 'unknown.png')
+            if cached and isinstance(cached, dict):
+                image_path = cached.get('image_path')
+                parts = []
+                if image_path and os.path.exists(image_path):
+                    parts.append(('image', image_path))
+                else:
+                    parts.append(('text', f"梼 Stegano: {filename} (Path Hilang)", self.content_font, t.COLOR_TEXT))
+                parts.append(('text', f"Pesan: {cached.get('text', '[ERROR CACHE]')}", self.italic_font, t.COLOR_TEXT))
+                return parts
+            return [('text', f"梼 Stegano Image: {filename}", self.italic_font, t.COLOR_TEXT_SUBTLE)]
+        if msg_type == 'file':
+            filename = metadata.get('filename', 'unknown_file')
+            method = metadata.get('encryption_method', 'aes').upper()
+            return [('text', f"📂 File ({method}): {filename}", self.italic_font, t.COLOR_TEXT_SUBTLE)]
+        return [('text', "[Pesan tidak dikenal]", self.content_font, t.COLOR_RED)]
+
+    def _name(self, entry):
+        if entry['align'] == "sent":
+            return "YOU"
+        return (entry['metadata'] or {}).get('sender', 'Unknown')
+
+    @staticmethod
+    def _timestamp(metadata):
+        timestamp_iso = (metadata or {}).get('db_timestamp')
+        if not timestamp_iso:
+            return "..."
+        dt_obj = parse_timestamp(timestamp_iso)
+        return dt_obj.astimezone().strftime("%H:%M") if dt_obj else "err"
+
+    def _thumbnail(self, image_path):
+        key = f"chat_thumb:{image_path}"
+        pixmap = QPixmapCache.find(key)
+        if pixmap is None or pixmap.isNull():
+            pixmap = QPixmap(image_path).scaled(self.THUMB_SIZE, self.THUMB_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+    def _layout(self, entry, view_width):
+        """Hitung rect bubble dan setiap bagian (relatif ke (0,0) baris)."""
+        bubble_max = int(view_width * 0.7)
+        bubble_min = int(view_width * 0.3)
+        content_max = max(bubble_max - 2 * self.PAD_H, 10)
+
+        name_fm = QFontMetrics(self.name_font)
+        name_text = self._name(entry)
+        name_h = name_fm.height()
+        widest = name_fm.horizontalAdvance(name_text)
+
+        parts = []
+        for part in self._content_parts(entry):
+            if part[0] == 'image':
+                pixmap = self._thumbnail(part[1])
+                w, h = max(pixmap.width(), 200), max(pixmap.height(), 150)
+                parts.append((part, QSize(w, h), pixmap))
+            else:
+                _, text, font, _ = part
+                br = QFontMetrics(font).boundingRect(QRect(0, 0, content_max, 100000), Qt.TextWordWrap, text)
+                parts.append((part, QSize(min(br.width(), content_max), max(br.height(), self.MIN_CONTENT_HEIGHT)), None))
+            widest = max(widest, parts[-1][1].width())
+
+        bubble_w = min(max(widest + 2 * self.PAD_H, bubble_min), bubble_max)
+        bubble_h = self.PAD_TOP + name_h + self.SPACING
+        bubble_h += sum(size.height() + self.SPACING for _, size, _ in parts)
+        bubble_h += self.FOOTER_HEIGHT + self.PAD_BOTTOM
+
+        if entry['align'] == "sent":
+            x = view_width - self.MARGIN - bubble_w
+        else:
+            x = self.MARGIN
+        bubble = QRect(x, self.MARGIN, bubble_w, bubble_h)
+        return {'bubble': bubble, 'name': name_text, 'name_h': name_h, 'parts': parts}
+
+    # --- API QStyledItemDelegate ---
+    def sizeHint(self, option, index):
+        entry = index.data(ChatMessageModel.EntryRole)
+        if entry is None:
+            return super().sizeHint(option, index)
+        if entry['kind'] == 'status':
+            return QSize(0, self.STATUS_HEIGHT)
+        view_width = option.rect.width() or (option.widget.viewport().width() if option.widget else 600)
+        key = (entry['seq'], entry['version'])
+        cached = self._size_cache.get(key)
+        if cached and cached[0] == view_width:
+            self._size_cache.move_to_end(key)
+            return cached[1]
+        layout = self._layout(entry, view_width)
+        size = QSize(view_width, layout['bubble'].height() + 2 * self.MARGIN)
+        self._size_cache[key] = (view_width, size)
+        self._size_cache.move_to_end(key)
+        if len(self._size_cache) > self.SIZE_CACHE_LIMIT:
+            self._size_cache.popitem(last=False)
+        return size
+
+    def paint(self, painter, option, index):
+        entry = index.data(ChatMessageModel.EntryRole)
+        if entry is None:
+            return super().paint(painter, option, index)
+        t = self.theme
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        if entry['kind'] == 'status':
+            painter.setPen(QColor(t.COLOR_RED))
+            painter.drawText(option.rect, Qt.AlignCenter, entry['text'])
+            painter.restore()
+            return
+
+        layout = self._layout(entry, option.rect.width())
+        bubble = layout['bubble'].translated(option.rect.topLeft())
+
+        # Bubble dengan satu sudut bawah lancip (kanan untuk 'sent', kiri untuk 'received')
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(bubble), self.RADIUS, self.RADIUS)
+        corner = QRectF(bubble.right() - self.RADIUS + 1, bubble.bottom() - self.RADIUS + 1, self.RADIUS, self.RADIUS) \
+            if entry['align'] == "sent" else QRectF(bubble.left(), bubble.bottom() - self.RADIUS + 1, self.RADIUS, self.RADIUS)
+        path.addRect(corner)
+        path.setFillRule(Qt.WindingFill)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(t.COLOR_BUBBLE_SENT if entry['align'] == "sent" else t.COLOR_BUBBLE_RECV))
+        painter.drawPath(path.simplified())
+
+        x = bubble.left() + self.PAD_H
+        y = bubble.top() + self.PAD_TOP
+        inner_w = bubble.width() - 2 * self.PAD_H
+
+        painter.setFont(self.name_font)
+        painter.setPen(QColor(t.COLOR_GOLD))
+        painter.drawText(QRect(x, y, inner_w, layout['name_h']), Qt.AlignLeft | Qt.AlignVCenter, layout['name'])
+        y += layout['name_h'] + self.SPACING
+
+        for part, size, pixmap in layout['parts']:
+            if part[0] == 'image':
+                painter.drawPixmap(x, y, pixmap)
+            else:
+                _, text, font, color = part
+                painter.setFont(font)
+                painter.setPen(QColor(color))
+                painter.drawText(QRect(x, y, inner_w, size.height()), Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignTop, text)
+            y += size.height() + self.SPACING
+
+        footer = QRect(x, y, inner_w, self.FOOTER_HEIGHT)
+        painter.setFont(self.time_font)
+        painter.setPen(QColor(t.COLOR_TEXT_SUBTLE))
+        painter.drawText(footer, Qt.AlignLeft | Qt.AlignBottom, self._timestamp(entry['metadata']))
+        painter.setFont(self.content_font)
+        # Klik di mana pun pada bubble (termasuk ikon ini) memicu dekripsi ulang
+        painter.drawText(footer, Qt.AlignRight | Qt.AlignVCenter, "🔄")
+
+        painter.restore()
+
+    def invalidate(self):
+        self._size_cache.clear()
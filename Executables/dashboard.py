@@ -7,6 +7,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtGui import QFont, QPixmap
 from PySide6.QtCore import Qt, QSize
 from utils import get_resource_path
+from task_executor import get_shared_executor
 
 # [REVISI UI 4.0]
 # Menerapkan 4 permintaan terakhir dari pengguna (menambah card
@@ -31,12 +32,13 @@ class DashboardPage(QWidget):
     COLOR_RED_PRESSED = "#e63946"
     # -----------------------------------------------
 
-    def __init__(self, logout_callback, switch_to_chat, user_manager):
+    def __init__(self, logout_callback, switch_to_chat, user_manager, executor=None):
         super().__init__()
         # --- Fungsionalitas Inti (Tidak Berubah) ---
         self.logout_callback = logout_callback
         self.switch_to_chat = switch_to_chat
         self.user_manager = user_manager
+        self.executor = executor or get_shared_executor() # [BARU] I/O jaringan di latar belakang
         self.current_user = None
         # -------------------------------------------
         
@@ -291,10 +293,22 @@ class DashboardPage(QWidget):
         self.current_user = username
         self.load_contact_list()
 
+    def attach_push_channel(self, push_channel):
+        """[BARU] Muat ulang daftar kontak saat server mengirim event 'contacts'."""
+        push_channel.contacts_event.connect(self.load_contact_list)
+
     def load_contact_list(self):
         if not self.current_user: return
         self.contact_list.clear(); self.contact_list.addItem("Memuat kontak...")
-        success, contacts = self.user_manager.get_contacts(self.current_user)
+        # [REVISI] Ambil kontak di executor agar UI tidak membeku
+        self.executor.submit(
+            self.user_manager.get_contacts, self.current_user,
+            on_result=self.on_contacts_loaded,
+            on_error=lambda e: self.on_contacts_loaded((False, []))
+        )
+
+    def on_contacts_loaded(self, result):
+        success, contacts = result
         self.contact_list.clear()
         if success and contacts:
             for contact in contacts: self.contact_list.addItem(contact)
@@ -0,0 +1,197 @@
+# download_manager.py
+# [BARU] Pengelola unduhan file/stegano untuk ChatPage.
+# - Streaming per chunk ke file .part (memori konstan, tidak pakai response.content)
+# - Resume dari file .part yang tersisa lewat header HTTP Range
+# - Verifikasi integritas SHA-256 (dari metadata pesan atau header server)
+# - Progres dilaporkan lewat sinyal Qt, beberapa unduhan bisa berjalan bersamaan
+#   di thread pool sendiri sehingga tidak memblokir chat maupun executor bersama.
+
+import os
+import re
+import time
+import base64
+import hashlib
+import threading
+import traceback
+from PySide6.QtCore import QObject, Signal
+from task_executor import RequestExecutor, is_deleted_object_error
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class DownloadIntegrityError(Exception):
+    pass
+
+
+class DownloadManager(QObject):
+    progress = Signal(str, object, object)  # key, byte diterima, total byte (None jika tidak diketahui)
+    finished = Signal(str, str)             # key, path lokal
+    failed = Signal(str, str)               # key, pesan error
+
+    CHUNK_SIZE = 256 * 1024
+    PROGRESS_INTERVAL = 0.1  # detik, batas frekuensi emit progres
+
+    def __init__(self, session, max_concurrent=3, chunk_size=None):
+        super().__init__()
+        self.session = session
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self._executor = RequestExecutor(max_threads=max_concurrent)
+        self._lock = threading.Lock()
+        self._active = {}  # key -> {"cancelled": bool, "callbacks": [(on_done, on_error)]}
+
+    # --- API ---
+    def download(self, key, path, local_path, expected_sha256=None, on_done=None, on_error=None):
+        """
+        Unduh 'path' (relatif ke base_url sesi) ke local_path. Jika key yang sama
+        sedang diunduh, callback hanya ditambahkan (tidak ada unduhan ganda).
+        on_done(local_path) / on_error(exception) dipanggil di thread GUI.
+        """
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                job["callbacks"].append((on_done, on_error))
+                return
+            job = {"cancelled": False, "callbacks": [(on_done, on_error)]}
+            self._active[key] = job
+        self._executor.submit(
+            self._download, key, job, path, local_path, expected_sha256,
+            on_result=lambda result: self._finish(key, result, None),
+            on_error=lambda e: self._finish(key, None, e),
+        )
+
+    def is_active(self, key):
+        with self._lock:
+            return key in self._active
+
+    def active_count(self):
+        with self._lock:
+            return len(self._active)
+
+    def cancel(self, key):
+        """Batalkan unduhan; file .part disimpan agar bisa dilanjutkan nanti."""
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                job["cancelled"] = True
+
+    def cancel_all(self):
+        with self._lock:
+            for job in self._active.values():
+                job["cancelled"] = True
+
+    # --- Thread GUI ---
+    def _finish(self, key, result, error):
+        with self._lock:
+            job = self._active.pop(key, None)
+        callbacks = job["callbacks"] if job else []
+        if error is None:
+            self.finished.emit(key, result)
+        else:
+            print(f"DownloadManager: {key} gagal: {error}")
+            self.failed.emit(key, str(error))
+        for on_done, on_error in callbacks:
+            try:
+                if error is None and on_done:
+                    on_done(result)
+                elif error is not None and on_error:
+                    on_error(error)
+            except Exception as e:
+                if is_deleted_object_error(e):
+                    # Halaman yang meminta unduhan sudah ditutup
+                    print(f"Callback unduhan diabaikan, objek sudah tidak ada: {e}")
+                else:
+                    print(f"DownloadManager: callback {key} error:")
+                    traceback.print_exc()
+
+    # --- Thread pool ---
+    def _download(self, key, job, path, local_path, expected_sha256):
+        part_path = local_path + ".part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        response = self.session.get(path, endpoint="download", stream=True, headers=headers)
+        try:
+            if response.status_code == 416 and offset:
+                # .part sudah lengkap (atau lebih panjang dari file server): verifikasi saja
+                total = offset
+                server_sha256 = self._server_sha256(response)
+                response.close()
+                return self._complete(part_path, local_path, expected_sha256 or server_sha256, total)
+            if response.status_code == 206 and offset:
+                total = self._total_from_content_range(response)
+                mode = "ab"
+                print(f"DownloadManager: melanjutkan {key} dari byte {offset}.")
+            elif response.status_code == 200:
+                # Server mengabaikan Range: mulai ulang dari awal
+                offset = 0
+                length = response.headers.get("Content-Length")
+                total = int(length) if length and length.isdigit() else None
+                mode = "wb"
+            else:
+                raise Exception(f"Gagal mengunduh file dari server (HTTP {response.status_code}).")
+
+            server_sha256 = self._server_sha256(response)
+            received = offset
+            last_emit = 0.0
+            self.progress.emit(key, received, total)
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if job["cancelled"]:
+                        raise DownloadCancelled(f"Unduhan {key} dibatalkan.")
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    received += len(chunk)
+                    now = time.monotonic()
+                    if now - last_emit >= self.PROGRESS_INTERVAL:
+                        last_emit = now
+                        self.progress.emit(key, received, total)
+            self.progress.emit(key, received, total if total is not None else received)
+        finally:
+            response.close()
+
+        if total is not None and received != total:
+            raise Exception(f"Unduhan terputus ({received}/{total} byte), akan dilanjutkan saat dicoba lagi.")
+        return self._complete(part_path, local_path, expected_sha256 or server_sha256, received)
+
+    def _complete(self, part_path, local_path, expected_sha256, size):
+        if expected_sha256:
+            actual = self._file_sha256(part_path)
+            if actual != expected_sha256.lower():
+                # File rusak tidak bisa dilanjutkan: hapus agar unduhan berikutnya mulai dari awal
+                os.remove(part_path)
+                raise DownloadIntegrityError("Hash SHA-256 file tidak cocok, file unduhan dihapus.")
+        os.replace(part_path, local_path)
+        print(f"DownloadManager: {os.path.basename(local_path)} selesai ({size} byte"
+              f"{', SHA-256 terverifikasi' if expected_sha256 else ''}).")
+        return local_path
+
+    def _file_sha256(self, path):
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(self.chunk_size), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _total_from_content_range(response):
+        # Content-Range: bytes 100-999/1000
+        match = re.match(r"bytes\s+\d+-\d+/(\d+)", response.headers.get("Content-Range", ""))
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _server_sha256(response):
+        """Hash dari header server jika ada: X-Content-SHA256 (hex) atau Digest: sha-256=<base64>."""
+        value = response.headers.get("X-Content-SHA256")
+        if value:
+            return value.strip().lower()
+        for part in response.headers.get("Digest", "").split(","):
+            name, _, encoded = part.strip().partition("=")
+            if name.lower() == "sha-256" and encoded:
+                try:
+                    return base64.b64decode(encoded).hex()
+                except ValueError:
+                    return None
+        return None
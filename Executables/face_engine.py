@@ -0,0 +1,485 @@
+# face_engine.py
+# [BARU] Deteksi wajah hemat CPU untuk worker login & registrasi wajah.
+# - CascadeClassifier dimuat sekali per proses (bukan setiap run() worker)
+# - Deteksi penuh dijalankan pada frame yang diperkecil (DETECT_WIDTH piksel)
+# - Di antara deteksi penuh, wajah dilacak di sekitar ROI terakhir saja;
+#   deteksi penuh diulang setiap N frame atau saat pelacakan hilang
+# - FPS dan waktu CPU per frame dilaporkan berkala (print)
+# - [BARU] FaceCaptureEngine: satu loop kamera untuk dialog login & registrasi,
+#   dengan thread terpisah untuk ambil frame, deteksi, dan render preview
+# - [BARU] Preview tanpa salinan: frame di-flip langsung ke ring buffer yang
+#   dialokasikan sekali dan dibungkus QImage Format_BGR888 (tanpa cvtColor),
+#   dibatasi ke refresh rate layar
+# - [BARU] FaceSampleSelector: sampel registrasi disaring (ketajaman, pose,
+#   ukuran), duplikat dibuang lewat dHash, dan kandidat diperingkat per jendela
+#   kecil sehingga hanya crop terbaik berukuran tetap yang dikirim (bertahap,
+#   selagi capture berjalan)
+# cv2 tetap diimpor malas: modul ini aman diimpor saat startup.
+
+import os
+import time
+import queue
+import threading
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtGui import QImage, QGuiApplication
+
+CASCADE_PATH = "fm/haarcascade_frontalface_default.xml"
+PREVIEW_POOL_SIZE = 3          # buffer preview yang boleh "dipinjam" GUI sekaligus
+DEFAULT_REFRESH_RATE = 60.0    # Hz, jika refresh rate layar tidak diketahui
+
+DETECT_WIDTH = 320         # lebar frame (px) untuk deteksi penuh
+FULL_DETECT_EVERY = 10     # deteksi penuh paling jarang setiap N frame
+ROI_MARGIN = 0.5           # perluasan ROI pelacakan (x lebar/tinggi wajah) di tiap sisi
+TRACK_FACE_SIZE = 96       # ukuran wajah (px) setelah crop ROI diperkecil untuk pelacakan
+
+SAMPLE_SIZE = 200          # sisi crop wajah ternormalisasi (px)
+MIN_FACE_SIZE = 80         # wajah lebih kecil dari ini (px, frame asli) ditolak
+MIN_SHARPNESS = 40.0       # varians Laplacian minimum pada crop ternormalisasi
+MAX_ASYMMETRY = 0.25       # selisih kiri vs cermin kanan (0..1); besar = wajah menoleh
+DUPLICATE_DISTANCE = 6     # jarak Hamming dHash (dari 64 bit) yang dianggap duplikat
+RANK_WINDOW = 6            # kandidat yang ditahan sebelum diperingkat
+CANDIDATE_FACTOR = 1.5     # per jendela hanya RANK_WINDOW / faktor kandidat terbaik yang dipakai
+
+_detectors = {}
+_detectors_lock = threading.Lock()
+_detect_lock = threading.Lock()  # detectMultiScale pada classifier bersama tidak boleh bersamaan
+
+def load_face_detector(cascade_path):
+    """CascadeClassifier untuk cascade_path, dimuat sekali per proses."""
+    with _detectors_lock:
+        detector = _detectors.get(cascade_path)
+        if detector is None:
+            import cv2
+            if not os.path.exists(cascade_path):
+                raise FileNotFoundError(f"Haar cascade not found at {cascade_path}")
+            detector = cv2.CascadeClassifier(cascade_path)
+            if detector.empty():
+                raise IOError(f"Failed to load Haar cascade from {cascade_path}")
+            _detectors[cascade_path] = detector
+            print(f"FaceEngine: cascade dimuat dari {cascade_path}")
+        return detector
+
+
+class FaceTracker:
+    """
+    Mencari satu wajah per frame (gray, resolusi penuh) dan mengembalikan
+    (x, y, w, h) dalam koordinat frame asli, atau None.
+    """
+
+    def __init__(self, detector, detect_width=DETECT_WIDTH, full_detect_every=FULL_DETECT_EVERY,
+                 scale_factor=1.3, min_neighbors=5):
+        import cv2
+        self._cv2 = cv2
+        self.detector = detector
+        self.detect_width = detect_width
+        self.full_detect_every = full_detect_every
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.last_face = None
+        self._frames_since_full = 0
+
+    def reset(self):
+        self.last_face = None
+        self._frames_since_full = 0
+
+    def process(self, gray):
+        face = None
+        if self.last_face is not None and self._frames_since_full < self.full_detect_every:
+            face = self._track(gray)
+            self._frames_since_full += 1
+        if face is None:
+            # Awal, jadwal deteksi penuh, atau pelacakan hilang
+            face = self._detect_full(gray)
+            self._frames_since_full = 0
+        self.last_face = face
+        return face
+
+    def _detect(self, image, min_size):
+        with _detect_lock:
+            faces = self.detector.detectMultiScale(image, self.scale_factor, self.min_neighbors,
+                                                   minSize=(min_size, min_size))
+        if len(faces) == 0:
+            return None
+        return max(faces, key=lambda f: f[2] * f[3])  # Wajah terbesar
+
+    def _detect_full(self, gray):
+        frame_h, frame_w = gray.shape[:2]
+        scale = min(1.0, self.detect_width / frame_w)
+        small = gray if scale == 1.0 else self._cv2.resize(
+            gray, (self.detect_width, int(frame_h * scale)), interpolation=self._cv2.INTER_AREA)
+        found = self._detect(small, 24)
+        if found is None:
+            return None
+        return tuple(int(round(v / scale)) for v in found)
+
+    def _track(self, gray):
+        frame_h, frame_w = gray.shape[:2]
+        x, y, w, h = self.last_face
+        mx, my = int(w * ROI_MARGIN), int(h * ROI_MARGIN)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+        roi = gray[y0:y1, x0:x1]
+        if roi.size == 0:
+            return None
+        # Perkecil crop agar wajah sekitar TRACK_FACE_SIZE px: biaya konstan berapa pun jaraknya
+        scale = min(1.0, TRACK_FACE_SIZE / max(w, 1))
+        if scale < 1.0:
+            roi = self._cv2.resize(roi, (max(1, int((x1 - x0) * scale)), max(1, int((y1 - y0) * scale))),
+                                   interpolation=self._cv2.INTER_AREA)
+        found = self._detect(roi, max(24, int(w * scale * 0.6)))
+        if found is None:
+            return None
+        fx, fy, fw, fh = (int(round(v / scale)) for v in found)
+        return (x0 + fx, y0 + fy, fw, fh)
+
+
+class FrameStats:
+    """Menghitung FPS dan waktu CPU (thread ini) per frame, dilaporkan setiap 'interval' detik."""
+
+    def __init__(self, name, interval=2.0):
+        self.name = name
+        self.interval = interval
+        self.fps = 0.0
+        self.cpu_ms_per_frame = 0.0
+        self._reset(time.monotonic(), time.thread_time())
+
+    def _reset(self, wall, cpu):
+        self._wall_start, self._cpu_start, self._frames = wall, cpu, 0
+
+    def tick(self):
+        """Panggil sekali per frame yang selesai diproses."""
+        self._frames += 1
+        wall = time.monotonic()
+        elapsed = wall - self._wall_start
+        if elapsed >= self.interval:
+            cpu = time.thread_time()
+            self.fps = self._frames / elapsed
+            self.cpu_ms_per_frame = (cpu - self._cpu_start) * 1000 / self._frames
+            print(f"FaceEngine[{self.name}]: {self.fps:.1f} fps, CPU {self.cpu_ms_per_frame:.1f} ms/frame")
+            self._reset(wall, cpu)
+
+
+def _put_latest(frame_queue, item):
+    """Masukkan item ke queue terbatas; jika penuh, frame tertua dibuang. True jika ada yang dibuang."""
+    dropped = False
+    while True:
+        try:
+            frame_queue.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                frame_queue.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+
+class PreviewBufferPool:
+    """
+    Ring buffer frame preview yang dialokasikan sekali. Slot dipinjam thread
+    preview, dibungkus QImage, lalu dikembalikan GUI lewat release() setelah
+    QPixmap dibuat. Selama dipinjam, slot tidak ditimpa frame berikutnya.
+    """
+
+    def __init__(self, size=PREVIEW_POOL_SIZE):
+        self._buffers = [None] * size
+        self._free = list(range(size))
+        self._lock = threading.Lock()
+
+    def acquire(self, shape, dtype):
+        """(slot, buffer) kosong dengan bentuk 'shape', atau None jika semua sedang dipakai GUI."""
+        with self._lock:
+            if not self._free:
+                return None
+            slot = self._free.pop(0)
+        buffer = self._buffers[slot]
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            import numpy as np
+            # Hanya saat pertama kali / resolusi kamera berubah; slot ini tidak dipegang GUI
+            buffer = self._buffers[slot] = np.empty(shape, dtype)
+        return slot, buffer
+
+    def release(self, slot):
+        with self._lock:
+            if slot not in self._free:
+                self._free.append(slot)
+
+
+class FaceCaptureEngine(QObject):
+    """
+    Loop kamera bersama untuk dialog wajah.
+
+    grab    : cap.read(), frame masuk ke dua queue terbatas (deteksi & preview)
+    detect  : flip + gray + FaceTracker, lalu memanggil subscriber(frame, gray, face)
+    preview : flip ke buffer pool + kotak wajah terakhir, emit preview_ready(QImage, slot)
+
+    Queue membuang frame terlama saat penuh, sehingga preview yang lambat tidak
+    pernah memperlambat deteksi dan deteksi selalu memproses frame terbaru.
+    Subscriber dipanggil di thread deteksi (harus cepat, jangan memblokir).
+    Di akhir stream (kamera gagal dibaca / engine berhenti) subscriber
+    menerima frame None.
+
+    Penerima preview_ready WAJIB memanggil release_preview(slot) setelah
+    selesai memakai QImage (mis. setelah QPixmap.fromImage), karena QImage
+    menunjuk langsung ke buffer pool. Jika GUI tertinggal dan semua slot
+    masih dipinjam, frame preview dibuang.
+    """
+    preview_ready = Signal(QImage, int)
+
+    QUEUE_SIZE = 2
+
+    def __init__(self, camera_index=0, name="capture", cascade_path=CASCADE_PATH):
+        super().__init__()
+        self.camera_index = camera_index
+        self.name = name
+        self.cascade_path = cascade_path
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+        self._detect_queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._preview_queue = queue.Queue(maxsize=1)
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._cap = None
+        self._last_face = None
+        self.dropped_frames = 0
+        self._preview_pool = PreviewBufferPool()
+        # Dibaca di thread GUI (engine dibuat oleh dialog)
+        screen = QGuiApplication.primaryScreen() if QGuiApplication.instance() else None
+        refresh_rate = screen.refreshRate() if screen is not None else 0
+        self.preview_interval = 1.0 / (refresh_rate if refresh_rate > 0 else DEFAULT_REFRESH_RATE)
+
+    def release_preview(self, slot):
+        """Kembalikan buffer preview ke pool (panggil dari slot preview_ready)."""
+        self._preview_pool.release(slot)
+
+    # --- Subscriber ---
+    def subscribe(self, callback):
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._subscribers_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, frame, gray, face):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(frame, gray, face)
+            except Exception as e:
+                print(f"FaceEngine[{self.name}]: subscriber error: {e}")
+
+    # --- Kontrol ---
+    def start(self):
+        """Buka kamera (error dilempar ke pemanggil) lalu jalankan ketiga thread."""
+        import cv2
+        tracker = FaceTracker(load_face_detector(self.cascade_path))
+        cap = cv2.VideoCapture(self.camera_index)
+        if not cap.isOpened():
+            raise IOError(f"Cannot open webcam at index {self.camera_index}.")
+        self._cap = cap
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._grab_loop, name=f"{self.name}-grab", daemon=True),
+            threading.Thread(target=self._detect_loop, args=(tracker,), name=f"{self.name}-detect", daemon=True),
+            threading.Thread(target=self._preview_loop, name=f"{self.name}-preview", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if not self._threads:
+            return
+        # Bangunkan thread yang menunggu queue
+        _put_latest(self._detect_queue, None)
+        _put_latest(self._preview_queue, None)
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+        if self.dropped_frames:
+            print(f"FaceEngine[{self.name}]: {self.dropped_frames} frame terlambat dibuang.")
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    # --- Thread ---
+    def _grab_loop(self):
+        import cv2
+        try:
+            while not self._stop_event.is_set():
+                ret, frame = self._cap.read()
+                if not ret:
+                    print(f"FaceEngine[{self.name}]: Error: Can't read frame.")
+                    break
+                # Frame mentah (belum di-flip) untuk kedua thread: masing-masing flip sendiri
+                if _put_latest(self._detect_queue, frame):
+                    self.dropped_frames += 1
+                _put_latest(self._preview_queue, frame)
+        finally:
+            self._cap.release()
+            # Tandai akhir stream untuk thread deteksi & preview
+            _put_latest(self._detect_queue, None)
+            _put_latest(self._preview_queue, None)
+
+    def _detect_loop(self, tracker):
+        import cv2
+        stats = FrameStats(self.name)
+        while True:
+            frame = self._detect_queue.get()
+            if frame is None or self._stop_event.is_set():
+                break
+            frame = cv2.flip(frame, 1)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            face = tracker.process(gray)
+            self._last_face = face
+            self._notify(frame, gray, face)
+            stats.tick()
+        self._notify(None, None, None)
+
+    def _preview_loop(self):
+        import cv2
+        next_emit = 0.0
+        while True:
+            frame = self._preview_queue.get()
+            if frame is None or self._stop_event.is_set():
+                break
+            now = time.monotonic()
+            if now < next_emit:
+                continue  # Lebih cepat dari refresh layar: frame ini tidak akan terlihat
+            acquired = self._preview_pool.acquire(frame.shape, frame.dtype)
+            if acquired is None:
+                continue  # GUI masih memegang semua buffer: buang frame
+            slot, buffer = acquired
+            cv2.flip(frame, 1, dst=buffer)
+            face = self._last_face
+            if face is not None:
+                (x, y, w, h) = face
+                cv2.rectangle(buffer, (x, y), (x+w, y+h), (0, 255, 0), 2)
+            h, w, ch = buffer.shape
+            # BGR langsung dari OpenCV, tanpa cvtColor dan tanpa salinan
+            qt_image = QImage(buffer.data, w, h, ch * w, QImage.Format.Format_BGR888)
+            next_emit = now + self.preview_interval
+            self.preview_ready.emit(qt_image, slot)
+
+
+def dhash(image, hash_size=8):
+    """Perceptual difference hash 64-bit dari gambar gray."""
+    import cv2
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+class FaceSample:
+    __slots__ = ("image", "score", "sharpness", "asymmetry", "hash")
+
+    def __init__(self, image, score, sharpness, asymmetry, hash_value):
+        self.image = image
+        self.score = score
+        self.sharpness = sharpness
+        self.asymmetry = asymmetry
+        self.hash = hash_value
+
+
+class FaceSampleSelector:
+    """
+    Menyaring ROI wajah registrasi menjadi N crop terbaik yang berbeda satu sama lain,
+    secara bertahap agar sampel bisa di-encode dan diunggah selagi capture berjalan.
+
+    offer() mengembalikan alasan: "accepted" (masuk jendela kandidat), "replaced"
+    (menggantikan kandidat mirip yang skornya lebih rendah), "duplicate", "small",
+    "blurry", atau "pose". Setiap kali jendela berisi RANK_WINDOW kandidat, kandidat
+    dengan skor (ketajaman x simetri) tertinggi, sebanyak RANK_WINDOW / CANDIDATE_FACTOR,
+    menjadi final dan sisanya dibuang. take_final() mengambil sampel final yang
+    baru; sampel final tidak pernah diganti.
+    """
+
+    def __init__(self, count, size=SAMPLE_SIZE, window=RANK_WINDOW, candidate_factor=CANDIDATE_FACTOR):
+        self.count = count
+        self.size = size
+        self.window = max(1, window)
+        self.keep_per_window = max(1, int(round(self.window / candidate_factor)))
+        self.final = []     # FaceSample final, urut saat menjadi final
+        self.pending = []   # Jendela kandidat yang belum diperingkat
+        self._ready = []    # Gambar final yang belum diambil take_final()
+        self.discarded = 0  # Kandidat yang kalah peringkat
+        self.rejected = {"duplicate": 0, "small": 0, "blurry": 0, "pose": 0}
+
+    def is_full(self):
+        return len(self.final) >= self.count
+
+    def progress(self):
+        return min(1.0, len(self.final) / self.count)
+
+    def normalize(self, gray, face):
+        """Crop wajah -> SAMPLE_SIZE x SAMPLE_SIZE, kontras direntangkan ke 0..255."""
+        import cv2
+        (x, y, w, h) = face
+        crop = cv2.resize(gray[y:y+h, x:x+w], (self.size, self.size), interpolation=cv2.INTER_AREA)
+        return cv2.normalize(crop, None, 0, 255, cv2.NORM_MINMAX)
+
+    @staticmethod
+    def asymmetry(image):
+        """0 = simetris sempurna (frontal); makin besar makin menoleh."""
+        import cv2
+        half = image.shape[1] // 2
+        left = image[:, :half]
+        right = cv2.flip(image[:, image.shape[1] - half:], 1)
+        return float(cv2.absdiff(left, right).mean()) / 255.0
+
+    def offer(self, gray, face):
+        import cv2
+        (x, y, w, h) = face
+        if min(w, h) < MIN_FACE_SIZE:
+            return self._reject("small")
+        image = self.normalize(gray, face)
+        sharpness = float(cv2.Laplacian(image, cv2.CV_64F).var())
+        if sharpness < MIN_SHARPNESS:
+            return self._reject("blurry")
+        asymmetry = self.asymmetry(image)
+        if asymmetry > MAX_ASYMMETRY:
+            return self._reject("pose")
+
+        sample = FaceSample(image, sharpness * (1.0 - asymmetry), sharpness, asymmetry, dhash(image))
+        for other in self.final:
+            if bin(sample.hash ^ other.hash).count("1") <= DUPLICATE_DISTANCE:
+                return self._reject("duplicate")
+        for i, other in enumerate(self.pending):
+            if bin(sample.hash ^ other.hash).count("1") <= DUPLICATE_DISTANCE:
+                if sample.score > other.score:
+                    self.pending[i] = sample
+                    return "replaced"
+                return self._reject("duplicate")
+        self.pending.append(sample)
+        if len(self.pending) >= self.window:
+            self._rank_window()
+        return "accepted"
+
+    def _rank_window(self):
+        keep = min(self.keep_per_window, self.count - len(self.final))
+        ranked = sorted(self.pending, key=lambda sample: sample.score, reverse=True)
+        self.final.extend(ranked[:keep])
+        self._ready.extend(sample.image for sample in ranked[:keep])
+        self.discarded += len(ranked) - keep
+        self.pending = []
+
+    def take_final(self):
+        """Crop (array gray SAMPLE_SIZE x SAMPLE_SIZE) yang menjadi final sejak panggilan sebelumnya."""
+        ready, self._ready = self._ready, []
+        return ready
+
+    def _reject(self, reason):
+        self.rejected[reason] += 1
+        return reason
+
+    def summary(self):
+        rejected = ", ".join(f"{reason} {n}" for reason, n in self.rejected.items())
+        return (f"{len(self.final)} final dari {len(self.final) + self.discarded} kandidat "
+                f"(kalah peringkat {self.discarded}), ditolak: {rejected}")
@@ -0,0 +1,176 @@
+# key_store.py
+# [BARU] Satu sumber daftar USB key valid untuk seluruh proses
+# (main.py, usb_auth.py, setup_usb.py).
+# - auth/auth.config hanya didekripsi (PBKDF2 100k iterasi) sekali, lalu di-cache
+# - Cache otomatis dibuang jika mtime/inode/ukuran file berubah
+# - Untuk pengecekan USB cukup set digest SHA-256 (get_valid_key_set); daftar
+#   kunci asli (dibutuhkan setup_usb untuk enkripsi ulang) disimpan dalam buffer
+#   yang di-mlock (tidak di-swap ke disk) dan dinolkan saat cache dibuang.
+
+import os
+import sys
+import json
+import ctypes
+import hashlib
+import threading
+from utils import get_base_path, encrypt_config, decrypt_config, HARDCODED_SECRET as MASTER_SECRET
+
+LOCAL_CONFIG_FILE = os.path.join(get_base_path(), "auth", "auth.config")
+
+
+def key_digest(key_value: str) -> bytes:
+    return hashlib.sha256(key_value.encode("utf-8")).digest()
+
+
+class _LockedBuffer:
+    """bytearray yang di-mlock/VirtualLock (best effort) dan dinolkan saat dilepas."""
+
+    def __init__(self, data: bytes):
+        self.data = bytearray(data)
+        self._locked = False
+        if not self.data:
+            return
+        self._c_buffer = (ctypes.c_char * len(self.data)).from_buffer(self.data)
+        address, size = ctypes.addressof(self._c_buffer), len(self.data)
+        try:
+            if sys.platform == "win32":
+                self._locked = bool(ctypes.windll.kernel32.VirtualLock(ctypes.c_void_p(address), ctypes.c_size_t(size)))
+            else:
+                libc = ctypes.CDLL(None)
+                self._locked = libc.mlock(ctypes.c_void_p(address), ctypes.c_size_t(size)) == 0
+        except (OSError, AttributeError):
+            self._locked = False
+
+    def release(self):
+        if not self.data:
+            return
+        ctypes.memset(ctypes.addressof(self._c_buffer), 0, len(self.data))
+        if self._locked:
+            address, size = ctypes.c_void_p(ctypes.addressof(self._c_buffer)), ctypes.c_size_t(len(self.data))
+            try:
+                if sys.platform == "win32":
+                    ctypes.windll.kernel32.VirtualUnlock(address, size)
+                else:
+                    ctypes.CDLL(None).munlock(address, size)
+            except (OSError, AttributeError):
+                pass
+        del self._c_buffer
+        self.data = bytearray()
+
+
+class ValidKeyStore:
+    """Cache daftar kunci valid dari satu file config terenkripsi."""
+
+    def __init__(self, config_path=LOCAL_CONFIG_FILE, secret=MASTER_SECRET):
+        self.config_path = config_path
+        self.secret = secret
+        self._lock = threading.Lock()
+        self._signature = None       # (st_ino, st_mtime_ns, st_size) saat cache dibuat, atau "missing"
+        self._key_set = frozenset()  # digest SHA-256 semua kunci
+        self._raw = None             # _LockedBuffer berisi JSON daftar kunci
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.config_path)
+        except FileNotFoundError:
+            return "missing"
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _refresh_locked(self):
+        """Muat ulang jika file berubah. Dipanggil dengan self._lock dipegang."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        self._clear_locked()
+        if signature == "missing":
+            print(f"⚠️ File {self.config_path} tidak ditemukan.")
+            self._signature = signature
+            return
+        keys = []
+        try:
+            with open(self.config_path, "rb") as f:
+                encrypted_data = f.read()
+            # Dekripsi data untuk mendapatkan JSON string dari list (PBKDF2, mahal)
+            decrypted_json_list = decrypt_config(encrypted_data, self.secret)
+            if not decrypted_json_list:
+                print("⚠️ Gagal mendekripsi config. Pastikan password benar.")
+            else:
+                keys = json.loads(decrypted_json_list)
+                if not isinstance(keys, list):
+                    print("⚠️ Data config korup, bukan list.")
+                    keys = []
+                else:
+                    print(f"Berhasil memuat {len(keys)} kunci yang terdaftar.")
+        except Exception as e:
+            print(f"❌ Error membaca {self.config_path}: {e}")
+            keys = []
+        # Tanda tangan tetap disimpan walau gagal: file yang sama tidak didekripsi ulang
+        self._set_keys_locked(keys, signature)
+
+    def _set_keys_locked(self, keys, signature):
+        self._signature = signature
+        self._key_set = frozenset(key_digest(key) for key in keys)
+        self._raw = _LockedBuffer(json.dumps(keys).encode("utf-8"))
+
+    def _clear_locked(self):
+        if self._raw is not None:
+            self._raw.release()
+        self._raw = None
+        self._key_set = frozenset()
+        self._signature = None
+
+    # --- API ---
+    def get_key_set(self):
+        """frozenset digest SHA-256 kunci valid (untuk pencocokan USB)."""
+        with self._lock:
+            self._refresh_locked()
+            return self._key_set
+
+    def get_keys(self):
+        """Daftar kunci asli (list str). Hanya untuk keperluan yang butuh nilai aslinya."""
+        with self._lock:
+            self._refresh_locked()
+            return json.loads(bytes(self._raw.data)) if self._raw is not None else []
+
+    def add_key(self, key_value):
+        """Tambahkan kunci, enkripsi ulang seluruh daftar ke file, dan perbarui cache tanpa dekripsi ulang."""
+        with self._lock:
+            self._refresh_locked()
+            keys = json.loads(bytes(self._raw.data)) if self._raw is not None else []
+            if key_value in keys:
+                print("Peringatan: Kunci ini sudah ada di daftar.")
+            else:
+                keys.append(key_value)
+                print("Kunci baru ditambahkan ke daftar.")
+            encrypted_config_data = encrypt_config(json.dumps(keys), self.secret)
+            os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
+            with open(self.config_path, "wb") as f:
+                f.write(encrypted_config_data)
+            self._clear_locked()
+            self._set_keys_locked(keys, self._file_signature())
+            return len(keys)
+
+    def invalidate(self):
+        with self._lock:
+            self._clear_locked()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_key_store():
+    """ValidKeyStore tunggal untuk LOCAL_CONFIG_FILE (seluruh proses)."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ValidKeyStore()
+        return _default_store
+
+def get_valid_key_set():
+    return get_key_store().get_key_set()
+
+def get_valid_keys():
+    return get_key_store().get_keys()
+
+def add_valid_key(key_value):
+    return get_key_store().add_key(key_value)
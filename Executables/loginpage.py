@@ -1,19 +1,20 @@
 # loginpage.py (Versi Final dengan Login Wajah DAN Delay Login Password 3 Detik)
 import os
-import cv2
 import io
 import requests
 import time
-import numpy as np
+import threading
+# [REVISI] cv2 diimpor malas di dalam worker: baru dimuat saat dialog wajah dibuka
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QLineEdit, 
     QPushButton, QMessageBox, QDialog
 )
 from PySide6.QtGui import QFont, QImage, QPixmap
 from PySide6.QtCore import Qt, QThread, QObject, Signal, Slot
+from face_engine import FaceCaptureEngine
 
 # --- Konstanta Global untuk Biometrik ---
-CASCADE_PATH = "fm/haarcascade_frontalface_default.xml"
+# [REVISI] CASCADE_PATH kini dari face_engine (dipakai bersama registerpage)
 API_URL = "https://morsz.azeroth.site" # Ganti dengan URL server Anda
 
 #
@@ -21,72 +22,56 @@ API_URL = "https://morsz.azeroth.site" # Ganti dengan URL server Anda
 #
 class FaceLoginWorker(QObject):
     """
-    Menjalankan pengambilan wajah dan otentikasi jaringan di thread terpisah.
+    Menunggu wajah dari FaceCaptureEngine lalu otentikasi jaringan di thread terpisah.
+    [REVISI] Loop kamera & preview kini dijalankan engine; worker hanya subscriber.
     """
-    frame_updated = Signal(QImage)
     status_updated = Signal(str)
     login_success = Signal(str) # Mengirimkan username jika sukses
     login_failed = Signal(str)  # Mengirimkan pesan error jika gagal
     finished = Signal()
     
-    def __init__(self, camera_index=0):
+    def __init__(self, engine):
         super().__init__()
-        self.camera_index = camera_index
+        self.engine = engine
         self._is_running = True
+        self._done = threading.Event()
+        self._captured_frame = None
+        self._status_text = None
+
+    def _set_status(self, status_text):
+        if status_text != self._status_text:
+            self._status_text = status_text
+            self.status_updated.emit(status_text)
+
+    def _on_frame(self, frame, gray, face):
+        """Dipanggil di thread deteksi engine untuk setiap frame."""
+        if self._done.is_set():
+            return
+        if frame is None:
+            self._done.set()  # Kamera berhenti / gagal dibaca
+            return
+        if face is not None:
+            import cv2
+            self._captured_frame = cv2.flip(frame, 1) # Un-flip
+            self._set_status("Face found... Authenticating...")
+            self._done.set()
+        else:
+            self._set_status("Looking for face...")
 
     @Slot()
     def run(self):
-        # ... (Logika FaceLoginWorker run() tetap sama, tidak diubah) ...
         try:
-            if not os.path.exists(CASCADE_PATH):
-                raise FileNotFoundError(f"Haar cascade not found at {CASCADE_PATH}")
-
-            face_detector = cv2.CascadeClassifier(CASCADE_PATH)
-            
-            cap = cv2.VideoCapture(self.camera_index)
-            if not cap.isOpened():
-                raise IOError(f"Cannot open webcam at index {self.camera_index}.")
-
-            start_time = time.time()
-            captured_frame = None
-            
-            while time.time() - start_time < 10.0 and self._is_running:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_flipped = cv2.flip(frame, 1)
-                gray = cv2.cvtColor(frame_flipped, cv2.COLOR_BGR2GRAY)
-                faces = face_detector.detectMultiScale(gray, 1.3, 5)
-
-                status_text = "Looking for face..."
-
-                if len(faces) > 0:
-                    (x, y, w, h) = faces[0]
-                    cv2.rectangle(frame_flipped, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                    status_text = "Face found... Authenticating..."
-                    captured_frame = cv2.flip(frame_flipped, 1) # Un-flip
-                
-                rgb_image = cv2.cvtColor(frame_flipped, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_image.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-                
-                self.frame_updated.emit(qt_image)
-                self.status_updated.emit(status_text)
-                
-                if captured_frame is not None:
-                    break
-                
-                time.sleep(0.05)
-
-            cap.release()
+            import cv2
+            self.engine.subscribe(self._on_frame)
+            self.engine.start()
+            self._done.wait(10.0)
+            self.engine.stop()
 
             if not self._is_running:
                 self.login_failed.emit("Login canceled by user.")
-                self.finished.emit()
                 return
 
+            captured_frame = self._captured_frame
             if captured_frame is None:
                 raise Exception("No face detected. Please try again.")
 
@@ -109,12 +94,13 @@ class FaceLoginWorker(QObject):
         except Exception as e:
             self.login_failed.emit(f"Error: {e}")
         finally:
-            if 'cap' in locals() and cap.isOpened():
-                cap.release()
+            self.engine.unsubscribe(self._on_frame)
+            self.engine.stop()
             self.finished.emit()
 
     def stop(self):
         self._is_running = False
+        self._done.set()
 
 #
 # --- [BARU] Class Worker untuk Login Password (Dengan Delay 3 Detik) ---
@@ -176,6 +162,7 @@ class FaceLoginDialog(QDialog):
         
         self.thread = None
         self.worker = None
+        self.engine = None
 
         self.setWindowTitle("Login with Face")
         self.setModal(True)
@@ -227,10 +214,12 @@ class FaceLoginDialog(QDialog):
 
     def start_capture(self):
         self.thread = QThread()
-        self.worker = FaceLoginWorker(self.camera_index)
+        # [REVISI] Dialog subscribe ke preview engine; worker subscribe ke hasil deteksi
+        self.engine = FaceCaptureEngine(self.camera_index, name="login")
+        self.engine.preview_ready.connect(self.update_frame)
+        self.worker = FaceLoginWorker(self.engine)
         self.worker.moveToThread(self.thread)
 
-        self.worker.frame_updated.connect(self.update_frame)
         self.worker.status_updated.connect(self.status_label.setText)
         self.worker.login_success.connect(self.on_login_success)
         self.worker.login_failed.connect(self.on_login_failed)
@@ -242,15 +231,18 @@ class FaceLoginDialog(QDialog):
         
         self.thread.start()
 
-    @Slot(QImage)
-    def update_frame(self, qt_image):
-        if qt_image:
+    @Slot(QImage, int)
+    def update_frame(self, qt_image, slot):
+        # [REVISI] qt_image menunjuk buffer pool engine: kembalikan setelah dikonversi ke QPixmap
+        try:
             pixmap = QPixmap.fromImage(qt_image)
-            self.video_label.setPixmap(pixmap.scaled(
-                self.video_label.size(), 
-                Qt.AspectRatioMode.KeepAspectRatio, 
-                Qt.TransformationMode.SmoothTransformation
-            ))
+        finally:
+            self.engine.release_preview(slot)
+        self.video_label.setPixmap(pixmap.scaled(
+            self.video_label.size(), 
+            Qt.AspectRatioMode.KeepAspectRatio, 
+            Qt.TransformationMode.SmoothTransformation
+        ))
         
     @Slot(str)
     def on_login_success(self, username):
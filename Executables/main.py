@@ -1,31 +1,39 @@
 import sys
-import threading
-import tkinter as tk
-from tkinter import messagebox
-from PySide6.QtWidgets import QApplication, QStackedWidget, QMessageBox
+from PySide6.QtWidgets import QApplication, QStackedWidget, QMessageBox, QDialog
 from PySide6.QtGui import QPalette, QColor
+from PySide6.QtCore import QTimer
 
 # ====== Import Halaman (UI Pages) ======
 from loginpage import LoginPage
 from registerpage import RegisterPage
 from dashboard import DashboardPage
-from chat import ChatPage
+# [REVISI] ChatPage diimpor malas di show_chat() (stegano/PIL baru dimuat saat chat dibuka)
 
 # ====== Import Logika (Utils) ======
-from utils import UserManager, MessageManager
+from utils import UserManager, MessageManager, get_api_session
+from task_executor import get_shared_executor
+from push_channel import PushChannel
+from download_manager import DownloadManager
 
 # ====== Import Autentikasi USB ======
-from usb_auth import get_all_valid_keys, check_usb_key, monitor_usb_drive, LOCAL_CONFIG_FILE
+from usb_auth import check_usb_key, UsbKeyDialog, UsbKeyMonitor
+from key_store import get_valid_key_set, LOCAL_CONFIG_FILE
 
 
 class MainWindow(QStackedWidget):
     def __init__(self):
         super().__init__()
 
+        # [BARU] Satu sesi HTTP (keep-alive + pool) dibagi ke semua manajer
+        self.http_session = get_api_session()
+
         # Manajer akun dan pesan
-        self.user_manager = UserManager()
-        self.message_manager = MessageManager()
+        self.user_manager = UserManager(session=self.http_session)
+        self.message_manager = MessageManager(session=self.http_session)
+        self.executor = get_shared_executor() # [BARU] Thread pool untuk semua I/O jaringan
         self.current_user = None
+        self.push_channel = None # [BARU] Notifikasi pesan baru (SSE) per user login
+        self.download_manager = DownloadManager(self.http_session) # [BARU] Unduhan paralel + resume, lintas ChatPage
 
         # Halaman-halaman utama
         self.login_page = LoginPage(self.show_dashboard, self.show_register, self.user_manager)
@@ -33,7 +41,8 @@ class MainWindow(QStackedWidget):
         self.dashboard_page = DashboardPage(
             logout_callback=self.show_login, 
             switch_to_chat=self.show_chat, 
-            user_manager=self.user_manager
+            user_manager=self.user_manager,
+            executor=self.executor
         )
         self.chat_page = None
 
@@ -48,6 +57,7 @@ class MainWindow(QStackedWidget):
     # ==== Navigasi Antar Halaman ====
     def show_login(self):
         self.current_user = None
+        self.stop_push_channel()
         self.setCurrentWidget(self.login_page)
         self.setFixedSize(1200, 800)
 
@@ -63,6 +73,7 @@ class MainWindow(QStackedWidget):
             self.show_login()
             return
 
+        self.start_push_channel()
         self.dashboard_page.set_welcome_message(self.current_user)
         self.setCurrentWidget(self.dashboard_page)
         self.setFixedSize(1200, 800)
@@ -81,53 +92,43 @@ class MainWindow(QStackedWidget):
             self.removeWidget(self.chat_page)
             self.chat_page.deleteLater()
 
+        from chat import ChatPage
         self.chat_page = ChatPage(
             current_user=self.current_user,
             recipient_username=recipient_username,
             shared_password=shared_password,
             message_manager=self.message_manager,
-            back_callback=self.show_dashboard
+            back_callback=self.show_dashboard,
+            executor=self.executor,
+            http_session=self.http_session,
+            push_channel=self.push_channel,
+            download_manager=self.download_manager
         )
 
         self.addWidget(self.chat_page)
         self.setCurrentWidget(self.chat_page)
         self.setFixedSize(1200, 800)
 
+    # ==== [BARU] Push Channel ====
+    def start_push_channel(self):
+        if self.push_channel and self.push_channel.username == self.current_user:
+            return
+        self.stop_push_channel()
+        self.push_channel = PushChannel(self.http_session, self.current_user)
+        self.dashboard_page.attach_push_channel(self.push_channel)
+        self.push_channel.start()
 
-# ========== PROGRAM UTAMA ==========
-if __name__ == "__main__":
-    # --- 1️⃣ Verifikasi USB Key dulu sebelum GUI dibuka ---
-    root_usb = tk.Tk()
-    root_usb.withdraw()
-
-    valid_keys = get_all_valid_keys()
-
-    if not valid_keys:  # Cek jika list-nya kosong
-        messagebox.showerror(
-            "Setup Error",
-            f"File '{LOCAL_CONFIG_FILE}' tidak ditemukan atau tidak ada USB yang terdaftar.\n"
-            "Jalankan setup_usb.py terlebih dahulu untuk mendaftarkan USB key."
-        )
-        sys.exit()
+    def stop_push_channel(self):
+        if self.push_channel:
+            # Objek tetap hidup sampai thread push selesai (dipegang oleh thread itu)
+            self.push_channel.stop()
+            self.push_channel = None
 
-    while True:
-        # check_usb_key sekarang menerima list 'valid_keys'
-        if check_usb_key(valid_keys):
-            print("✅ USB Authentication successful.")
-            break
-        else:
-            # Ubah pesan untuk mencerminkan multi-key
-            should_retry = messagebox.askretrycancel(
-                "USB Key Not Found",
-                "Masukkan SALAH SATU USB key yang terdaftar lalu klik Retry."
-            )
-            if not should_retry:
-                print("❌ Dibatalkan oleh pengguna.")
-                sys.exit()
-
-    root_usb.destroy()
 
-    # --- 2️⃣ Setelah USB diverifikasi, jalankan GUI utama ---
+# ========== PROGRAM UTAMA ==========
+if __name__ == "__main__":
+    # [REVISI] Satu toolkit GUI saja: QApplication dibuat lebih dulu dan
+    # pre-check USB memakai dialog Qt (tkinter tidak lagi dimuat).
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
 
@@ -146,18 +147,44 @@ if __name__ == "__main__":
     palette.setColor(QPalette.HighlightedText, QColor("white"))
     app.setPalette(palette)
 
+    # --- 1️⃣ Verifikasi USB Key dulu sebelum GUI dibuka ---
+    # [REVISI] Set digest dari cache key_store (auth.config didekripsi sekali per proses)
+    valid_keys = get_valid_key_set()
+
+    if not valid_keys:  # Cek jika list-nya kosong
+        QMessageBox.critical(
+            None,
+            "Setup Error",
+            f"File '{LOCAL_CONFIG_FILE}' tidak ditemukan atau tidak ada USB yang terdaftar.\n"
+            "Jalankan setup_usb.py terlebih dahulu untuk mendaftarkan USB key."
+        )
+        sys.exit()
+
+    # check_usb_key sekarang menerima list 'valid_keys'
+    if not check_usb_key(valid_keys):
+        # Dialog Retry/Cancel non-blocking: cek ulang di latar belakang + otomatis tiap 2 detik
+        # Getter (bukan snapshot) agar perubahan ValidKeyStore terbaca di setiap cek
+        if UsbKeyDialog(get_valid_key_set).exec() != QDialog.Accepted:
+            print("❌ Dibatalkan oleh pengguna.")
+            sys.exit()
+    print("✅ USB Authentication successful.")
+
+    # --- 2️⃣ Setelah USB diverifikasi, jalankan GUI utama ---
     # Buat dan tampilkan window utama
     window = MainWindow()
     window.show()
 
-    # --- 3️⃣ Jalankan thread untuk memantau USB selama app berjalan ---
-    monitor_thread = threading.Thread(
-        target=monitor_usb_drive,
-        # --- PERUBAHAN DI SINI ---
-        args=(app, valid_keys),  # Kirim list 'valid_keys'
-        # --- SELESAI PERUBAHAN ---
-        daemon=True
-    )
-    monitor_thread.start()
+    # --- 3️⃣ Pantau USB selama app berjalan (thread daemon, popup lewat Qt) ---
+    def on_usb_removed():
+        window.hide()  # Sembunyikan isi aplikasi segera
+        box = QMessageBox(QMessageBox.Warning, "USB Key Removed",
+                          "USB key terdaftar dilepas! Aplikasi akan ditutup demi keamanan.")
+        box.finished.connect(app.quit)
+        box.open()
+        QTimer.singleShot(10000, app.quit)  # Tetap tutup walau popup tidak diklik
+
+    usb_monitor = UsbKeyMonitor(get_valid_key_set)
+    usb_monitor.removed.connect(on_usb_removed)
+    usb_monitor.start()
 
     sys.exit(app.exec())
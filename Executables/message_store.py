@@ -0,0 +1,148 @@
+# message_store.py
+# [BARU] Cache hasil dekripsi pesan berbasis SQLite.
+# Menggantikan cache_<user>.json yang ditulis ulang utuh setiap ada pesan
+# didekripsi. Kunci = get_message_id() (md5 data teks / file_id), dengan
+# kolom chat_id agar cache dimuat per chat saat dibutuhkan saja.
+
+import os
+import json
+import sqlite3
+import threading
+
+
+class MessageStore:
+    """Satu file SQLite per user. Aman dipakai dari thread GUI maupun executor."""
+
+    def __init__(self, db_path, legacy_json_path=None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS message_cache (
+                message_id TEXT PRIMARY KEY,
+                chat_id    TEXT,
+                value      TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_message_cache_chat ON message_cache(chat_id)")
+        self._conn.commit()
+        if legacy_json_path:
+            self._migrate_legacy_json(legacy_json_path)
+
+    def _migrate_legacy_json(self, json_path):
+        """Impor cache JSON lama sekali saja, lalu ganti namanya agar tidak diimpor ulang."""
+        if not os.path.exists(json_path): return
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Peringatan: Cache JSON lama tidak bisa dibaca: {e}")
+            return
+        # chat_id tidak tersimpan di format lama; diisi saat pertama kali diakses dari sebuah chat
+        self.put_many(None, legacy, replace=False)
+        try:
+            os.replace(json_path, json_path + ".migrated")
+        except OSError as e:
+            print(f"Peringatan: Gagal menandai cache JSON lama: {e}")
+        print(f"MessageStore: {len(legacy)} entri cache lama dimigrasi ke SQLite.")
+
+    def load_chat(self, chat_id):
+        """Semua entri cache milik satu chat sebagai dict {message_id: value}."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message_id, value FROM message_cache WHERE chat_id = ?", (chat_id,)
+            ).fetchall()
+        return {message_id: json.loads(value) for message_id, value in rows}
+
+    def get(self, message_id, chat_id=None):
+        """Lookup per primary key. Entri lama tanpa chat_id diadopsi ke chat_id yang diberikan."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT chat_id, value FROM message_cache WHERE message_id = ?", (message_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if chat_id and row[0] is None:
+                self._conn.execute(
+                    "UPDATE message_cache SET chat_id = ? WHERE message_id = ?", (chat_id, message_id)
+                )
+                self._conn.commit()
+        return json.loads(row[1])
+
+    def put(self, chat_id, message_id, value):
+        self.put_many(chat_id, {message_id: value})
+
+    def put_many(self, chat_id, entries, replace=True):
+        """Simpan banyak entri dalam satu transaksi (satu commit)."""
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        rows = [(message_id, chat_id, json.dumps(value, ensure_ascii=False))
+                for message_id, value in entries.items() if message_id]
+        if not rows: return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    f"{verb} INTO message_cache (message_id, chat_id, value) VALUES (?, ?, ?)", rows
+                )
+
+    def for_chat(self, chat_id):
+        return ChatCache(self, chat_id)
+
+
+class ChatCache:
+    """
+    Tampilan cache untuk satu chat. Dimuat dari SQLite saat dibuat, lookup
+    berikutnya dari dict di memori. Penugasan item (cache[id] = v) hanya di
+    memori; gunakan put()/put_many() untuk menyimpan ke disk.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, store, chat_id):
+        self.store = store
+        self.chat_id = chat_id
+        self._entries = store.load_chat(chat_id)
+        self._misses = set()
+
+    def get(self, message_id, default=None):
+        if not message_id: return default
+        value = self._entries.get(message_id, self._MISSING)
+        if value is self._MISSING:
+            if message_id in self._misses:
+                return default
+            value = self.store.get(message_id, self.chat_id)
+            if value is None:
+                self._misses.add(message_id)
+                return default
+            self._entries[message_id] = value
+        return value
+
+    def __contains__(self, message_id):
+        return self.get(message_id) is not None
+
+    def __setitem__(self, message_id, value):
+        self._entries[message_id] = value
+        self._misses.discard(message_id)
+
+    def put(self, message_id, value):
+        self[message_id] = value
+        self.store.put(self.chat_id, message_id, value)
+
+    def put_many(self, entries):
+        for message_id, value in entries.items():
+            self[message_id] = value
+        self.store.put_many(self.chat_id, entries)
+
+
+_open_stores = {}
+_open_stores_lock = threading.Lock()
+
+def open_message_store(db_path, legacy_json_path=None):
+    """Satu MessageStore per file database untuk seluruh proses."""
+    with _open_stores_lock:
+        store = _open_stores.get(db_path)
+        if store is None:
+            store = MessageStore(db_path, legacy_json_path)
+            _open_stores[db_path] = store
+        return store
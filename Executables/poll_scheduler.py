@@ -0,0 +1,141 @@
+# poll_scheduler.py
+# [BARU] Penjadwal polling adaptif untuk ChatPage.
+# - Cepat setelah ada aktivitas, backoff eksponensial saat chat sepi
+# - Berhenti saat window tidak aktif / diminimize / halaman chat disembunyikan
+# - Polling yang masih berjalan tidak ditumpuk (coalesce)
+# - Setiap keputusan interval dicatat ke log (print)
+
+from PySide6.QtCore import QObject, QTimer
+
+
+class PollPolicy:
+    """Konfigurasi interval polling (ms)."""
+
+    def __init__(self, min_interval_ms=1000, max_interval_ms=30000, backoff_factor=2.0,
+                 push_interval_ms=60000, pause_when_inactive=True, verbose=True):
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.backoff_factor = backoff_factor
+        self.push_interval_ms = push_interval_ms  # Saat push aktif: polling jaga-jaga saja
+        self.pause_when_inactive = pause_when_inactive
+        self.verbose = verbose
+
+
+class PollScheduler(QObject):
+    """
+    Memanggil poll_fn() sesuai kebijakan. poll_fn memulai request (biasanya
+    lewat executor) dan pemilik WAJIB memanggil poll_finished(had_activity)
+    ketika hasilnya datang.
+    """
+
+    def __init__(self, poll_fn, policy=None, name="poll", parent=None):
+        super().__init__(parent)
+        self.poll_fn = poll_fn
+        self.policy = policy or PollPolicy()
+        self.name = name
+        self.interval_ms = self.policy.min_interval_ms
+        self.in_flight = False
+        self.pending = False         # Ada permintaan poll saat masih in-flight
+        self.paused_reasons = set()
+        self.push_connected = False
+        self.stopped = True
+        self._idle_polls = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timer)
+
+    def _log(self, message):
+        if self.policy.verbose:
+            print(f"PollScheduler[{self.name}]: {message}")
+
+    # --- Kontrol ---
+    def start(self):
+        self.stopped = False
+        self._log(f"mulai, interval {self.interval_ms} ms")
+        self._schedule_next()
+
+    def stop(self):
+        self.stopped = True
+        self._timer.stop()
+        self._log("berhenti")
+
+    def request_now(self):
+        """Poll secepatnya (event push, pesan terkirim, resume). Tidak menumpuk."""
+        if self.in_flight:
+            self.pending = True
+            return
+        self._run_poll()
+
+    def set_paused(self, reason, paused):
+        """Jeda/lanjut polling. Beberapa alasan (mis. 'inactive', 'hidden') bisa aktif bersamaan."""
+        if not self.policy.pause_when_inactive:
+            return
+        was_paused = bool(self.paused_reasons)
+        if paused:
+            self.paused_reasons.add(reason)
+        else:
+            self.paused_reasons.discard(reason)
+        is_paused = bool(self.paused_reasons)
+        if is_paused and not was_paused:
+            self._timer.stop()
+            self._log(f"dijeda ({reason})")
+        elif was_paused and not is_paused:
+            self._log(f"dilanjutkan ({reason}), poll segera")
+            self.request_now()
+
+    def set_push_connected(self, connected):
+        self.push_connected = connected
+        self._set_interval(self.policy.push_interval_ms if connected else self.policy.min_interval_ms,
+                           "push tersambung" if connected else "push terputus")
+        self._idle_polls = 0
+        self._schedule_next()
+
+    def notify_activity(self):
+        """Ada aktivitas (pesan baru/terkirim): kembali ke interval tercepat."""
+        self._idle_polls = 0
+        if not self.push_connected:
+            self._set_interval(self.policy.min_interval_ms, "aktivitas")
+            self._schedule_next()
+
+    # --- Siklus poll ---
+    def poll_finished(self, had_activity):
+        self.in_flight = False
+        if had_activity:
+            self.notify_activity()
+        elif not self.push_connected:
+            self._idle_polls += 1
+            backoff = self.policy.min_interval_ms * (self.policy.backoff_factor ** self._idle_polls)
+            self._set_interval(min(int(backoff), self.policy.max_interval_ms), f"sepi x{self._idle_polls}")
+        if self.pending:
+            self.pending = False
+            self._run_poll()
+        else:
+            self._schedule_next()
+
+    def _on_timer(self):
+        self._run_poll()
+
+    def _run_poll(self):
+        if self.stopped or self.paused_reasons:
+            return
+        if self.in_flight:
+            self._log("poll sebelumnya masih berjalan, dilewati")
+            return
+        self._timer.stop()
+        self.in_flight = True
+        try:
+            self.poll_fn()
+        except Exception as e:
+            self._log(f"poll gagal dimulai: {e}")
+            self.poll_finished(False)
+
+    def _schedule_next(self):
+        if self.stopped or self.paused_reasons or self.in_flight:
+            return
+        self._timer.start(self.interval_ms)
+
+    def _set_interval(self, interval_ms, reason):
+        if interval_ms != self.interval_ms:
+            self._log(f"interval {self.interval_ms} -> {interval_ms} ms ({reason})")
+            self.interval_ms = interval_ms
@@ -0,0 +1,137 @@
+# push_channel.py
+# [BARU] Klien push (Server-Sent Events) untuk notifikasi pesan baru.
+# Satu koneksi HTTP streaming per user menggantikan polling /load_messages
+# setiap detik. Jika koneksi push putus, sinyal 'disconnected' membuat
+# ChatPage kembali ke polling (interval adaptif) sampai push tersambung lagi.
+#
+# Protokol yang diharapkan dari server (GET events/<username>, text/event-stream):
+#   event: new_message            data: {"chat_id": "<user1>_<user2>"}
+#   event: contacts               data: {}
+#   baris komentar ":" sebagai heartbeat agar read timeout tidak terpicu.
+
+import json
+import threading
+from PySide6.QtCore import QObject, Signal
+
+
+class PushChannel(QObject):
+    message_event = Signal(str)   # chat_id yang menerima pesan baru
+    contacts_event = Signal()     # daftar kontak berubah
+    connected = Signal()
+    disconnected = Signal(str)    # alasan putus
+
+    def __init__(self, session, username, path_template="events/{username}",
+                 reconnect_delay=2.0, max_reconnect_delay=60.0, read_timeout=90):
+        super().__init__()
+        self.session = session
+        self.username = username
+        self.path = path_template.format(username=username)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.read_timeout = read_timeout
+        self.is_connected = False
+        self._running = False
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._response = None
+
+    def start(self):
+        if self._running: return
+        self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._stop_event.set()  # Bangunkan backoff reconnect
+        response = self._response
+        if response is not None:
+            try:
+                response.close()  # Memutus iterasi stream di thread push
+            except Exception:
+                pass
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while self._running:
+            try:
+                response = self.session.get(
+                    self.path, endpoint="push", stream=True,
+                    headers={"Accept": "text/event-stream"},
+                    timeout=(self.session.timeouts["default"], self.read_timeout),
+                )
+                if response.status_code != 200:
+                    response.close()
+                    raise ConnectionError(f"HTTP {response.status_code}")
+                response.encoding = "utf-8"  # text/event-stream selalu UTF-8
+                self._response = response
+                self._set_connected(True)
+                delay = self.reconnect_delay
+                for event, data in self._iter_events(response):
+                    self._dispatch(event, data)
+                reason = "stream ditutup server"
+            except Exception as e:
+                reason = str(e)
+            finally:
+                self._response = None
+            if not self._running:
+                break
+            self._set_connected(False, reason)
+            if self._stop_event.wait(delay):
+                break
+            delay = min(delay * 2, self.max_reconnect_delay)
+        self.is_connected = False
+
+    def _set_connected(self, is_connected, reason=""):
+        if is_connected == self.is_connected: return
+        self.is_connected = is_connected
+        if is_connected:
+            print(f"PushChannel: tersambung ({self.path}).")
+            self.connected.emit()
+        else:
+            print(f"PushChannel: terputus ({reason}), kembali ke polling.")
+            self.disconnected.emit(reason)
+
+    @staticmethod
+    def _iter_lines(response):
+        """
+        Baris demi baris langsung dari stream (readline), bukan iter_lines():
+        iter_lines membaca per 512 byte sehingga event kecil pada stream tanpa
+        chunked encoding tertahan sampai read timeout. Selalu UTF-8 (spesifikasi
+        SSE); tanpa charset di Content-Type requests akan memakai latin-1.
+        """
+        response.raw.decode_content = True
+        while True:
+            raw_line = response.raw.readline()
+            if not raw_line:
+                return
+            yield raw_line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    @classmethod
+    def _iter_events(cls, response):
+        """Parser SSE minimal: kumpulkan 'event:'/'data:' sampai baris kosong."""
+        event, data_lines = "message", []
+        for line in cls._iter_lines(response):
+            if not line:
+                if data_lines:
+                    yield event, "\n".join(data_lines)
+                event, data_lines = "message", []
+            elif line.startswith(":"):
+                continue  # heartbeat
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+
+    def _dispatch(self, event, data):
+        try:
+            payload = json.loads(data) if data else {}
+        except json.JSONDecodeError:
+            payload = {}
+        if event == "new_message":
+            chat_id = payload.get("chat_id")
+            if chat_id:
+                self.message_event.emit(chat_id)
+        elif event == "contacts":
+            self.contacts_event.emit()
@@ -1,111 +1,154 @@
 # registerpage.py (Versi Final dengan Registrasi Wajah)
 import os
-import cv2
-import io
-import zipfile
+import queue
 import requests
-import time
-import numpy as np
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# [REVISI] cv2 diimpor malas di dalam worker: baru dimuat saat dialog wajah dibuka
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
     QPushButton, QMessageBox, QDialog, QProgressBar
 )
 from PySide6.QtGui import QFont, QImage, QPixmap
 from PySide6.QtCore import Qt, QThread, QObject, Signal, Slot
+from face_engine import FaceCaptureEngine, FaceSampleSelector
+from utils import iter_multipart, iter_zip_stored
 
 # --- Konstanta Global untuk Biometrik ---
-CASCADE_PATH = "fm/haarcascade_frontalface_default.xml"
+# [REVISI] CASCADE_PATH kini dari face_engine (dipakai bersama loginpage)
 API_URL = "https://morsz.azeroth.site" # Ganti dengan URL server Anda
+# Jeda maksimum antar sampel selama upload berjalan (detik). Selama menunggu,
+# koneksi upload tidak mengirim apa pun; batas ini menjaga jeda tetap di bawah
+# timeout baca body server/proxy.
+SAMPLE_IDLE_TIMEOUT = 20
 
 #
 # --- [DARI CONTOH] Class Worker untuk Registrasi Wajah ---
 #
 class FaceRegisterWorker(QObject):
     """
-    Menjalankan pengambilan wajah dan upload di thread terpisah.
+    Mengumpulkan wajah dari FaceCaptureEngine lalu upload di thread terpisah.
+    [REVISI] Loop kamera & preview kini dijalankan engine; worker hanya subscriber.
+    [REVISI] Sampel yang diterima langsung di-encode JPEG di thread pool dan
+    zip-nya (ZIP_STORED) di-stream ke /register-face selama capture berjalan.
     """
-    progress_frame = Signal(QImage, str) # (video_frame, status_text)
+    status_updated = Signal(str)         # Teks status
     progress_value = Signal(int)         # Persentase progress bar
     finished = Signal(bool, str)         # (success, message)
     
-    def __init__(self, username, camera_index=0):
+    def __init__(self, username, engine):
         super().__init__()
         self.username = username
-        self.camera_index = camera_index
+        self.engine = engine
         self.images_to_capture = 50
         self._is_running = True
+        self._done = threading.Event()
+        self._selector = None
+        self._status_text = None
+        self._encode_pool = None
+        self._encoded = queue.Queue()  # Future JPEG sesuai urutan diterima; None = capture berakhir
+        self._abort_message = None
+
+    def _set_status(self, status_text):
+        if status_text != self._status_text:
+            self._status_text = status_text
+            self.status_updated.emit(status_text)
+
+    def _end_capture(self, abort_message=None):
+        if self._done.is_set():
+            return
+        if abort_message:
+            self._abort_message = abort_message
+            self._encoded.put(None)  # Bangunkan generator upload
+        self._done.set()
+
+    def _on_frame(self, frame, gray, face):
+        """Dipanggil di thread deteksi engine untuk setiap frame."""
+        if self._done.is_set():
+            return
+        if frame is None:
+            self._set_status("Error: Can't read frame.")
+            count = len(self._selector.final)
+            self._end_capture(f"Capture failed. Only got {count} images.")
+            return
+
+        if face is None:
+            self._set_status("Looking for face...")
+            return
+        # [REVISI] Sampel disaring selector (tanpa time.sleep): hanya crop tajam, frontal, dan berbeda
+        selector = self._selector
+        result = selector.offer(gray, face)
+        if result in ("accepted", "replaced"):
+            # Sampel yang baru final (terbaik di jendelanya) langsung di-encode di thread pool
+            for image in selector.take_final():
+                self._encoded.put(self._encode_pool.submit(self._encode_jpeg, image))
+            self._set_status(f"Captured image {len(selector.final)}/{selector.count}")
+            self.progress_value.emit(int(selector.progress() * 100))
+            if selector.is_full():
+                self._end_capture()
+        elif result == "duplicate":
+            self._set_status("Move your head slightly...")
+        elif result == "small":
+            self._set_status("Move closer to the camera...")
+        elif result == "blurry":
+            self._set_status("Hold still...")
+        elif result == "pose":
+            self._set_status("Look straight at the camera...")
+
+    @staticmethod
+    def _encode_jpeg(image_array):
+        import cv2
+        is_success, buffer = cv2.imencode(".jpg", image_array)
+        if not is_success:
+            raise Exception("Failed to encode image.")
+        return buffer.tobytes()
+
+    def _next_encoded(self, timeout=None):
+        """JPEG berikutnya (bytes); gagal jika capture berakhir atau tidak ada sampel dalam 'timeout' detik."""
+        try:
+            future = self._encoded.get(timeout=timeout)
+        except queue.Empty:
+            self._end_capture(f"No usable face for {timeout} seconds. Please try again.")
+            raise Exception(self._abort_message)
+        if future is None:
+            raise Exception(self._abort_message)
+        return future.result()
+
+    def _iter_encoded_images(self, first_image):
+        """(nama, bytes JPEG) sesuai urutan diterima; menunggu capture bila perlu."""
+        yield "image_0.jpg", first_image
+        for i in range(1, self.images_to_capture):
+            yield f"image_{i}.jpg", self._next_encoded(SAMPLE_IDLE_TIMEOUT)
+        # Semua sampel sudah didapat: lepas kamera sebelum sisa upload selesai
+        self.engine.stop()
+        self.status_updated.emit("Finishing upload...")
 
     @Slot()
     def run(self):
         try:
-            if not os.path.exists(CASCADE_PATH):
-                raise FileNotFoundError(f"Haar cascade not found at {CASCADE_PATH}")
-
-            face_detector = cv2.CascadeClassifier(CASCADE_PATH)
-            
-            cap = cv2.VideoCapture(self.camera_index) 
-            if not cap.isOpened():
-                raise IOError(f"Cannot open webcam at index {self.camera_index}.")
-
-            image_list = []
-            count = 0
-            
-            while count < self.images_to_capture and self._is_running:
-                ret, frame = cap.read()
-                if not ret:
-                    self.progress_frame.emit(None, "Error: Can't read frame.")
-                    break
-                
-                frame = cv2.flip(frame, 1)
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = face_detector.detectMultiScale(gray, 1.3, 5)
-
-                status_text = "Looking for face..."
-                
-                if len(faces) > 0:
-                    (x, y, w, h) = faces[0]
-                    face_roi = gray[y:y+h, x:x+w]
-                    
-                    if face_roi.size > 0:
-                        image_list.append(face_roi)
-                        count += 1
-                        status_text = f"Captured image {count}/{self.images_to_capture}"
-                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                        time.sleep(0.1) 
-                
-                rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_image.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-                
-                self.progress_frame.emit(qt_image, status_text)
-                self.progress_value.emit(int((count / self.images_to_capture) * 100))
-            
-            cap.release()
-            
-            if not self._is_running:
-                self.finished.emit(False, "Capture canceled by user.")
-                return
-
-            if len(image_list) < self.images_to_capture:
-                raise Exception(f"Capture failed. Only got {len(image_list)} images.")
-
-            self.progress_frame.emit(None, f"Captured {len(image_list)} images. Zipping...")
-            self.progress_value.emit(100)
-
-            mem_zip = io.BytesIO()
-            with zipfile.ZipFile(mem_zip, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for i, image_array in enumerate(image_list):
-                    is_success, buffer = cv2.imencode(".jpg", image_array)
-                    if is_success:
-                        zf.writestr(f"image_{i}.jpg", buffer.tobytes())
-            
-            mem_zip.seek(0)
-            self.progress_frame.emit(None, "Uploading to server...")
-
-            files = {'file': ('faces.zip', mem_zip, 'application/zip')}
-            data = {'username': self.username}
-            response = requests.post(f"{API_URL}/register-face", files=files, data=data, timeout=60)
+            self._selector = FaceSampleSelector(self.images_to_capture)
+            self._encode_pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                                   thread_name_prefix="face-encode")
+            self.engine.subscribe(self._on_frame)
+            self.engine.start()
+
+            # Koneksi baru dibuka setelah sampel pertama siap: waktu pengguna
+            # memposisikan wajah tidak membuat upload menganggur
+            first_image = self._next_encoded()
+
+            # Upload berjalan bersamaan dengan sisa capture: body multipart ditarik dari
+            # generator yang menunggu JPEG berikutnya (Transfer-Encoding: chunked)
+            content_type, body = iter_multipart(
+                'file', 'faces.zip', iter_zip_stored(self._iter_encoded_images(first_image)), 'application/zip',
+                fields={'username': self.username})
+            try:
+                response = requests.post(f"{API_URL}/register-face", data=body,
+                                         headers={'Content-Type': content_type}, timeout=60)
+            except Exception:
+                if self._abort_message:
+                    raise Exception(self._abort_message)
+                raise
+            print(f"FaceRegisterWorker: {self._selector.summary()}")
 
             if response.status_code == 200:
                 self.finished.emit(True, "Face registered successfully! Training started.")
@@ -113,13 +156,19 @@ class FaceRegisterWorker(QObject):
                 self.finished.emit(False, f"Server error: {response.json().get('message', 'Unknown error')}")
 
         except Exception as e:
-            self.finished.emit(False, f"Error: {e}")
+            if not self._is_running:
+                self.finished.emit(False, "Capture canceled by user.")
+            else:
+                self.finished.emit(False, f"Error: {e}")
         finally:
-            if 'cap' in locals() and cap.isOpened():
-                cap.release()
+            self.engine.unsubscribe(self._on_frame)
+            self.engine.stop()
+            if self._encode_pool is not None:
+                self._encode_pool.shutdown(wait=False, cancel_futures=True)
 
     def stop(self):
         self._is_running = False
+        self._end_capture("Capture canceled by user.")
 
 #
 # --- [DARI CONTOH] Class Dialog Pop-up untuk Registrasi Wajah ---
@@ -137,6 +186,7 @@ class FaceCaptureDialog(QDialog):
         
         self.thread = None
         self.worker = None
+        self.engine = None
 
         self.setWindowTitle("Register Face")
         self.setModal(True)
@@ -204,10 +254,13 @@ class FaceCaptureDialog(QDialog):
 
     def start_capture(self):
         self.thread = QThread()
-        self.worker = FaceRegisterWorker(self.username, self.camera_index)
+        # [REVISI] Dialog subscribe ke preview engine; worker subscribe ke hasil deteksi
+        self.engine = FaceCaptureEngine(self.camera_index, name="register")
+        self.engine.preview_ready.connect(self.update_frame)
+        self.worker = FaceRegisterWorker(self.username, self.engine)
         self.worker.moveToThread(self.thread)
 
-        self.worker.progress_frame.connect(self.update_frame)
+        self.worker.status_updated.connect(self.status_label.setText)
         self.worker.progress_value.connect(self.progress_bar.setValue)
         self.worker.finished.connect(self.on_finished)
         self.thread.started.connect(self.worker.run)
@@ -218,16 +271,18 @@ class FaceCaptureDialog(QDialog):
         
         self.thread.start()
 
-    @Slot(QImage, str)
-    def update_frame(self, qt_image, status_text):
-        if qt_image:
+    @Slot(QImage, int)
+    def update_frame(self, qt_image, slot):
+        # [REVISI] qt_image menunjuk buffer pool engine: kembalikan setelah dikonversi ke QPixmap
+        try:
             pixmap = QPixmap.fromImage(qt_image)
-            self.video_label.setPixmap(pixmap.scaled(
-                self.video_label.size(), 
-                Qt.AspectRatioMode.KeepAspectRatio, 
-                Qt.TransformationMode.SmoothTransformation
-            ))
-        self.status_label.setText(status_text)
+        finally:
+            self.engine.release_preview(slot)
+        self.video_label.setPixmap(pixmap.scaled(
+            self.video_label.size(), 
+            Qt.AspectRatioMode.KeepAspectRatio, 
+            Qt.TransformationMode.SmoothTransformation
+        ))
         
     @Slot(bool, str)
     def on_finished(self, success, message):
@@ -1,6 +1,5 @@
 import sys
 import os
-import json
 import uuid
 import psutil
 
@@ -11,27 +10,12 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import QThread, QObject, Signal, Slot
 from PySide6.QtGui import QIcon
 
-from utils import (
-    encrypt_config, decrypt_config, HARDCODED_SECRET,
-    SALT_SIZE, KEY_SIZE, ITERATIONS, HASH_ALG
-)
+# [REVISI] Baca/tulis daftar kunci lewat key_store (cache bersama usb_auth/main.py)
+from key_store import LOCAL_CONFIG_FILE, get_valid_keys, add_valid_key
 
 # --- Konfigurasi dari skrip asli ---
-def get_base_path():
-    """ 
-    Mendapatkan path ke DIREKTORI ROOT PROYEK (tempat 'auth/' dan 'data/' berada).
-    """
-    if getattr(sys, 'frozen', False):
-        # Dijalankan sebagai .exe, path dasarnya adalah folder tempat .exe berada
-        return os.path.dirname(sys.executable)
-    else:
-        # Dijalankan sebagai .py, asumsikan file ini ada di dalam subfolder (cth: 'Executables')
-        # Path: .../Project/Executables/setup_usb.py -> .../Project/
-        return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
+# (LOCAL_CONFIG_FILE dipindah ke key_store.py, yang memakai utils.get_base_path)
 KEY_FILE_NAME = ".my_crypto_app_key"
-parent_dir = get_base_path()
-LOCAL_CONFIG_FILE = os.path.join(parent_dir, "auth", "auth.config")
 
 # --- Fungsi Enkripsi/Dekripsi (Tidak berubah) ---
 # --- Utilitas USB (Tidak berubah) ---
@@ -75,35 +59,9 @@ class DriveSetter(QObject):
         try:
             # --- LOGIKA BARU UNTUK MULTI-KEY ---
             
-            # 1. Baca daftar kunci yang ada (jika ada)
-            current_keys = []
-            if os.path.exists(LOCAL_CONFIG_FILE):
-                print(f"Membaca {LOCAL_CONFIG_FILE} yang ada...")
-                try:
-                    with open(LOCAL_CONFIG_FILE, "rb") as f:
-                        encrypted_data = f.read()
-                    
-                    # Dekripsi data untuk mendapatkan JSON string dari list
-                    decrypted_json_list = decrypt_config(encrypted_data, HARDCODED_SECRET)
-                    
-                    if decrypted_json_list:
-                        current_keys = json.loads(decrypted_json_list)
-                        if not isinstance(current_keys, list):
-                            print("Data korup, bukan list. Memulai dari awal.")
-                            current_keys = []
-                        else:
-                            print(f"Ditemukan {len(current_keys)} kunci yang sudah terdaftar.")
-                    else:
-                        # Ini terjadi jika file ada tapi password/enkripsi gagal
-                        print("Gagal dekripsi config. Memulai dari awal.")
-                        current_keys = []
-                        
-                except Exception as e:
-                    print(f"Error membaca/dekripsi config. Memulai dari awal. Error: {e}")
-                    current_keys = []
-            else:
-                print("File config tidak ditemukan. Membuat baru.")
-                current_keys = []
+            # 1. [REVISI] Daftar kunci yang ada dibaca dari cache key_store: config hanya
+            #    didekripsi sekali per proses (file rusak/gagal dekripsi = daftar kosong)
+            print(f"Ditemukan {len(get_valid_keys())} kunci yang sudah terdaftar.")
 
             # 2. Generate key UNIK baru untuk USB
             secret_key = str(uuid.uuid4())
@@ -113,23 +71,9 @@ class DriveSetter(QObject):
             with open(key_file_path, "w") as f:
                 f.write(secret_key)
             
-            # 4. Tambahkan key baru ke daftar (JANGAN TIMPA)
-            if secret_key not in current_keys:
-                current_keys.append(secret_key)
-                print("Kunci baru ditambahkan ke daftar.")
-            else:
-                print("Peringatan: Kunci ini sudah ada di daftar.")
-                
-            # 5. Enkripsi SELURUH DAFTAR (sebagai JSON string) kembali ke file lokal
-            new_json_list_string = json.dumps(current_keys)
-            encrypted_config_data = encrypt_config(new_json_list_string, HARDCODED_SECRET)
-            
-            # Pastikan direktori 'auth' ada
-            os.makedirs(os.path.dirname(LOCAL_CONFIG_FILE), exist_ok=True)
-            
-            # Timpa file config dengan daftar yang sudah diperbarui
-            with open(LOCAL_CONFIG_FILE, "wb") as f:
-                f.write(encrypted_config_data)
+            # 4-5. Tambahkan key baru ke daftar (JANGAN TIMPA), enkripsi SELURUH DAFTAR
+            #      kembali ke file lokal; cache key_store diperbarui tanpa dekripsi ulang
+            add_valid_key(secret_key)
 
             # --- SELESAI LOGIKA BARU ---
             
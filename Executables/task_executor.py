@@ -0,0 +1,94 @@
+# task_executor.py
+# [BARU] Executor latar belakang bersama untuk semua I/O jaringan klien.
+# Pekerjaan dijalankan di QThreadPool, hasilnya dikirim balik ke thread GUI
+# lewat sinyal Qt sehingga callback aman menyentuh widget.
+
+import traceback
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+
+
+def is_deleted_object_error(error):
+    """True jika RuntimeError berasal dari wrapper Qt yang objek C++-nya sudah dihapus."""
+    return isinstance(error, RuntimeError) and "already deleted" in str(error)
+
+
+class _CallbackBridge(QObject):
+    """
+    Hidup di thread GUI. Worker meng-emit 'deliver' dari thread pool,
+    Qt mengantrekan (queued connection) sehingga callback dipanggil di thread GUI.
+    """
+    deliver = Signal(object, object)
+
+    def __init__(self):
+        super().__init__()
+        self.deliver.connect(self._on_deliver)
+
+    @Slot(object, object)
+    def _on_deliver(self, callback, value):
+        try:
+            callback(value)
+        except Exception as e:
+            if is_deleted_object_error(e):
+                # Widget pemilik callback sudah dihapus (mis. ChatPage ditutup)
+                print(f"Callback diabaikan, objek sudah tidak ada: {e}")
+                return
+            # Bug di callback UI: tampilkan traceback lengkap, jangan ditelan
+            print(f"Callback {getattr(callback, '__name__', callback)} error:")
+            traceback.print_exc()
+
+
+class _Task(QRunnable):
+    def __init__(self, bridge, fn, args, kwargs, on_result, on_error):
+        super().__init__()
+        self.bridge = bridge
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_result = on_result
+        self.on_error = on_error
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if self.on_error:
+                self.bridge.deliver.emit(self.on_error, e)
+            else:
+                print(f"Task {getattr(self.fn, '__name__', self.fn)} gagal: {e}")
+            return
+        if self.on_result:
+            self.bridge.deliver.emit(self.on_result, result)
+
+
+class RequestExecutor:
+    """
+    Menjalankan fungsi blocking (requests, enkripsi, stegano) di thread pool.
+    Harus dibuat di thread GUI agar callback kembali ke thread GUI.
+
+    Contoh:
+        executor.submit(manager.load_messages, chat_id, on_result=self.tampilkan)
+    """
+
+    def __init__(self, max_threads=4):
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+        self._bridge = _CallbackBridge()
+
+    def submit(self, fn, *args, on_result=None, on_error=None, **kwargs):
+        """Antrikan fn(*args, **kwargs). on_result/on_error dipanggil di thread GUI."""
+        task = _Task(self._bridge, fn, args, kwargs, on_result, on_error)
+        self.pool.start(task)
+
+    def wait_for_done(self, msecs=-1):
+        """Tunggu semua task selesai (dipakai saat aplikasi ditutup)."""
+        return self.pool.waitForDone(msecs)
+
+
+_shared_executor = None
+
+def get_shared_executor():
+    """Executor tunggal untuk seluruh aplikasi (dibuat malas di thread GUI)."""
+    global _shared_executor
+    if _shared_executor is None:
+        _shared_executor = RequestExecutor()
+    return _shared_executor
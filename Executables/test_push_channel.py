@@ -0,0 +1,78 @@
+# test_push_channel.py
+# [BARU] Test lokal parser SSE PushChannel terhadap server HTTP sungguhan
+# (tanpa chunked encoding dan dengan chunked encoding).
+# Jalankan dari folder Executables: python -m unittest test_push_channel
+
+import time
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from push_channel import PushChannel
+
+EVENTS = 'event: new_message\ndata: {"chat_id": "ana_zoë"}\n\n'
+
+
+class _SseHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        chunked = self.path == "/chunked"
+        self.protocol_version = "HTTP/1.1" if chunked else "HTTP/1.0"
+        self.send_response(200)
+        # Tanpa charset: requests akan menebak latin-1 jika tidak dipaksa UTF-8
+        self.send_header("Content-Type", "text/event-stream")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        body = EVENTS.encode("utf-8")
+        if chunked:
+            body = f"{len(body):x}\r\n".encode() + body + b"\r\n"
+        self.wfile.write(body)
+        self.wfile.flush()
+        self.server.release.wait(5)  # Stream tetap terbuka, tidak ada data lagi
+
+
+class PushChannelSseTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _SseHandler)
+        cls.server.release = threading.Event()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.release.set()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _first_event(self, path):
+        start = time.monotonic()
+        response = requests.get(self.base_url + path, stream=True, timeout=(2, 2))
+        try:
+            event = next(PushChannel._iter_events(response))
+        finally:
+            response.close()
+        return event, time.monotonic() - start
+
+    def test_event_without_chunked_encoding_is_not_delayed(self):
+        (event, data), elapsed = self._first_event("/plain")
+        self.assertEqual(event, "new_message")
+        self.assertLess(elapsed, 1.0)
+
+    def test_event_with_chunked_encoding(self):
+        (event, data), elapsed = self._first_event("/chunked")
+        self.assertEqual(event, "new_message")
+        self.assertLess(elapsed, 1.0)
+
+    def test_data_is_decoded_as_utf8(self):
+        (event, data), _ = self._first_event("/plain")
+        self.assertEqual(data, '{"chat_id": "ana_zoë"}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# test_whitemist_binary.py
+# [BARU] Test mode biner White-Mist ('whitemist-bin') terhadap modul WhiteMist asli:
+# jadwal kunci sama dengan letsEncrypt, round-trip bytes/chunk/file, dan fallback
+# ke format teks jika generatedKeys() tidak tersedia.
+# Jalankan dari folder Executables: python -m unittest test_whitemist_binary
+
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import utils
+
+KEY = "kunci-rahasia"
+
+
+@unittest.skipIf(utils.crossCross is None, "Modul WhiteMist tidak ditemukan")
+class WhiteMistBinaryTest(unittest.TestCase):
+    def setUp(self):
+        utils.clear_whitemist_cache()
+        self.addCleanup(utils.clear_whitemist_cache)
+
+    def test_byte_key_matches_lets_encrypt(self):
+        # letsEncrypt menggeser indeks unicode tiap karakter dengan trueKey[:-1] berulang
+        encryptor = utils.crossCross.state(key=KEY, salt=utils.WHITEMIST_SALT, sugar=utils.WHITEMIST_SUGAR)
+        table = encryptor.unicodeDatas
+        word = "a" * 100
+        encrypted = encryptor.letsEncrypt(word)
+        shifts = [table.index(c) - table.index("a") for c in encrypted]
+
+        byte_key = utils.get_whitemist_states(KEY).byte_key.tolist()
+        expected = [byte_key[i % len(byte_key)] for i in range(len(word))]
+        self.assertEqual([s % 256 for s in shifts], expected)
+
+    def test_bytes_round_trip(self):
+        data = os.urandom(10000)
+        payload = utils.encrypt_whitemist_bytes(data, KEY)
+        self.assertTrue(utils.is_whitemist_binary(payload))
+        self.assertEqual(len(payload), len(data) + len(utils.WHITEMIST_BINARY_MAGIC))
+        self.assertNotEqual(bytes(payload[len(utils.WHITEMIST_BINARY_MAGIC):]), data)
+        self.assertEqual(bytes(utils.decrypt_whitemist_bytes(payload, KEY)), data)
+
+    def test_chunked_stream_matches_whole_buffer(self):
+        data = os.urandom(5003)
+        streamed = b"".join(utils.iter_whitemist_encrypt(io.BytesIO(data), KEY, chunk_size=1000))
+        self.assertEqual(streamed, bytes(utils.encrypt_whitemist_bytes(data, KEY)))
+        decrypted = b"".join(utils.iter_whitemist_decrypt(io.BytesIO(streamed), KEY, chunk_size=777))
+        self.assertEqual(decrypted, data)
+
+    def test_decrypt_file_handles_binary_and_text_formats(self):
+        data = os.urandom(3000)
+        with tempfile.TemporaryDirectory() as tmp:
+            binary_path = os.path.join(tmp, "bin.enc")
+            with open(binary_path, "wb") as f:
+                f.write(utils.encrypt_whitemist_bytes(data, KEY))
+            text_path = os.path.join(tmp, "text.enc")
+            with open(text_path, "w", encoding="utf-8") as f:
+                f.write(utils.encrypt_whitemist(data, KEY))
+
+            for in_path in (binary_path, text_path):
+                out_path = utils.decrypt_whitemist_file(in_path, os.path.join(tmp, "out"), KEY)
+                with open(out_path, "rb") as f:
+                    self.assertEqual(f.read(), data)
+
+    def test_missing_generated_keys_disables_binary_mode(self):
+        class StateWithoutKeys(utils.crossCross.state):
+            generatedKeys = None
+
+        self.assertTrue(utils.whitemist_binary_supported(KEY))
+        utils.clear_whitemist_cache()
+        with mock.patch.object(utils.crossCross, "state", StateWithoutKeys):
+            self.assertFalse(utils.whitemist_binary_supported(KEY))
+            with self.assertRaises(ValueError):
+                utils.encrypt_whitemist_bytes(b"data", KEY)
+            # Format teks lama tetap berfungsi
+            encrypted = utils.encrypt_whitemist(b"data", KEY)
+            self.assertEqual(utils.decrypt_whitemist(encrypted, KEY), b"data")
+
+
+if __name__ == "__main__":
+    unittest.main()
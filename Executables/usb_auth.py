@@ -4,64 +4,28 @@ import os
 import time
 import psutil
 import sys
-import json  # <-- TAMBAHKAN IMPORT INI
-from tkinter import messagebox
-from utils import get_base_path
-from utils import decrypt_config # Ini diimpor dari setup_usb.py
-from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import QMetaObject, Qt, Q_ARG
-
-# --- Path Konfigurasi (Tidak berubah) ---
-def get_base_path():
-    """ 
-    Fungsi ini harus disalin dari utils.py karena ini file terpisah
-    """
-    if getattr(sys, 'frozen', False):
-        return os.path.dirname(sys.executable)
-    else:
-        # Asumsi file ini ada di Executables/
-        return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-parent_dir = get_base_path()
-LOCAL_CONFIG_FILE = os.path.join(parent_dir, "auth", "auth.config")
+import queue
+import select
+import socket
+import threading
+from key_store import LOCAL_CONFIG_FILE, key_digest, get_valid_key_set, get_valid_keys
+# [REVISI] Semua dialog USB memakai Qt (tkinter tidak lagi diimpor)
+from PySide6.QtWidgets import QDialog, QLabel, QPushButton, QVBoxLayout, QHBoxLayout
+from PySide6.QtCore import Qt, QObject, QTimer, Signal
+from task_executor import get_shared_executor
+
+# --- Path Konfigurasi ---
+# [REVISI] LOCAL_CONFIG_FILE dan cache kunci valid kini di key_store.py (dipakai bersama setup_usb)
 USB_KEY_FILE = ".my_crypto_app_key"
-from utils import HARDCODED_SECRET as MASTER_SECRET
 
 
-# --- NAMA FUNGSI DAN LOGIKA DIUBAH ---
+# --- [REVISI] Dekripsi config hanya sekali per proses (cache di key_store) ---
 def get_all_valid_keys():
     """
-    Membaca dan mendekripsi file config lokal untuk mendapatkan DAFTAR
-    semua USB key yang valid.
+    DAFTAR semua USB key yang valid (list str). Untuk pengecekan USB lebih baik
+    pakai get_valid_key_set() yang tidak menyalin nilai kunci asli.
     """
-    if not os.path.exists(LOCAL_CONFIG_FILE):
-        print(f"⚠️ File {LOCAL_CONFIG_FILE} tidak ditemukan.")
-        return []  # Kembalikan list kosong
-
-    try:
-        with open(LOCAL_CONFIG_FILE, "rb") as f:
-            encrypted_data = f.read()
-
-        # Dekripsi data untuk mendapatkan JSON string dari list
-        decrypted_json_list = decrypt_config(encrypted_data, MASTER_SECRET)
-        
-        if not decrypted_json_list:
-            print("⚠️ Gagal mendekripsi config. Pastikan password benar.")
-            return []  # Kembalikan list kosong
-
-        # Parse JSON string menjadi Python list
-        valid_keys = json.loads(decrypted_json_list)
-        
-        if not isinstance(valid_keys, list):
-             print("⚠️ Data config korup, bukan list.")
-             return []
-
-        print(f"Berhasil memuat {len(valid_keys)} kunci yang terdaftar.")
-        return valid_keys
-        
-    except Exception as e:
-        print(f"❌ Error membaca {LOCAL_CONFIG_FILE}: {e}")
-        return []  # Kembalikan list kosong
+    return get_valid_keys()
 
 
 def find_removable_drives():
@@ -74,62 +38,413 @@ def find_removable_drives():
     return drives
 
 
-# --- LOGIKA FUNGSI INI DIUBAH ---
-def find_usb_key_drive(valid_key_list: list):
+# --- [BARU] Set kunci ter-hash ---
+# Kunci valid disimpan sebagai frozenset digest SHA-256: lookup O(1) dan
+# nilai kunci asli tidak perlu dibandingkan/di-scan satu per satu.
+def make_key_set(valid_keys=None):
     """
-    Mencari USB drive yang memiliki key yang cocok dengan
-    SALAH SATU key di dalam valid_key_list.
+    list kunci (str) -> frozenset digest. Set yang sudah di-hash dikembalikan apa adanya;
+    None = set terkini dari key_store (ikut berubah jika auth.config diperbarui).
+    Callable (mis. get_valid_key_set) dipanggil dulu: pemakai yang berjalan lama
+    (monitor, dialog) menerima getter agar perubahan ValidKeyStore langsung terlihat.
     """
-    drives = find_removable_drives()
-    for drive in drives:
-        key_path = os.path.join(drive, USB_KEY_FILE)
-        if os.path.exists(key_path):
+    if valid_keys is None:
+        return get_valid_key_set()
+    if callable(valid_keys):
+        return make_key_set(valid_keys())
+    if isinstance(valid_keys, frozenset):
+        return valid_keys
+    return frozenset(key_digest(key) for key in valid_keys)
+
+
+# --- [BARU] Probe drive paralel ---
+# Drive diperiksa oleh pool kecil thread daemon yang tetap hidup (tidak ada thread
+# baru per siklus) dengan batas waktu per pemindaian, sehingga mount jaringan/optik
+# yang macet tidak menahan pengecekan startup maupun monitor. Key file selalu
+# dibaca ulang (tanpa cache): stat pada USB yang dicabut paksa bisa tetap berhasil
+# dari data inode yang di-cache kernel.
+PROBE_TIMEOUT = 2.0  # detik per pemindaian (semua drive diperiksa bersamaan)
+PROBE_THREADS = 4    # thread daemon tetap untuk probe
+
+# Hasil scan_usb_key
+KEY_PRESENT = "present"
+KEY_ABSENT = "absent"
+KEY_UNKNOWN = "unknown"  # Tidak ada kecocokan, tapi ada drive yang belum menjawab (lambat/macet)
+
+_probe_inflight = set()   # mountpoint yang probe-nya belum selesai (mungkin macet)
+_probe_lock = threading.Lock()
+
+def _probe_drive(drive):
+    """Digest kunci di drive, atau None jika tidak ada key file / gagal dibaca."""
+    key_path = os.path.join(drive, USB_KEY_FILE)
+    try:
+        with open(key_path, "r") as f:
+            return key_digest(f.read().strip())
+    except Exception:
+        return None  # Tidak ada key file / error baca: lanjut ke drive lain
+
+
+class _ProbePool:
+    """Beberapa thread daemon tetap yang menjalankan _probe_drive (dibuat saat pertama dipakai)."""
+
+    def __init__(self, size=PROBE_THREADS):
+        self.size = size
+        self._tasks = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, drive, results):
+        with self._lock:
+            if len(self._threads) < self.size:
+                thread = threading.Thread(target=self._run, name=f"usb-probe-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self._tasks.put((drive, results))
+
+    def _run(self):
+        while True:
+            drive, results = self._tasks.get()
             try:
-                with open(key_path, "r") as f:
-                    key_value = f.read().strip()
-                
-                # Cek apakah key di USB ada di dalam DAFTAR key yang valid
-                if key_value in valid_key_list:
-                    print(f"✅ USB key cocok ditemukan di: {drive}")
-                    return drive
-                else:
-                    print(f"⚠️ Ditemukan USB key di {drive}, tapi key tidak cocok/terdaftar.")
-                    
-            except Exception:
-                continue  # Lanjut ke drive berikutnya jika ada error baca
-    return None
+                results.put((drive, _probe_drive(drive)))
+            finally:
+                with _probe_lock:
+                    _probe_inflight.discard(drive)
+
+_probe_pool = _ProbePool()
+
+
+# --- [REVISI] Pemindaian paralel dengan timeout dan berhenti di kecocokan pertama ---
+def scan_usb_key(valid_key_list=None, timeout=PROBE_TIMEOUT):
+    """
+    Mencari USB drive yang memiliki key yang cocok dengan SALAH SATU key di
+    dalam valid_key_list (list kunci, hasil make_key_set, atau getter).
+    Mengembalikan (status, drive): KEY_PRESENT dan drive yang cocok, KEY_ABSENT
+    jika semua drive menjawab tanpa kecocokan, atau KEY_UNKNOWN jika ada drive
+    yang tidak menjawab dalam 'timeout' (atau probe sebelumnya masih macet).
+    """
+    key_set = make_key_set(valid_key_list)
+    results = queue.Queue()
+    pending = 0
+    unresponsive = 0
+    for drive in find_removable_drives():
+        with _probe_lock:
+            if drive in _probe_inflight:
+                # Probe sebelumnya masih macet: jangan tumpuk, tapi jangan anggap kosong
+                print(f"⚠️ Drive {drive} belum merespons dari pemindaian sebelumnya.")
+                unresponsive += 1
+                continue
+            _probe_inflight.add(drive)
+        _probe_pool.submit(drive, results)
+        pending += 1
+
+    deadline = time.monotonic() + timeout
+    while pending:
+        remaining = deadline - time.monotonic()
+        try:
+            drive, digest = results.get(timeout=max(remaining, 0))
+        except queue.Empty:
+            print(f"⚠️ {pending} drive tidak merespons dalam {timeout} detik.")
+            unresponsive += pending
+            break
+        pending -= 1
+        if digest is None:
+            continue
+        # Cek apakah key di USB ada di dalam set key yang valid
+        if digest in key_set:
+            print(f"✅ USB key cocok ditemukan di: {drive}")
+            return KEY_PRESENT, drive  # Berhenti di kecocokan pertama; probe lain selesai sendiri
+        print(f"⚠️ Ditemukan USB key di {drive}, tapi key tidak cocok/terdaftar.")
+    return (KEY_UNKNOWN if unresponsive else KEY_ABSENT), None
+
+
+def find_usb_key_drive(valid_key_list=None, timeout=PROBE_TIMEOUT):
+    """Drive dengan key yang cocok, atau None (tidak ada atau belum bisa dipastikan)."""
+    return scan_usb_key(valid_key_list, timeout)[1]
 
 
 # --- ARGUMEN FUNGSI INI DIUBAH ---
-def check_usb_key(valid_key_list: list):
+def check_usb_key(valid_key_list=None):
     """Mengecek apakah USB dengan key yang cocok sedang terpasang."""
     return find_usb_key_drive(valid_key_list) is not None
 
 
-# --- ARGUMEN FUNGSI INI DIUBAH ---
-def monitor_usb_drive(qt_app, valid_key_list: list):
+# --- [BARU] Backend pemantauan perubahan mount ---
+UEVENT_SAFETY_INTERVAL = 60  # detik; cek ulang jaga-jaga jika uevent kernel dipakai
+UNKNOWN_RETRY = 1.0          # detik sebelum cek ulang jika status USB belum pasti
+UNKNOWN_GRACE = 30.0         # detik status "belum pasti" sebelum key dianggap dilepas
+
+class PollingMountBackend:
+    """Fallback (Windows/macOS): anggap 'mungkin berubah' setiap interval detik."""
+    name = "polling"
+
+    def __init__(self, interval=2):
+        self.interval = interval
+        self._wake = threading.Event()
+
+    def wait(self, timeout=None):
+        """Blok sampai ada (kemungkinan) perubahan. True = periksa ulang, False = dibangunkan/stop."""
+        woken = self._wake.wait(self.interval if timeout is None else min(timeout, self.interval))
+        self._wake.clear()
+        return not woken
+
+    def wake(self):
+        self._wake.set()
+
+    def close(self):
+        pass
+
+
+class ProcMountsBackend:
     """
-    Memantau keberadaan SALAH SATU USB key yang valid.
-    Jika dilepas, aplikasi akan ditutup.
+    Linux: kernel menandai /proc/self/mounts dengan POLLPRI|POLLERR setiap kali
+    tabel mount berubah (USB di-mount/di-unmount). Thread tidur di poll() tanpa
+    memakai CPU dan bangun dalam hitungan milidetik.
+    USB yang dicabut paksa tanpa unmount TIDAK selalu mengubah tabel mount, jadi
+    backend ini sendiri tetap butuh cek ulang berkala; dipakai hanya jika uevent
+    kernel (UeventBackend) tidak tersedia.
     """
-    print("🔍 Memulai pemantauan USB key (mode multi-key)...")
-    while True:
-        # check_usb_key sekarang menerima list
-        if not check_usb_key(valid_key_list):
-            print("❌ SEMUA USB key terdaftar dilepas! Menutup aplikasi...")
+    name = "proc-mounts"
+    MOUNTS_PATH = "/proc/self/mounts"
+
+    @classmethod
+    def is_supported(cls):
+        return sys.platform.startswith("linux") and hasattr(select, "poll") and os.path.exists(cls.MOUNTS_PATH)
+
+    def __init__(self, safety_interval=2):
+        # safety_interval: cek ulang berkala sebagai jaring pengaman (None = hanya event).
+        self.safety_interval = safety_interval
+        self._mounts = open(self.MOUNTS_PATH, "rb")
+        self._mounts.read()  # Baca sekali agar event berikutnya hanya untuk perubahan baru
+        self._wake_r, self._wake_w = os.pipe()
+        self._poller = select.poll()
+        self._poller.register(self._mounts.fileno(), select.POLLPRI | select.POLLERR)
+        self._poller.register(self._wake_r, select.POLLIN)
+
+    def wait(self, timeout=None):
+        if timeout is None:
+            timeout = self.safety_interval
+        events = self._poller.poll(None if timeout is None else int(timeout * 1000))
+        if not events:
+            return True  # Timeout jaring pengaman
+        changed = False
+        for fd, _ in events:
+            if fd == self._wake_r:
+                os.read(self._wake_r, 64)
+                return False
+            changed = self._handle_event(fd) or changed
+        return changed
+
+    def _handle_event(self, fd):
+        """True jika event pada fd berarti USB perlu diperiksa ulang."""
+        self._mounts.seek(0); self._mounts.read()
+        return True
+
+    def wake(self):
+        if not self._mounts.closed:
+            os.write(self._wake_w, b"x")
+
+    def close(self):
+        if self._mounts.closed: return
+        self._mounts.close()
+        os.close(self._wake_r); os.close(self._wake_w)
+
+
+class UeventBackend(ProcMountsBackend):
+    """
+    Linux: selain tabel mount, dengarkan uevent kernel (netlink, tanpa root dan
+    tanpa pyudev) untuk perangkat blok. Kernel selalu mengirim uevent 'remove'
+    saat disk/partisi USB hilang, termasuk jika dicabut tanpa unmount, sehingga
+    saat idle thread hanya tidur di poll() dan jaring pengaman cukup sangat jarang.
+    """
+    name = "uevent"
+    NETLINK_KOBJECT_UEVENT = 15
+    KERNEL_GROUP = 1                     # Multicast group uevent dari kernel
+    WATCHED_ACTIONS = (b"add", b"remove", b"change")
+
+    @classmethod
+    def is_supported(cls):
+        return super().is_supported() and hasattr(socket, "AF_NETLINK")
+
+    def __init__(self, safety_interval=UEVENT_SAFETY_INTERVAL):
+        self._uevents = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, self.NETLINK_KOBJECT_UEVENT)
+        try:
+            self._uevents.bind((0, self.KERNEL_GROUP))
+            self._uevents.setblocking(False)
+            super().__init__(safety_interval)
+        except OSError:
+            self._uevents.close()
+            raise
+        self._poller.register(self._uevents.fileno(), select.POLLIN)
+
+    @classmethod
+    def is_block_event(cls, message):
+        """Pesan uevent kernel: 'aksi@devpath\0KEY=VALUE\0...'. True untuk add/remove/change perangkat blok."""
+        fields = message.split(b"\0")
+        action = fields[0].split(b"@", 1)[0]
+        return action in cls.WATCHED_ACTIONS and b"SUBSYSTEM=block" in fields[1:]
+
+    def _handle_event(self, fd):
+        if fd != self._uevents.fileno():
+            return super()._handle_event(fd)
+        relevant = False
+        while True:
             try:
-                messagebox.showwarning(
-                    "USB Key Removed",
-                    "USB key terdaftar dilepas! Aplikasi akan ditutup demi keamanan."
-                )
-            except Exception:
-                pass  # Gagal tampilkan popup jika GUI thread sudah mati
-
-            # Kirim sinyal quit ke thread utama Qt
-            QMetaObject.invokeMethod(
-                qt_app,
-                "quit",
-                Qt.QueuedConnection
-            )
-            return  # Hentikan thread monitor
-        time.sleep(2)
\ No newline at end of file
+                message = self._uevents.recv(16384)
+            except BlockingIOError:
+                return relevant
+            except OSError as e:
+                # ENOBUFS: ada uevent yang terlewat, periksa ulang untuk amannya
+                print(f"⚠️ Uevent terlewat ({e}), USB diperiksa ulang.")
+                return True
+            relevant = self.is_block_event(message) or relevant
+
+    def close(self):
+        if self._mounts.closed: return
+        super().close()
+        self._uevents.close()
+
+
+def create_mount_backend(interval=2):
+    """
+    Uevent kernel + tabel mount jika tersedia (Linux), lalu tabel mount + cek
+    ulang setiap 'interval' detik, lalu polling murni.
+    """
+    if UeventBackend.is_supported():
+        try:
+            return UeventBackend()
+        except OSError as e:
+            print(f"⚠️ Uevent kernel tidak tersedia ({e}), memakai /proc/mounts.")
+    if ProcMountsBackend.is_supported():
+        try:
+            return ProcMountsBackend(safety_interval=interval)
+        except OSError as e:
+            print(f"⚠️ Pemantauan /proc/mounts tidak tersedia ({e}), kembali ke polling.")
+    return PollingMountBackend(interval)
+
+
+# --- [REVISI] Pemantauan tanpa GUI: cukup panggil callback saat key dilepas ---
+def monitor_usb_drive(valid_key_list, on_removed, stop_event=None, interval=2, backend=None):
+    """
+    Memantau keberadaan SALAH SATU USB key yang valid (blocking, jalankan di thread).
+    [REVISI] Event-driven: USB diperiksa ulang segera saat ada uevent perangkat
+    blok atau tabel mount berubah (Linux). Jaring pengaman: setiap
+    UEVENT_SAFETY_INTERVAL detik dengan uevent, atau setiap 'interval' detik pada
+    backend fallback. Jika semua key dilepas, on_removed() dipanggil sekali lalu
+    fungsi selesai.
+    [REVISI] Drive yang lambat/macet (KEY_UNKNOWN) bukan bukti key dilepas: dicek
+    ulang setiap UNKNOWN_RETRY detik, dan baru dianggap dilepas jika tetap belum
+    pasti selama UNKNOWN_GRACE detik.
+    """
+    stop_event = stop_event or threading.Event()
+    backend = backend or create_mount_backend(interval)
+    print(f"🔍 Memulai pemantauan USB key (mode multi-key, backend: {backend.name})...")
+    unknown_since = None
+    try:
+        while not stop_event.is_set():
+            # Set kunci dibaca ulang setiap cek: kunci yang ditambah/dibatalkan lewat
+            # ValidKeyStore langsung berlaku (valid_key_list sebaiknya getter/None).
+            status, _ = scan_usb_key(make_key_set(valid_key_list))
+            if status == KEY_UNKNOWN:
+                now = time.monotonic()
+                if unknown_since is None:
+                    unknown_since = now
+                if now - unknown_since < UNKNOWN_GRACE:
+                    backend.wait(timeout=UNKNOWN_RETRY)
+                    continue
+                print(f"❌ USB key tidak bisa dipastikan selama {UNKNOWN_GRACE:.0f} detik.")
+                status = KEY_ABSENT
+            if status == KEY_ABSENT:
+                print("❌ SEMUA USB key terdaftar dilepas! Menutup aplikasi...")
+                on_removed()
+                return  # Hentikan thread monitor
+            unknown_since = None
+            # Tunggu perubahan; False berarti dibangunkan oleh stop()
+            while not backend.wait() and not stop_event.is_set():
+                pass
+    finally:
+        backend.close()
+
+
+class UsbKeyMonitor(QObject):
+    """
+    [BARU] Menjalankan monitor_usb_drive di thread daemon. Sinyal 'removed'
+    dikirim ke thread GUI (queued) sehingga popup dan quit dilakukan oleh Qt.
+    """
+    removed = Signal()
+
+    def __init__(self, valid_key_list, interval=2, backend=None):
+        super().__init__()
+        self.valid_key_list = valid_key_list
+        self.backend = backend or create_mount_backend(interval)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=monitor_usb_drive,
+            args=(self.valid_key_list, self.removed.emit, self._stop_event),
+            kwargs={"backend": self.backend},
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self.backend.wake()
+
+
+class UsbKeyDialog(QDialog):
+    """
+    [BARU] Dialog pre-check USB berbasis Qt (pengganti tkinter askretrycancel).
+    Pengecekan berjalan di executor sehingga dialog tetap responsif, dan diulang
+    otomatis setiap 'auto_retry_ms' selain lewat tombol Retry. Dialog menutup
+    sendiri (accept) begitu key yang cocok terdeteksi.
+    """
+
+    def __init__(self, valid_key_list=None, auto_retry_ms=2000, parent=None):
+        super().__init__(parent)
+        self.valid_key_list = valid_key_list
+        self.executor = get_shared_executor()
+        self.checking = False
+
+        self.setWindowTitle("USB Key Not Found")
+        self.setModal(True)
+        layout = QVBoxLayout(self)
+        message = QLabel("Masukkan SALAH SATU USB key yang terdaftar lalu klik Retry.")
+        message.setWordWrap(True)
+        self.status_label = QLabel("Menunggu USB key...")
+        self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.retry_btn = QPushButton("Retry")
+        self.retry_btn.setDefault(True)
+        self.retry_btn.clicked.connect(self.check_now)
+        cancel_btn = QPushButton("Cancel")
+        cancel_btn.clicked.connect(self.reject)
+        buttons = QHBoxLayout()
+        buttons.addStretch(); buttons.addWidget(self.retry_btn); buttons.addWidget(cancel_btn)
+        layout.addWidget(message); layout.addWidget(self.status_label); layout.addLayout(buttons)
+
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setInterval(auto_retry_ms)
+        self.retry_timer.timeout.connect(self.check_now)
+        self.retry_timer.start()
+
+    def check_now(self):
+        if self.checking: return
+        self.checking = True
+        self.retry_btn.setEnabled(False)
+        self.status_label.setText("Memeriksa USB...")
+        self.executor.submit(check_usb_key, self.valid_key_list,
+                             on_result=self.on_checked, on_error=lambda e: self.on_checked(False))
+
+    def on_checked(self, found):
+        self.checking = False
+        if found:
+            self.retry_timer.stop()
+            self.accept()
+            return
+        self.retry_btn.setEnabled(True)
+        self.status_label.setText("USB key belum terdeteksi. Mencoba lagi otomatis...")
+
+    def done(self, result):
+        self.retry_timer.stop()
+        super().done(result)
\ No newline at end of file
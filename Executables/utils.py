@@ -1,17 +1,19 @@
 import os
 import sys
 from hashlib import pbkdf2_hmac
-from Crypto.Cipher import AES
-from Crypto.Random import get_random_bytes
 import base64  # <-- [BARU] Diperlukan untuk White-Mist
 import hashlib
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import threading
-from stegano import lsb
-from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.backends import default_backend
+import struct
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+# [REVISI] Crypto (pycryptodome), cryptography, dan stegano TIDAK diimpor di sini:
+# masing-masing diimpor malas di fungsi yang memakainya agar startup cepat.
 
 # --- [BARU] Impor White-Mist ---
 # (Asumsi file WhiteMist.py ada di direktori yang sama)
@@ -56,14 +58,115 @@ def verify_password(stored_salt_hex, stored_hash_hex, password_to_check):
     except (ValueError, TypeError):
         return False
 
+# --- [BARU] HELPER TIMESTAMP ---
+def parse_timestamp(timestamp_iso):
+    """Ubah timestamp ISO dari server menjadi datetime (aware). None jika tidak valid."""
+    if not timestamp_iso:
+        return None
+    try:
+        dt_obj = datetime.fromisoformat(timestamp_iso)
+    except (ValueError, TypeError):
+        return None
+    if dt_obj.tzinfo is None:
+        dt_obj = dt_obj.replace(tzinfo=timezone.utc)
+    return dt_obj
+
 # --- [ LOGIKA API KLIEN ] ---
 API_BASE_URL = "https://sorasaki.azeroth.site/" 
 
+# --- [BARU] SESI HTTP BERSAMA (keep-alive + connection pool) ---
+# Timeout (detik) per jenis endpoint. Bisa ditimpa lewat argumen 'timeouts'.
+DEFAULT_TIMEOUTS = {
+    "default": 10,
+    "poll": 10,
+    "vigenere": 5,
+    "upload": 60,
+    "download": 60,
+    "push": 90,     # read timeout stream push (server mengirim heartbeat)
+}
+
+class ApiSession:
+    """
+    Satu requests.Session untuk semua panggilan ke API_BASE_URL.
+    Koneksi TCP+TLS dipakai ulang (keep-alive), dengan retry + backoff
+    untuk error koneksi dan 502/503/504 pada request idempoten.
+    """
+
+    def __init__(self, base_url=API_BASE_URL, pool_connections=4, pool_maxsize=8,
+                 retries=3, backoff_factor=0.5, timeouts=None):
+        self.base_url = base_url
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        retry = Retry(
+            total=retries, connect=retries, read=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.request_count = 0
+
+    def url(self, path):
+        # Format URL sama persis dengan pemanggilan lama: f"{API_BASE_URL}/{path}"
+        return f"{self.base_url}/{path}"
+
+    def request(self, method, path, endpoint="default", **kwargs):
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint, self.timeouts["default"]))
+        self.request_count += 1
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path, endpoint="default", **kwargs):
+        return self.request("GET", path, endpoint, **kwargs)
+
+    def post(self, path, endpoint="default", **kwargs):
+        return self.request("POST", path, endpoint, **kwargs)
+
+    def pool_stats(self):
+        """Statistik connection pool per host: koneksi dibuat, request dilayani, koneksi idle."""
+        stats = {"requests": self.request_count, "pools": {}}
+        pools = self.adapter.poolmanager.pools
+        for pool_key in list(pools.keys()):
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            stats["pools"][f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "connections_opened": pool.num_connections,
+                "requests_served": pool.num_requests,
+                "idle_connections": pool.pool.qsize() if pool.pool else 0,
+            }
+        return stats
+
+    def log_pool_stats(self):
+        stats = self.pool_stats()
+        print(f"ApiSession: {stats['requests']} request total.")
+        for host, pool in stats["pools"].items():
+            print(f"  {host}: {pool['connections_opened']} koneksi dibuka, "
+                  f"{pool['requests_served']} request, {pool['idle_connections']} idle")
+
+    def close(self):
+        self.session.close()
+
+
+_shared_api_session = None
+
+def get_api_session():
+    """ApiSession tunggal untuk seluruh aplikasi."""
+    global _shared_api_session
+    if _shared_api_session is None:
+        _shared_api_session = ApiSession()
+    return _shared_api_session
+
 # --- MANAJEMEN USER (Tidak berubah) ---
 class UserManager:
     # ... (kode tidak berubah)
-    def __init__(self):
+    def __init__(self, session=None):
         self.api_url = API_BASE_URL
+        self.http = session or get_api_session() # [BARU] Sesi HTTP bersama
         print("UserManager (API Mode) diinisialisasi.")
 
     def register_user(self, username, password):
@@ -71,7 +174,7 @@ class UserManager:
         salt_hex, hash_hex = hash_password(password)
         payload = { "username": username, "salt_hex": salt_hex, "hash_hex": hash_hex }
         try:
-            response = requests.post(f"{self.api_url}/register", json=payload, timeout=10)
+            response = self.http.post("register", json=payload)
             if response.status_code == 200:
                 return True, response.json().get("message", "Akun berhasil dibuat!")
             else:
@@ -82,7 +185,7 @@ class UserManager:
     def verify_user(self, username, password):
         # ... (kode tidak berubah)
         try:
-            response = requests.post(f"{self.api_url}/login", json={"username": username}, timeout=10)
+            response = self.http.post("login", json={"username": username})
             if response.status_code != 200: return False 
             data = response.json()
             stored_salt_hex = data['salt_hex']
@@ -98,7 +201,7 @@ class UserManager:
     def get_contacts(self, username):
         # ... (kode tidak berubah)
         try:
-            response = requests.get(f"{self.api_url}/get_chats/{username}", timeout=10)
+            response = self.http.get(f"get_chats/{username}")
             if response.status_code == 200 and response.json().get("success"):
                 return True, response.json().get("contacts", [])
             else:
@@ -111,20 +214,35 @@ class UserManager:
 # --- MANAJEMEN PESAN (Tidak berubah) ---
 class MessageManager:
     # ... (kode tidak berubah)
-    def __init__(self):
+    def __init__(self, session=None):
         self.api_url = API_BASE_URL
+        self.http = session or get_api_session() # [BARU] Sesi HTTP bersama
         print("MessageManager (API Mode) diinisialisasi.")
 
     def get_chat_id(self, user1, user2):
         users = sorted([user1, user2])
         return f"{users[0]}_{users[1]}"
 
-    def load_messages(self, chat_id):
-        # ... (kode tidak berubah)
+    def load_messages(self, chat_id, since=None):
+        """
+        [REVISI] Memuat pesan dari server.
+        Jika 'since' (timestamp ISO dari server) diberikan, hanya pesan dengan
+        db_timestamp >= since yang dikembalikan (delta sync).
+        """
+        params = {"since": since} if since else None
         try:
-            response = requests.get(f"{self.api_url}/load_messages/{chat_id}", timeout=10)
+            response = self.http.get(f"load_messages/{chat_id}", endpoint="poll", params=params)
             if response.status_code == 200:
-                return response.json() 
+                messages = response.json()
+                if since:
+                    # Server lama mengabaikan parameter 'since' dan tetap mengirim
+                    # seluruh riwayat, jadi saring ulang di sisi klien.
+                    since_dt = parse_timestamp(since)
+                    messages = [
+                        m for m in messages
+                        if since_dt is None or (parse_timestamp(m.get('db_timestamp')) or since_dt) >= since_dt
+                    ]
+                return messages
             else:
                 return []
         except requests.exceptions.RequestException:
@@ -144,7 +262,7 @@ class MessageManager:
         try:
             def send_in_thread():
                 try:
-                    requests.post(f"{self.api_url}/save_message", json=message_data_copy, timeout=10)
+                    self.http.post("save_message", json=message_data_copy)
                     print("Pesan (metadata) berhasil dikirim ke server.")
                 except requests.exceptions.RequestException as e:
                     print(f"Gagal mengirim pesan: {e}")
@@ -152,13 +270,18 @@ class MessageManager:
         except Exception as e:
             print(f"Error memulai thread kirim pesan: {e}")
 
-# --- FUNGSI VIGENERE (Tidak berubah) ---
-def vigenere_encrypt(plain_text, key):
-    # ... (kode tidak berubah)
-    if not key: key = "defaultkey"
+# --- [REVISI] FUNGSI VIGENERE ---
+# Tetap dihitung di server (/encrypt/vigenere, /decrypt/vigenere) lewat sesi
+# HTTP bersama. Implementasi lokal belum bisa dicocokkan dengan output server
+# (tidak ada test vector), jadi tidak disertakan.
+VIGENERE_DEFAULT_KEY = "defaultkey"
+
+def vigenere_encrypt(plain_text, key, session=None):
+    if not key: key = VIGENERE_DEFAULT_KEY
+    http = session or get_api_session()
     payload = {"text": plain_text, "key": key}
     try:
-        response = requests.post(f"{API_BASE_URL}/encrypt/vigenere", json=payload, timeout=5)
+        response = http.post("encrypt/vigenere", endpoint="vigenere", json=payload)
         if response.status_code == 200:
             return response.json().get("result", plain_text)
         else:
@@ -168,36 +291,75 @@ def vigenere_encrypt(plain_text, key):
         print(f"Koneksi error Vigenere Encrypt: {e}")
         return plain_text 
 
-def vigenere_decrypt(encrypted_text, key):
-    # ... (kode tidak berubah)
-    if not key: key = "defaultkey"
+def vigenere_decrypt(encrypted_text, key, session=None, strict=False):
+    """
+    strict=True: kegagalan server dilempar sebagai ValueError alih-alih
+    mengembalikan teks input apa adanya (agar pemanggil tahu hasilnya tidak valid).
+    """
+    if not key: key = VIGENERE_DEFAULT_KEY
+    http = session or get_api_session()
     payload = {"text": encrypted_text, "key": key}
     try:
-        response = requests.post(f"{API_BASE_URL}/decrypt/vigenere", json=payload, timeout=5)
+        response = http.post("decrypt/vigenere", endpoint="vigenere", json=payload)
         if response.status_code == 200:
-            return response.json().get("result", encrypted_text)
+            result = response.json().get("result")
+            if result is None and strict:
+                raise ValueError("Respons Vigenere Decrypt tanpa 'result'")
+            return encrypted_text if result is None else result
         else:
             print(f"Server error Vigenere Decrypt: {response.status_code}")
+            if strict:
+                raise ValueError(f"Server error Vigenere Decrypt: {response.status_code}")
             return encrypted_text
     except requests.exceptions.RequestException as e:
         print(f"Koneksi error Vigenere Decrypt: {e}")
+        if strict:
+            raise ValueError(f"Koneksi error Vigenere Decrypt: {e}") from e
         return encrypted_text 
 
 # --- CRYPTO ENGINE (Modern - AES) ---
-# (Tidak berubah)
+# [REVISI] Kunci Scrypt di-cache (LRU) dan ada mode kunci sesi.
+# Format payload TIDAK berubah: base64(salt[16] + nonce[12] + ciphertext).
 class CryptoEngine:
-    # ... (kode tidak berubah)
-    def __init__(self, password: str):
+    # Cache bersama semua instance: (sha256(password), salt) -> kunci 32 byte
+    KEY_CACHE_SIZE = 256
+    _key_cache = OrderedDict()
+    _key_cache_lock = threading.Lock()
+
+    def __init__(self, password: str, session_mode: bool = False):
         self.password = password.encode('utf-8')
+        self._password_id = hashlib.sha256(self.password).digest()
+        # Mode sesi: satu salt untuk semua pesan yang dienkripsi instance ini,
+        # jadi Scrypt hanya jalan sekali per sesi. Nonce tetap acak per pesan.
+        self.session_salt = os.urandom(16) if session_mode else None
     def _derive_key(self, salt: bytes) -> bytes:
+        cache_key = (self._password_id, bytes(salt))
+        with CryptoEngine._key_cache_lock:
+            key = CryptoEngine._key_cache.get(cache_key)
+            if key is not None:
+                CryptoEngine._key_cache.move_to_end(cache_key)
+                return key
+        from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+        from cryptography.hazmat.backends import default_backend
         kdf = Scrypt(salt=salt, length=32, n=2**14, r=8, p=1, backend=default_backend())
-        return kdf.derive(self.password)
+        key = kdf.derive(self.password)
+        with CryptoEngine._key_cache_lock:
+            CryptoEngine._key_cache[cache_key] = key
+            while len(CryptoEngine._key_cache) > CryptoEngine.KEY_CACHE_SIZE:
+                CryptoEngine._key_cache.popitem(last=False)
+        return key
+    @classmethod
+    def clear_key_cache(cls):
+        with cls._key_cache_lock:
+            cls._key_cache.clear()
     def encrypt(self, data: bytes) -> bytes:
-        salt = os.urandom(16); key = self._derive_key(salt)
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        salt = self.session_salt or os.urandom(16); key = self._derive_key(salt)
         aesgcm = AESGCM(key); nonce = os.urandom(12)
         encrypted_data = aesgcm.encrypt(nonce, data, None)
         return base64.b64encode(salt + nonce + encrypted_data) 
     def decrypt(self, combined_payload_b64: bytes) -> bytes:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
         try:
             combined_payload = base64.b64decode(combined_payload_b64)
             salt = combined_payload[:16]; nonce = combined_payload[16:28]
@@ -209,6 +371,278 @@ class CryptoEngine:
             print(f"CryptoEngine Gagal Dekripsi: {e}")
             raise ValueError("Gagal mendekripsi data: Password salah atau data korup.")
 
+    # --- [BARU] Format streaming (file besar, memori konstan) ---
+    # Header (32 byte): MAGIC(4) + versi(1) + salt(16) + nonce_prefix(7) + chunk_size(4)
+    # Record per chunk : panjang(4, bit tertinggi = chunk terakhir) + ciphertext+tag
+    # Nonce per chunk  : nonce_prefix(7) + counter(4) + flag_terakhir(1); header jadi AAD.
+    # Urutan, pemotongan, dan penggantian chunk terdeteksi saat verifikasi tag.
+    STREAM_MAGIC = b"LDUS"
+    STREAM_VERSION = 1
+    STREAM_CHUNK_SIZE = 64 * 1024
+    STREAM_HEADER_SIZE = 32
+    _FINAL_FLAG = 0x80000000
+
+    @classmethod
+    def is_stream_payload(cls, first_bytes: bytes) -> bool:
+        return first_bytes[:4] == cls.STREAM_MAGIC
+
+    @staticmethod
+    def _stream_nonce(prefix: bytes, counter: int, is_final: bool) -> bytes:
+        return prefix + struct.pack(">IB", counter, 1 if is_final else 0)
+
+    def encrypt_stream(self, in_file, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Generator: baca in_file per chunk dan hasilkan bytes terenkripsi (header dulu)."""
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        salt = self.session_salt or os.urandom(16)
+        prefix = os.urandom(7)
+        header = self.STREAM_MAGIC + bytes([self.STREAM_VERSION]) + salt + prefix + struct.pack(">I", chunk_size)
+        aesgcm = AESGCM(self._derive_key(salt))
+        yield header
+
+        counter = 0
+        chunk = in_file.read(chunk_size)
+        while True:
+            next_chunk = in_file.read(chunk_size) if chunk else b""
+            is_final = not next_chunk
+            encrypted = aesgcm.encrypt(self._stream_nonce(prefix, counter, is_final), chunk, header)
+            length = len(encrypted) | (self._FINAL_FLAG if is_final else 0)
+            yield struct.pack(">I", length) + encrypted
+            if is_final:
+                return
+            chunk = next_chunk
+            counter += 1
+
+    def decrypt_stream(self, in_file):
+        """Generator: dekripsi format streaming dari in_file, hasilkan plaintext per chunk."""
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        header = in_file.read(self.STREAM_HEADER_SIZE)
+        if len(header) != self.STREAM_HEADER_SIZE or not self.is_stream_payload(header):
+            raise ValueError("Bukan payload streaming yang valid.")
+        if header[4] != self.STREAM_VERSION:
+            raise ValueError(f"Versi format streaming {header[4]} tidak didukung.")
+        salt, prefix = header[5:21], header[21:28]
+        chunk_size = struct.unpack(">I", header[28:32])[0]
+        aesgcm = AESGCM(self._derive_key(salt))
+
+        counter = 0
+        while True:
+            length_bytes = in_file.read(4)
+            if len(length_bytes) != 4:
+                raise ValueError("Payload streaming terpotong (chunk terakhir tidak ditemukan).")
+            length = struct.unpack(">I", length_bytes)[0]
+            is_final = bool(length & self._FINAL_FLAG)
+            length &= ~self._FINAL_FLAG
+            if length > chunk_size + 16:
+                raise ValueError("Ukuran chunk tidak valid.")
+            encrypted = in_file.read(length)
+            if len(encrypted) != length:
+                raise ValueError("Payload streaming terpotong.")
+            try:
+                yield aesgcm.decrypt(self._stream_nonce(prefix, counter, is_final), encrypted, header)
+            except Exception:
+                raise ValueError("Gagal mendekripsi data: Password salah atau data korup.")
+            if is_final:
+                if in_file.read(1):
+                    raise ValueError("Data tambahan setelah chunk terakhir.")
+                return
+            counter += 1
+
+    def decrypt_legacy_stream(self, in_file, chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        [BARU] Generator: dekripsi format lama base64(salt + nonce + ciphertext + tag)
+        per chunk. Tag baru diverifikasi di akhir, jadi plaintext yang dihasilkan
+        BELUM terautentikasi sampai generator selesai tanpa error (pakai decrypt_file).
+        """
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+        decoded = _iter_b64_decoded(in_file, chunk_size)
+        head = bytearray()
+        for block in decoded:
+            head += block
+            if len(head) >= 28 + 16: break
+        if len(head) < 28 + 16:
+            raise ValueError("Gagal mendekripsi data: Password salah atau data korup.")
+        salt, nonce = bytes(head[:16]), bytes(head[16:28])
+        decryptor = Cipher(algorithms.AES(self._derive_key(salt)), modes.GCM(nonce)).decryptor()
+
+        # 16 byte terakhir adalah tag: selalu tahan 16 byte di ekor buffer
+        pending = bytes(head[28:])
+        for block in decoded:
+            if len(pending) > 16:
+                yield decryptor.update(pending[:-16])
+                pending = pending[-16:]
+            pending += block
+        if len(pending) > 16:
+            yield decryptor.update(pending[:-16])
+            pending = pending[-16:]
+        if len(pending) != 16:
+            raise ValueError("Gagal mendekripsi data: Password salah atau data korup.")
+        try:
+            yield decryptor.finalize_with_tag(pending)
+        except Exception:
+            raise ValueError("Gagal mendekripsi data: Password salah atau data korup.")
+
+    def decrypt_file(self, in_path: str, out_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> str:
+        """
+        [BARU] Dekripsi file .enc (format streaming maupun lama) langsung ke out_path.
+        Memori terbatas ~beberapa chunk; output ditulis ke file sementara dan baru
+        di-rename setelah seluruh data terverifikasi.
+        """
+        with open(in_path, "rb") as f_in:
+            is_stream = self.is_stream_payload(f_in.read(4))
+            f_in.seek(0)
+            chunks = self.decrypt_stream(f_in) if is_stream else self.decrypt_legacy_stream(f_in, chunk_size)
+            return _write_chunks_atomic(out_path, chunks)
+
+# --- [BARU] HELPER FILE STREAMING ---
+def _iter_b64_decoded(in_file, chunk_size):
+    """Decode base64 dari file per blok (kelipatan 4 karakter), tanpa memuat seluruh teks."""
+    read_size = max(4, chunk_size // 3 * 4)
+    leftover = b""
+    while True:
+        text = in_file.read(read_size)
+        if not text: break
+        text = leftover + b"".join(text.split())  # abaikan newline/spasi seperti b64decode
+        usable = len(text) - len(text) % 4
+        leftover = text[usable:]
+        if usable:
+            yield base64.b64decode(text[:usable], validate=True)
+    if leftover:
+        raise ValueError("Data base64 terpotong.")
+
+def _write_chunks_atomic(out_path, chunks):
+    """Tulis iterator bytes ke out_path lewat file sementara; hapus jika terjadi error."""
+    temp_path = out_path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f_out:
+            for chunk in chunks:
+                f_out.write(chunk)
+        os.replace(temp_path, out_path)
+    except BaseException:
+        if os.path.exists(temp_path): os.remove(temp_path)
+        raise
+    return out_path
+
+# --- [BARU] MULTIPART STREAMING ---
+def iter_multipart(field_name, filename, content_chunks, mime_type, fields=None):
+    """
+    Bungkus iterator bytes sebagai body multipart/form-data tanpa membangunnya
+    di memori. Kirim dengan data=body (requests memakai Transfer-Encoding: chunked).
+    [REVISI] fields: dict field teks tambahan (dikirim sebelum file).
+    Mengembalikan (content_type, body_generator).
+    """
+    boundary = uuid.uuid4().hex
+    safe_filename = filename.replace('"', '_')
+
+    def body():
+        for name, value in (fields or {}).items():
+            yield (f"--{boundary}\r\n"
+                   f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                   f"{value}\r\n").encode("utf-8")
+        yield (f"--{boundary}\r\n"
+               f'Content-Disposition: form-data; name="{field_name}"; filename="{safe_filename}"\r\n'
+               f"Content-Type: {mime_type}\r\n\r\n").encode("utf-8")
+        for chunk in content_chunks:
+            if chunk:
+                yield chunk
+        yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+    return f"multipart/form-data; boundary={boundary}", body()
+
+class _ZipStreamSink:
+    """File-like tanpa seek untuk zipfile: menampung bytes sampai diambil drain()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def iter_zip_stored(entries):
+    """
+    [BARU] Bangun arsip zip (ZIP_STORED) secara streaming dari iterator
+    (nama, bytes): setiap entri di-yield begitu tersedia, cocok sebagai
+    content_chunks iter_multipart. Isi yang sudah terkompresi (JPEG) tidak
+    dikompresi ulang.
+    """
+    import zipfile
+    sink = _ZipStreamSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()  # Central directory
+
+# --- [BARU] CACHE STATE WHITE-MIST ---
+# crossCross.state/deState membangun tabel unicode (2000 karakter) dan menjalankan
+# keyCreation setiap kali dibuat. Salt dan sugar konstan, jadi state cukup dibuat
+# sekali per kunci lalu dipakai ulang (LRU terbatas, seperti cache kunci Scrypt).
+WHITEMIST_SALT = "Kriptoasik"
+WHITEMIST_SUGAR = "FunKripto"
+WHITEMIST_STATE_CACHE_SIZE = 32
+
+class _WhiteMistStates:
+    """State enkripsi + dekripsi untuk satu (key, salt, sugar)."""
+
+    def __init__(self, key, salt, sugar):
+        self.encryptor = crossCross.state(key=key, salt=salt, sugar=sugar)
+        self.decryptor = crossCross.deState(key=key, salt=salt, sugar=sugar)
+        # letsEncrypt/letsDecrypt menyimpan hasil antara di atribut objek: pakai bergantian
+        self.lock = threading.Lock()
+        self._byte_key = None
+
+    @property
+    def supports_binary(self):
+        """Mode biner butuh trueKey dari generatedKeys(); tidak semua versi WhiteMist menyediakannya."""
+        return callable(getattr(self.encryptor, "generatedKeys", None))
+
+    @property
+    def byte_key(self):
+        """Geseran per byte untuk mode biner (dihitung sekali)."""
+        if self._byte_key is None:
+            if not self.supports_binary:
+                raise ValueError("Modul WhiteMist ini tidak mendukung mode biner (generatedKeys tidak ada).")
+            import numpy as np  # Impor di sini agar startup aplikasi tidak memuat NumPy
+            true_key = self.encryptor.generatedKeys()
+            # letsEncrypt melewati posisi terakhir trueKey di setiap putaran
+            effective = true_key[:-1] or true_key
+            if not effective:
+                raise ValueError("Kunci White-Mist tidak valid.")
+            self._byte_key = np.array(effective, dtype=np.int64) % 256
+        return self._byte_key
+
+_whitemist_states = OrderedDict()
+_whitemist_states_lock = threading.Lock()
+
+def get_whitemist_states(key, salt=WHITEMIST_SALT, sugar=WHITEMIST_SUGAR):
+    """State White-Mist ter-cache untuk (key, salt, sugar)."""
+    if crossCross is None:
+        raise ImportError("Modul WhiteMist tidak ditemukan. Tidak bisa enkripsi/dekripsi.")
+    cache_key = (hashlib.sha256(key.encode('utf-8')).digest(), salt, sugar)
+    with _whitemist_states_lock:
+        states = _whitemist_states.get(cache_key)
+        if states is not None:
+            _whitemist_states.move_to_end(cache_key)
+            return states
+    states = _WhiteMistStates(key, salt, sugar)
+    with _whitemist_states_lock:
+        states = _whitemist_states.setdefault(cache_key, states)
+        _whitemist_states.move_to_end(cache_key)
+        while len(_whitemist_states) > WHITEMIST_STATE_CACHE_SIZE:
+            _whitemist_states.popitem(last=False)
+    return states
+
+def clear_whitemist_cache():
+    with _whitemist_states_lock:
+        _whitemist_states.clear()
+
 # --- [INSTRUKSI 1: FUNGSI HELPER WHITE-MIST] ---
 def encrypt_whitemist(data_bytes: bytes, key: str, is_text: bool = False) -> str:
     """
@@ -228,8 +662,10 @@ def encrypt_whitemist(data_bytes: bytes, key: str, is_text: bool = False) -> str
         string_to_encrypt = base64.b64encode(data_bytes).decode('utf-8')
     
     # Enkripsi string
-    enkripsi = crossCross.state(key=key, salt="Kriptoasik", sugar="FunKripto")
-    encrypted_string = enkripsi.letsEncrypt(string_to_encrypt)
+    # [REVISI] State White-Mist diambil dari cache (tidak dibangun ulang tiap pesan)
+    states = get_whitemist_states(key)
+    with states.lock:
+        encrypted_string = states.encryptor.letsEncrypt(string_to_encrypt)
     
     return encrypted_string
 
@@ -243,8 +679,9 @@ def decrypt_whitemist(encrypted_string: str, key: str, is_text: bool = False) ->
         raise ImportError("Modul WhiteMist tidak ditemukan. Tidak bisa dekripsi.")
         
     # 1. Dekripsi string White-Mist
-    dekripsi = crossCross.deState(key=key, salt="Kriptoasik", sugar="FunKripto")
-    decrypted_string = dekripsi.letsDecrypt(encrypted_string)
+    states = get_whitemist_states(key)
+    with states.lock:
+        decrypted_string = states.decryptor.letsDecrypt(encrypted_string)
     
     # 2. Kembalikan ke bytes
     if is_text:
@@ -262,6 +699,137 @@ def decrypt_whitemist(encrypted_string: str, key: str, is_text: bool = False) ->
             print("Gagal B64Decode, mencoba fallback ke UTF-8 (mungkin pesan teks lama)...")
             return decrypted_string.encode('utf-8')
 
+def is_printable_text(text: str) -> bool:
+    """[BARU] True jika teks hanya berisi karakter tercetak/spasi (hasil dekripsi dengan kunci benar)."""
+    return all(c.isprintable() or c in "\n\r\t" for c in text)
+
+def decrypt_whitemist_file(in_path: str, out_path: str, key: str, chunk_size: int = 64 * 1024) -> str:
+    """
+    [BARU] Dekripsi file White-Mist ke out_path. letsDecrypt() hanya menerima satu
+    string utuh, tetapi decode base64 hasilnya dilakukan per blok langsung ke disk
+    (tidak ada salinan bytes penuh kedua di memori).
+    """
+    if crossCross is None:
+        raise ImportError("Modul WhiteMist tidak ditemukan. Tidak bisa dekripsi.")
+    with open(in_path, "rb") as f:
+        if is_whitemist_binary(f.read(len(WHITEMIST_BINARY_MAGIC))):
+            # Format biner: benar-benar streaming per chunk
+            f.seek(0)
+            return _write_chunks_atomic(out_path, iter_whitemist_decrypt(f, key, chunk_size))
+    with open(in_path, "r", encoding="utf-8") as f:
+        encrypted_string = f.read()
+    states = get_whitemist_states(key)
+    with states.lock:
+        decrypted_string = states.decryptor.letsDecrypt(encrypted_string)
+    del encrypted_string
+
+    step = max(4, chunk_size // 3 * 4)
+    def decoded_blocks():
+        for start in range(0, len(decrypted_string), step):
+            yield base64.b64decode(decrypted_string[start:start + step], validate=True)
+    try:
+        return _write_chunks_atomic(out_path, decoded_blocks())
+    except ValueError as e:
+        # Sama seperti decrypt_whitemist: fallback ke teks UTF-8 (pesan teks lama)
+        print(f"Error b64decode White-Mist: {e}")
+        print("Gagal B64Decode, mencoba fallback ke UTF-8 (mungkin pesan teks lama)...")
+        def text_blocks():
+            for start in range(0, len(decrypted_string), step):
+                yield decrypted_string[start:start + step].encode('utf-8')
+        return _write_chunks_atomic(out_path, text_blocks())
+
+# --- [BARU] WHITE-MIST MODE BINER ---
+# Format lama (file): base64(bytes) -> letsEncrypt(str) -> utf-8, sehingga payload
+# membengkak >33% dan ada beberapa salinan str/bytes penuh di memori.
+# Mode biner memakai jadwal kunci White-Mist yang sama (keyCreation dengan salt
+# dan sugar yang sama, urutan kunci yang sama) tetapi menggeser setiap byte
+# modulo 256 langsung di bytearray/memoryview. Payload = MAGIC + bytes terenkripsi,
+# ukurannya sama dengan file asli + 4 byte. Payload tanpa MAGIC diperlakukan
+# sebagai format lama sehingga pesan lama tetap bisa didekripsi.
+# Ini cipher baru (geser byte berulang), bukan format 'whitemist' lama: pesan file
+# memakai encryption_method 'whitemist-bin' agar klien lama menolaknya dengan jelas.
+# Jadwal kunci (trueKey[:-1]) dicek terhadap modul WhiteMist asli di
+# test_whitemist_binary.py.
+WHITEMIST_BINARY_MAGIC = b"WMB\x01"  # "WMB" + versi format 1
+
+def is_whitemist_binary(first_bytes) -> bool:
+    return bytes(first_bytes[:len(WHITEMIST_BINARY_MAGIC)]) == WHITEMIST_BINARY_MAGIC
+
+def whitemist_binary_supported(key: str) -> bool:
+    """True jika modul WhiteMist tersedia dan mendukung mode biner untuk kunci ini."""
+    if crossCross is None:
+        return False
+    return get_whitemist_states(key).supports_binary
+
+def _whitemist_byte_key(key: str):
+    """Urutan geseran per byte: trueKey White-Mist tanpa elemen terakhir (sama seperti letsEncrypt)."""
+    return get_whitemist_states(key).byte_key
+
+def whitemist_transform_inplace(buffer, key, decrypt=False, position=0, byte_key=None):
+    """
+    Enkripsi/dekripsi White-Mist biner langsung di buffer (bytearray/memoryview
+    yang writable). 'position' = offset byte buffer ini di dalam seluruh data,
+    agar data bisa diproses per chunk. Mengembalikan buffer yang sama.
+    """
+    import numpy as np
+    if byte_key is None:
+        byte_key = _whitemist_byte_key(key)
+    view = np.frombuffer(buffer, dtype=np.uint8)
+    if view.size == 0:
+        return buffer
+    period = byte_key.size
+    shifts = np.resize(np.roll(byte_key, -(position % period)), view.size).astype(np.uint8)
+    if decrypt:
+        np.subtract(view, shifts, out=view)  # uint8: otomatis modulo 256
+    else:
+        np.add(view, shifts, out=view)
+    return buffer
+
+def encrypt_whitemist_bytes(data, key: str) -> bytearray:
+    """Bytes-in/bytes-out: MAGIC + data terenkripsi, tanpa str atau base64 perantara."""
+    data = memoryview(data)
+    payload = bytearray(len(WHITEMIST_BINARY_MAGIC) + data.nbytes)
+    payload[:len(WHITEMIST_BINARY_MAGIC)] = WHITEMIST_BINARY_MAGIC
+    body = memoryview(payload)[len(WHITEMIST_BINARY_MAGIC):]
+    body[:] = data.cast("B")
+    whitemist_transform_inplace(body, key)
+    return payload
+
+def decrypt_whitemist_bytes(payload, key: str):
+    """Kebalikan encrypt_whitemist_bytes; payload format lama (str utf-8) tetap didukung."""
+    payload = memoryview(payload)
+    if not is_whitemist_binary(payload):
+        return decrypt_whitemist(payload.tobytes().decode('utf-8'), key)
+    body = bytearray(payload[len(WHITEMIST_BINARY_MAGIC):])
+    return whitemist_transform_inplace(body, key, decrypt=True)
+
+def iter_whitemist_encrypt(in_file, key: str, chunk_size: int = 64 * 1024):
+    """Generator: MAGIC lalu chunk terenkripsi dari in_file (memori konstan, untuk upload streaming)."""
+    byte_key = _whitemist_byte_key(key)
+    yield WHITEMIST_BINARY_MAGIC
+    position = 0
+    buffer = bytearray(chunk_size)
+    while True:
+        n = in_file.readinto(buffer)
+        if not n: return
+        chunk = memoryview(buffer)[:n]
+        whitemist_transform_inplace(chunk, key, position=position, byte_key=byte_key)
+        position += n
+        yield bytes(chunk)
+
+def iter_whitemist_decrypt(in_file, key: str, chunk_size: int = 64 * 1024):
+    """Generator: dekripsi payload White-Mist biner dari in_file per chunk."""
+    if not is_whitemist_binary(in_file.read(len(WHITEMIST_BINARY_MAGIC))):
+        raise ValueError("Bukan payload White-Mist biner.")
+    byte_key = _whitemist_byte_key(key)
+    position = 0
+    while True:
+        chunk = bytearray(in_file.read(chunk_size))
+        if not chunk: return
+        whitemist_transform_inplace(chunk, key, decrypt=True, position=position, byte_key=byte_key)
+        position += len(chunk)
+        yield bytes(chunk)
+
 
 # --- KONFIGURASI KUNCI USB ---
 # (Tidak berubah)
@@ -274,6 +842,8 @@ HASH_ALG = "sha256"
 
 def encrypt_config(plain_text_key, password):
     # ... (kode tidak berubah)
+    from Crypto.Cipher import AES
+    from Crypto.Random import get_random_bytes
     salt = get_random_bytes(SALT_SIZE)
     key = pbkdf2_hmac(HASH_ALG, password.encode("utf-8"), salt, ITERATIONS, KEY_SIZE)
     cipher = AES.new(key, AES.MODE_GCM)
@@ -286,6 +856,7 @@ def encrypt_config(plain_text_key, password):
 
 def decrypt_config(encrypted_data_bytes, password):
     # ... (kode tidak berubah)
+    from Crypto.Cipher import AES
     try:
         encrypted_data = json.loads(encrypted_data_bytes.decode("utf-8"))
         salt = bytes.fromhex(encrypted_data["salt"])